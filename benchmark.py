@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the TODO scanner.
+Generates a synthetic source tree and compares scanning throughput.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from config import Config
+from reconciler import Reconciler
+from xcode_parser import XcodeParser, TodoItem, normalize_todo_text
+
+MARKER_LINES = [
+    "    // TODO: Handle the empty state",
+    "    /* FIXME: Remove this workaround */",
+    "    # TODO: Validate the input",
+    "    // DONE: Add basic UI setup",
+    "    /* COMPLETED: Wire up the data source */",
+]
+
+CODE_LINES = [
+    "    let value = compute(input, options: options)",
+    "    if value == nil { return }",
+    "    [self setupConstraints];",
+    "    self.view.backgroundColor = [UIColor whiteColor];",
+    "    return data.upper()",
+    "",
+]
+
+def create_synthetic_project(root: Path, file_count: int, lines_per_file: int, todo_density: float, seed: int = 0,
+                             depth: int = 1, excluded_files: int = 0):
+    """Create a synthetic project with the given number of files and TODO density.
+    
+    Files are spread over Module directories nested depth levels deep. excluded_files more
+    files are written under directories the scanner skips (Pods, DerivedData, build).
+    """
+    rng = random.Random(seed)
+    extensions = ['.swift', '.m', '.py']
+
+    def write_file(file_path: Path):
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        lines = []
+        for _ in range(lines_per_file):
+            if rng.random() < todo_density:
+                lines.append(rng.choice(MARKER_LINES))
+            else:
+                lines.append(rng.choice(CODE_LINES))
+        with open(file_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+    for index in range(file_count):
+        directory = root / f"Module{index % 20}"
+        for level in range(1, depth):
+            directory = directory / f"Group{(index // (20 * level)) % 4}"
+        write_file(directory / f"File{index}{extensions[index % len(extensions)]}")
+
+    excluded_dirs = ["Pods", "DerivedData", "build"]
+    for index in range(excluded_files):
+        directory = root / excluded_dirs[index % len(excluded_dirs)] / f"Vendor{index % 10}"
+        write_file(directory / f"Vendored{index}.swift")
+
+def scan_two_pass(parser: XcodeParser, source_files):
+    """Scan files the original way: one read and pattern loop for TODOs, another for completions."""
+    todos, completions = [], []
+    for file_path in source_files:
+        todos.extend(parser.parse_file_for_todos(file_path))
+        completions.extend(parser.parse_file_for_completions(file_path))
+    return todos, completions
+
+def scan_single_pass(parser: XcodeParser, source_files):
+    """Scan files with the combined single-pass scanner."""
+    todos, completions = [], []
+    for file_path in source_files:
+        file_todos, file_completions = parser.scan_file(file_path)
+        todos.extend(file_todos)
+        completions.extend(file_completions)
+    return todos, completions
+
+def run_scan_benchmark(project_path: str, repeat: int = 3):
+    """Time both scanning strategies over a project and print files/s and MB/s."""
+    parser = XcodeParser(Config())
+    source_files = parser.find_source_files(project_path)
+    total_bytes = sum(os.path.getsize(path) for path in source_files)
+
+    results = {}
+    for name, scan in (("two-pass", scan_two_pass), ("single-pass", scan_single_pass)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = scan(parser, source_files)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = (best, found)
+
+    baseline_found = results["two-pass"][1]
+    for name, (elapsed, found) in results.items():
+        identical = ([t.unique_id for t in found[0]] == [t.unique_id for t in baseline_found[0]] and
+                     [t.unique_id for t in found[1]] == [t.unique_id for t in baseline_found[1]])
+        print(f"{name:>12}: {elapsed:.3f}s | {len(source_files) / elapsed:,.0f} files/s | "
+              f"{total_bytes / elapsed / 1e6:.1f} MB/s | identical results: {identical}")
+
+    print(f"Speedup: {results['two-pass'][0] / results['single-pass'][0]:.2f}x")
+
+def create_large_file(file_path: Path, size_mb: int, todo_density: float, seed: int = 0):
+    """Write a single large source file (e.g. a generated amalgamation) of roughly size_mb megabytes."""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(file_path, 'w') as f:
+        while written < target:
+            block = []
+            for _ in range(10000):
+                block.append(rng.choice(MARKER_LINES) if rng.random() < todo_density else rng.choice(CODE_LINES))
+            text = "\n".join(block) + "\n"
+            f.write(text)
+            written += len(text)
+
+def rss_probe(mode: str, file_path: str):
+    """Scan file_path with the given strategy and print this process's peak RSS in KB."""
+    parser = XcodeParser(Config())
+    if mode == "read-all":
+        todos = parser.parse_file_for_todos(file_path)
+        completions = parser.parse_file_for_completions(file_path)
+    else:
+        todos, completions = parser.scan_file(file_path)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{peak_kb} {len(todos)} {len(completions)}")
+
+def run_memory_benchmark(size_mb: int, todo_density: float):
+    """Compare peak RSS of reading whole files against the streaming scanner, each in a fresh process."""
+    temp_dir = tempfile.mkdtemp(prefix="todoist_sync_bench_")
+    try:
+        file_path = Path(temp_dir) / "Amalgamation.swift"
+        print(f"Generating a {size_mb} MB source file in {temp_dir}")
+        create_large_file(file_path, size_mb, todo_density)
+
+        for mode in ("read-all", "streaming"):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--rss-probe', mode, str(file_path)],
+                                    stdout=subprocess.PIPE, check=True, text=True).stdout.split()
+            peak_kb, todo_count, completion_count = (int(value) for value in output)
+            print(f"{mode:>12}: peak RSS {peak_kb / 1024:.1f} MB | {todo_count} TODOs, {completion_count} completions")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def match_completions_naive(existing_tasks, completions):
+    """Match completions the original way: scan every task for every completion."""
+    matches = []
+    for completion in completions:
+        for task in existing_tasks:
+            if completion.content in task['content'] and not task.get('is_completed', False):
+                matches.append((completion, task))
+                break
+    return matches
+
+def run_reconcile_benchmark(task_count: int, completion_count: int, seed: int = 0):
+    """Compare naive completion matching with the indexed Reconciler over a synthetic task list."""
+    rng = random.Random(seed)
+    words = ["add", "fix", "remove", "handle", "cache", "view", "layout", "error", "input", "sync",
+             "table", "cell", "network", "retry", "model", "state", "title", "color", "font", "image"]
+
+    def phrase():
+        return " ".join(rng.choice(words) for _ in range(5)) + f" #{rng.randrange(10 ** 6)}"
+
+    existing_tasks = [{"id": str(index), "content": f"{phrase()} (Sources/File{index % 500}.swift:{index % 900 + 1})",
+                       "is_completed": False} for index in range(task_count)]
+    completions = []
+    for index in range(completion_count):
+        # Half the completions refer to open tasks, half to tasks that were already closed
+        if index % 2 == 0:
+            content = existing_tasks[rng.randrange(task_count)]["content"].split(" (")[0]
+        else:
+            content = phrase()
+        completions.append(TodoItem(content, "Sources/Done.swift", index + 1, "DONE"))
+
+    print(f"Matching {completion_count} completions against {task_count} tasks")
+    start = time.perf_counter()
+    indexed = Reconciler(XcodeParser(Config()), existing_tasks, os.curdir).match_completions(completions)
+    indexed_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive = match_completions_naive(existing_tasks, completions)
+    naive_time = time.perf_counter() - start
+
+    identical = [(c.unique_id, t["id"]) for c, t in naive] == [(c.unique_id, t["id"]) for c, t in indexed]
+    print(f"{'naive':>12}: {naive_time:.3f}s | {len(naive)} matches")
+    print(f"{'indexed':>12}: {indexed_time:.3f}s | {len(indexed)} matches | identical results: {identical}")
+    print(f"Speedup: {naive_time / indexed_time:.1f}x")
+
+class LegacyTodoItem:
+    """TodoItem as it was before it was slotted: a dict per item and an eagerly built identity string."""
+
+    def __init__(self, content: str, file_path: str, line_number: int, todo_type: str = "TODO"):
+        self.content = content.strip()
+        self.file_path = file_path
+        self.line_number = line_number
+        self.todo_type = todo_type
+        self.unique_id = f"{file_path}:{line_number}:{content}"
+
+    def __eq__(self, other):
+        return isinstance(other, LegacyTodoItem) and self.unique_id == other.unique_id
+
+    def __hash__(self):
+        return hash(self.unique_id)
+
+def format_task_legacy(item: LegacyTodoItem):
+    """Task content, fingerprint and description the original way, with a relpath call per use."""
+    content = f"{item.content} ({os.path.relpath(item.file_path)}:{item.line_number})"
+    key = f"{os.path.relpath(item.file_path)}\0{normalize_todo_text(item.content)}\0{0}"
+    fingerprint = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    description = f"File: {os.path.relpath(item.file_path)}\nLine: {item.line_number}\nType: {item.todo_type}\nFingerprint: {fingerprint}"
+    return content, description
+
+def run_item_benchmark(item_count: int, file_count: int, seed: int = 0):
+    """Compare memory and time of the legacy and slotted TodoItem over a synthetic marker set.
+
+    Rows are grouped per file like scan results, with each file's path decoded separately per
+    file as when loaded from a cache or manifest.
+    """
+    rng = random.Random(seed)
+    paths = [f"Vendor/Module{index % 50}/Sources/Generated{index}.swift" for index in range(file_count)]
+    rows = [(f"{rng.choice(MARKER_LINES).split(':', 1)[1].strip()} {index}", paths[index % file_count],
+             index // file_count + 1, "TODO") for index in range(item_count)]
+    parser = XcodeParser(Config())
+    print(f"{item_count:,} items in {file_count:,} files")
+
+    def build(item_class):
+        # json.loads gives every row its own copy of the path string
+        return [item_class(content, json.loads(f'"{path}"'), line, kind) for content, path, line, kind in rows]
+
+    def format_current(item: TodoItem):
+        fingerprint = parser.get_todo_fingerprint(item, os.curdir)
+        return (parser.get_todo_content_for_todoist(item, os.curdir),
+                parser.get_todo_description(item, os.curdir, fingerprint))
+
+    results = {}
+    for name, item_class, format_task in (("legacy", LegacyTodoItem, format_task_legacy),
+                                           ("slotted", TodoItem, format_current)):
+        memory = peak_memory(build, item_class)
+        start = time.perf_counter()
+        items = build(item_class)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        unique = set(items)
+        index = {item: position for position, item in enumerate(items)}
+        assert len(unique) == len(index) == item_count
+        set_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        formatted = [format_task(item) for item in items]
+        format_time = time.perf_counter() - start
+        results[name] = formatted
+        print(f"{name:>12}: items {memory / 1e6:.1f} MB | build {build_time:.3f}s | set/dict {set_time:.3f}s | "
+              f"format {format_time:.3f}s")
+        del items, unique, index
+
+    print(f"identical task content: {results['legacy'] == results['slotted']}")
+
+def peak_memory(function, *args):
+    """Run function(*args) under tracemalloc and return its peak Python allocation in bytes."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def git_commit() -> str:
+    """Commit of the benchmarked tree, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.run(['git', '-C', os.path.dirname(os.path.abspath(__file__)), 'rev-parse', 'HEAD'],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_suite(project_path: str, repeat: int, parameters: dict) -> dict:
+    """Benchmark the scanner entry points over a project and return machine-readable results.
+    
+    Each case reports its best time over repeat runs, files/s and MB/s, and its peak Python
+    memory measured in a separate run under tracemalloc so tracing does not skew the timings.
+    """
+    parser = XcodeParser(Config())
+    source_files = parser.find_source_files(project_path)
+    total_bytes = sum(os.path.getsize(path) for path in source_files)
+
+    def parse_todos():
+        return [todo for path in source_files for todo in parser.parse_file_for_todos(path)]
+
+    def parse_completions():
+        return [item for path in source_files for item in parser.parse_file_for_completions(path)]
+
+    def parse_project():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return parser.parse_project(project_path)
+
+    cases = [
+        ("find_source_files", lambda: parser.find_source_files(project_path)),
+        ("parse_file_for_todos", parse_todos),
+        ("parse_file_for_completions", parse_completions),
+        ("parse_project", parse_project),
+    ]
+
+    results = {}
+    for name, function in cases:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {
+            "seconds": round(best, 6),
+            "files_per_second": round(len(source_files) / best, 1),
+            "mb_per_second": round(total_bytes / best / 1e6, 2),
+            "peak_memory_bytes": peak_memory(function),
+        }
+        print(f"{name:>28}: {best:.3f}s | {results[name]['files_per_second']:>10,.0f} files/s | "
+              f"{results[name]['mb_per_second']:>7.1f} MB/s | peak {results[name]['peak_memory_bytes'] / 1e6:.1f} MB")
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": dict(parameters, source_files=len(source_files), source_bytes=total_bytes, repeat=repeat),
+        "results": results,
+    }
+
+def compare_results(report: dict, baseline_path: str):
+    """Print each case's time and memory relative to a saved baseline report."""
+    try:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading baseline {baseline_path}: {e}")
+        return
+
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit', 'unknown')[:12]}):")
+    if baseline.get("parameters", {}).get("source_bytes") != report["parameters"]["source_bytes"]:
+        print("  Warning: the baseline was measured on a different tree")
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        time_change = (result["seconds"] / old["seconds"] - 1) * 100
+        memory_change = (result["peak_memory_bytes"] / max(old["peak_memory_bytes"], 1) - 1) * 100
+        print(f"{name:>28}: time {time_change:+.1f}% | peak memory {memory_change:+.1f}%")
+
+def run_suite_command(args):
+    """Run the benchmark suite on a given or generated project, then save and compare results."""
+    temp_dir = None
+    project_path = args.project_path
+    parameters = {"project": project_path}
+    if project_path is None:
+        temp_dir = tempfile.mkdtemp(prefix="todoist_sync_bench_")
+        project_path = temp_dir
+        parameters = {"files": args.files, "lines": args.lines, "todo_density": args.todo_density,
+                      "depth": args.depth, "excluded_files": args.excluded_files}
+        print(f"Generating {args.files} files x {args.lines} lines (depth {args.depth}, "
+              f"{args.excluded_files} excluded) in {temp_dir}")
+        create_synthetic_project(Path(temp_dir), args.files, args.lines, args.todo_density,
+                                 depth=args.depth, excluded_files=args.excluded_files)
+    try:
+        report = run_suite(project_path, args.repeat, parameters)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare_results(report, args.compare)
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the TODO scanner")
+    parser.add_argument('project_path', nargs='?', help='Existing project to scan (default: generate one)')
+    parser.add_argument('--files', type=int, default=2000, help='Number of synthetic files to generate')
+    parser.add_argument('--lines', type=int, default=400, help='Lines per synthetic file')
+    parser.add_argument('--todo-density', type=float, default=0.01, help='Fraction of lines that carry a marker')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per strategy (best time is reported)')
+    parser.add_argument('--memory', action='store_true', help='Compare peak RSS when scanning one large file')
+    parser.add_argument('--file-mb', type=int, default=200, help='Size of the large file for --memory')
+    parser.add_argument('--reconcile', action='store_true', help='Benchmark completion matching against existing tasks')
+    parser.add_argument('--tasks', type=int, default=100000, help='Number of existing tasks for --reconcile')
+    parser.add_argument('--completions', type=int, default=2000, help='Number of completions for --reconcile')
+    parser.add_argument('--items', type=int, metavar='N',
+                        help='Compare memory and time of legacy and slotted TodoItems over N synthetic markers')
+    parser.add_argument('--item-files', type=int, default=20000, help='Number of files the --items markers span')
+    parser.add_argument('--suite', action='store_true',
+                        help='Benchmark find_source_files, parse_file_for_todos/completions and parse_project')
+    parser.add_argument('--depth', type=int, default=3, help='Directory nesting of the synthetic tree for --suite')
+    parser.add_argument('--excluded-files', type=int, default=200,
+                        help='Files placed under Pods/DerivedData/build in the synthetic tree for --suite')
+    parser.add_argument('--output', metavar='FILE', help='Write --suite results as JSON to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='Compare --suite results with a previous JSON report')
+    parser.add_argument('--rss-probe', nargs=2, metavar=('MODE', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_probe:
+        rss_probe(*args.rss_probe)
+        return
+
+    if args.reconcile:
+        run_reconcile_benchmark(args.tasks, args.completions)
+        return
+
+    if args.items:
+        run_item_benchmark(args.items, args.item_files)
+        return
+
+    if args.memory:
+        run_memory_benchmark(args.file_mb, args.todo_density)
+        return
+
+    if args.suite:
+        run_suite_command(args)
+        return
+
+    if args.project_path:
+        run_scan_benchmark(args.project_path, args.repeat)
+        return
+
+    temp_dir = tempfile.mkdtemp(prefix="todoist_sync_bench_")
+    try:
+        print(f"Generating {args.files} files x {args.lines} lines in {temp_dir}")
+        create_synthetic_project(Path(temp_dir), args.files, args.lines, args.todo_density)
+        run_scan_benchmark(temp_dir, args.repeat)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
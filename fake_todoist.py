@@ -0,0 +1,322 @@
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+class FakeTodoistServer:
+    """In-process stand-in for the Todoist REST and Sync endpoints used by TodoistClient.
+
+    Serves projects, task listing, create, update, close and delete over REST, plus Sync API
+    command batches and incremental item pulls. Latency, a random server-error rate and a
+    fixed-window request limit (answered with 429 and Retry-After) can be configured to
+    exercise retries and throttling, and fail_next scripts exact failures for tests. Like
+    Todoist, a POST repeating an earlier X-Request-Id gets the earlier response without being
+    applied again, and a Sync API command repeating an applied uuid is not applied twice.
+    Counts calls per endpoint and bytes in both directions.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, rate_limit: int = 0,
+                 rate_window: float = 60.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.version = 0
+        self.projects: List[Dict] = []
+        self.tasks: Dict[str, Dict] = {}
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        # Scripted failures per endpoint, see fail_next
+        self.faults: Dict[str, List[Dict]] = {}
+        # Responses by X-Request-Id, and the status and created task ID of applied commands by uuid
+        self.responses: Dict[str, Tuple[int, object]] = {}
+        self.applied_commands: Dict[str, Tuple[object, Optional[str]]] = {}
+        self.reset_stats()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def reset_stats(self):
+        """Clear the request counters."""
+        with self.lock:
+            self.calls: Dict[str, int] = {}
+            self.bytes_received = 0
+            self.bytes_sent = 0
+            self.rate_limited = 0
+            self.server_errors = 0
+            self.replayed = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "FakeTodoistServer":
+        """Serve on a free local port from a background thread."""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def add_project(self, name: str) -> Dict:
+        with self.lock:
+            project = {"id": str(next(self.ids)), "name": name}
+            self.projects.append(project)
+            return project
+
+    def add_task(self, project_id: str, content: str, description: str = "") -> Dict:
+        with self.lock:
+            return self._create_task({"project_id": project_id, "content": content, "description": description})
+
+    def open_tasks(self, project_id: Optional[str] = None) -> List[Dict]:
+        """Snapshot of open tasks, optionally limited to one project."""
+        with self.lock:
+            return [dict(task) for task in self.tasks.values()
+                    if not task["is_completed"] and (project_id is None or task["project_id"] == str(project_id))]
+
+    def fail_next(self, endpoint: str, status: int, count: int = 1, apply: bool = False):
+        """Answer the next count requests to endpoint (keyed as in stats()["calls"], e.g.
+        "POST /sync") with status instead of serving them.
+
+        With apply, each request is carried out first and only its response is replaced, like
+        a write whose reply was lost.
+        """
+        with self.lock:
+            self.faults.setdefault(endpoint, []).append({"status": status, "count": count, "apply": apply})
+
+    def _take_fault(self, endpoint: str) -> Optional[Dict]:
+        faults = self.faults.get(endpoint)
+        if not faults:
+            return None
+        fault = faults[0]
+        fault["count"] -= 1
+        if not fault["count"]:
+            faults.pop(0)
+        return fault
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "requests": sum(self.calls.values()),
+                "bytes_received": self.bytes_received,
+                "bytes_sent": self.bytes_sent,
+                "rate_limited": self.rate_limited,
+                "server_errors": self.server_errors,
+                "replayed": self.replayed,
+            }
+
+    # Task store; callers hold self.lock
+
+    def _create_task(self, args: Dict) -> Dict:
+        self.version += 1
+        task = {
+            "id": str(next(self.ids)),
+            "project_id": str(args.get("project_id") or ""),
+            "content": args.get("content") or "",
+            "description": args.get("description") or "",
+            "is_completed": False,
+            "version": self.version,
+        }
+        self.tasks[task["id"]] = task
+        return task
+
+    def _update_task(self, task_id: str, args: Dict) -> Optional[Dict]:
+        task = self.tasks.get(str(task_id))
+        if task is None:
+            return None
+        for key in ("content", "description"):
+            if key in args:
+                task[key] = args[key]
+        self.version += 1
+        task["version"] = self.version
+        return task
+
+    def _close_task(self, task_id: str) -> bool:
+        task = self.tasks.get(str(task_id))
+        if task is None:
+            return False
+        task["is_completed"] = True
+        self.version += 1
+        task["version"] = self.version
+        return True
+
+    def _delete_task(self, task_id: str) -> bool:
+        task = self.tasks.get(str(task_id))
+        if task is None:
+            return False
+        task["is_deleted"] = True
+        task["is_completed"] = True
+        self.version += 1
+        task["version"] = self.version
+        return True
+
+    @staticmethod
+    def _public(task: Dict) -> Dict:
+        return {key: value for key, value in task.items() if key not in ("version", "is_deleted")}
+
+    def _throttle(self) -> Optional[float]:
+        """Count a request against the window; return seconds to wait if it is over the limit."""
+        if not self.rate_limit:
+            return None
+        now = time.monotonic()
+        if now - self.window_start >= self.rate_window:
+            self.window_start = now
+            self.window_count = 0
+        self.window_count += 1
+        if self.window_count > self.rate_limit:
+            return self.rate_window - (now - self.window_start)
+        return None
+
+    def handle(self, method: str, path: str, query: Dict, body: Dict):
+        """Route one request; returns (status, response body or None)."""
+        parts = [part for part in path.split('/') if part]
+        with self.lock:
+            if method == "GET" and parts == ["projects"]:
+                return 200, list(self.projects)
+            if method == "GET" and parts == ["tasks"]:
+                project_id = query.get("project_id", [None])[0]
+                return 200, [self._public(task) for task in self.tasks.values()
+                             if not task["is_completed"] and (project_id is None or task["project_id"] == project_id)]
+            if method == "POST" and parts == ["tasks"]:
+                return 200, self._public(self._create_task(body))
+            if method == "POST" and len(parts) == 3 and parts[0] == "tasks" and parts[2] == "close":
+                return (204, None) if self._close_task(parts[1]) else (404, {"error": "task not found"})
+            if method == "POST" and len(parts) == 2 and parts[0] == "tasks":
+                task = self._update_task(parts[1], body)
+                return (200, self._public(task)) if task else (404, {"error": "task not found"})
+            if method == "DELETE" and len(parts) == 2 and parts[0] == "tasks":
+                return (204, None) if self._delete_task(parts[1]) else (404, {"error": "task not found"})
+            if method == "POST" and parts == ["sync"]:
+                return 200, self._sync(body)
+        return 404, {"error": f"unknown endpoint {method} {path}"}
+
+    def _sync(self, body: Dict) -> Dict:
+        if "commands" in body:
+            statuses, temp_ids = {}, {}
+            for command in body["commands"]:
+                applied = self.applied_commands.get(command["uuid"])
+                if applied is not None:
+                    self.replayed += 1
+                    statuses[command["uuid"]], task_id = applied
+                    if task_id:
+                        temp_ids[command.get("temp_id")] = task_id
+                    continue
+                args = command.get("args", {})
+                if command["type"] == "item_add":
+                    temp_ids[command.get("temp_id")] = self._create_task(args)["id"]
+                    ok = True
+                elif command["type"] == "item_update":
+                    ok = self._update_task(args.get("id"), args) is not None
+                elif command["type"] == "item_close":
+                    ok = self._close_task(args.get("id"))
+                elif command["type"] == "item_delete":
+                    ok = self._delete_task(args.get("id"))
+                else:
+                    ok = False
+                statuses[command["uuid"]] = "ok" if ok else {"error": "command failed", "error_code": 1}
+                if ok:
+                    self.applied_commands[command["uuid"]] = ("ok", temp_ids.get(command.get("temp_id")))
+            return {"sync_status": statuses, "temp_id_mapping": temp_ids}
+
+        sync_token = body.get("sync_token", "*")
+        since = 0 if sync_token == "*" else int(sync_token)
+        items = []
+        for task in self.tasks.values():
+            if task["version"] > since and not (since == 0 and task.get("is_deleted")):
+                item = self._public(task)
+                item["checked"] = item.pop("is_completed")
+                item["is_deleted"] = bool(task.get("is_deleted"))
+                items.append(item)
+        return {"sync_token": str(self.version), "full_sync": since == 0, "items": items}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, delayed ACKs stall keep-alive requests
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, status: int, body, headers: Optional[Dict] = None):
+                data = b"" if body is None else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+                with fake.lock:
+                    fake.bytes_sent += len(data)
+
+            def _dispatch(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                url = urlparse(self.path)
+                endpoint = f"{method} {'/'.join('{id}' if part.isdigit() else part for part in url.path.split('/'))}"
+
+                with fake.lock:
+                    fake.calls[endpoint] = fake.calls.get(endpoint, 0) + 1
+                    fake.bytes_received += len(raw)
+                    retry_after = fake._throttle()
+                    fault = fake._take_fault(endpoint) if retry_after is None else None
+                    failed = retry_after is None and fake.error_rate and fake.random.random() < fake.error_rate
+                    if retry_after is not None:
+                        fake.rate_limited += 1
+                    elif failed:
+                        fake.server_errors += 1
+
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if retry_after is not None:
+                    return self._respond(429, {"error": "Too many requests"},
+                                         {"Retry-After": str(max(1, int(retry_after + 0.999)))})
+                if failed:
+                    return self._respond(503, {"error": "Service unavailable"})
+                if fault and not fault["apply"]:
+                    return self._respond(fault["status"], {"error": "Scripted failure"})
+
+                request_id = self.headers.get("X-Request-Id") if method == "POST" else None
+                with fake.lock:
+                    replay = fake.responses.get(request_id) if request_id else None
+                    if replay is not None:
+                        fake.replayed += 1
+                if replay is not None:
+                    return self._respond(*replay)
+
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    return self._respond(400, {"error": "invalid JSON"})
+                status, response = fake.handle(method, url.path, parse_qs(url.query), body)
+                if request_id and status < 500:
+                    with fake.lock:
+                        fake.responses[request_id] = (status, response)
+                if fault:
+                    return self._respond(fault["status"], {"error": "Scripted failure"})
+                self._respond(status, response)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        return Handler
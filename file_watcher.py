@@ -0,0 +1,252 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from xcode_parser import XcodeParser
+
+class InotifyBackend:
+    """Reports changed paths under a project using Linux inotify.
+
+    Every directory a scan would descend into gets a watch (excluded and ignored ones are
+    pruned with the walker's ignore rules); directories created or moved in later are
+    watched as they appear. Blocking in select() keeps idle CPU at zero.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = os.O_CLOEXEC
+
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+                  IN_DELETE_SELF | IN_ONLYDIR)
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, parser: XcodeParser, project_path: str):
+        self.parser = parser
+        self.project_path = os.path.abspath(project_path)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+        self._watch_tree(self.project_path)
+
+    def _watch_tree(self, directory: str):
+        """Add watches for directory and every directory below it that is not excluded or ignored."""
+        for root, _ in self.parser.walker.walk_directories(directory, self.project_path):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), self.WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "inotify watch limit reached (fs.inotify.max_user_watches)")
+                continue
+            self.watches[wd] = root
+
+    def wait(self, timeout: Optional[float]) -> List[str]:
+        """Block up to timeout seconds (forever if None) and return the paths that changed."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        changed = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                changed.extend(self._handle_event(wd, mask, name))
+        return changed
+
+    def _handle_event(self, wd: int, mask: int, name: str) -> List[str]:
+        if mask & self.IN_Q_OVERFLOW:
+            # Events were dropped; the whole project has to be rescanned
+            return [self.project_path]
+        if mask & self.IN_IGNORED:
+            self.watches.pop(wd, None)
+            return []
+
+        directory = self.watches.get(wd)
+        if directory is None or not name:
+            return []
+        path = os.path.join(directory, name)
+
+        if mask & self.IN_ISDIR:
+            if self.parser.is_excluded_dir(name):
+                return []
+            if mask & (self.IN_CREATE | self.IN_MOVED_TO) and os.path.isdir(path):
+                self._watch_tree(path)
+            return [path]
+
+        if Path(name).suffix not in self.parser.config.source_extensions:
+            return []
+        return [path]
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingBackend:
+    """Reports changed paths by comparing modification times between polls.
+
+    The project is walked once. Each poll then stats the known directories and walks again
+    below those whose modification time changed (a file was added, removed, renamed or saved
+    by replacing it). Edits made in place only show in the files' own times; those are
+    checked by a sweep over every known file that runs each poll while files are changing and
+    backs off to every MAX_SWEEP_BACKOFF polls while the project is idle.
+    """
+
+    MAX_SWEEP_BACKOFF = 8
+
+    def __init__(self, parser: XcodeParser, project_path: str, poll_interval: float = 1.0):
+        self.parser = parser
+        self.project_path = os.path.abspath(project_path)
+        self.poll_interval = poll_interval
+        self.directories: Dict[str, int] = {}
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.sweep_every = 1
+        self.polls_since_sweep = 0
+        self._record_tree(self.project_path)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _record_tree(self, top: str) -> Dict[str, Tuple[int, int]]:
+        """Record top and the directories and source files a scan finds below it; return the files."""
+        recorded = {}
+        for directory, source_files in self.parser.walker.walk_directories(top, self.project_path):
+            state = self._stat(directory)
+            if state is None:
+                continue
+            self.directories[directory] = state[0]
+            for file_path in source_files:
+                state = self._stat(file_path)
+                if state is not None:
+                    recorded[file_path] = state
+        self.files.update(recorded)
+        return recorded
+
+    def _poll(self) -> List[str]:
+        changed = set()
+        self.polls_since_sweep += 1
+        swept = self.polls_since_sweep >= self.sweep_every
+        if swept:
+            self.polls_since_sweep = 0
+            for file_path, state in list(self.files.items()):
+                current = self._stat(file_path)
+                if current != state:
+                    changed.add(file_path)
+                    if current is None:
+                        del self.files[file_path]
+                    else:
+                        self.files[file_path] = current
+
+        modified = sorted(directory for directory, mtime in self.directories.items()
+                          if (self._stat(directory) or (None,))[0] != mtime)
+        rewalked: List[str] = []
+        for directory in modified:
+            prefix = directory + os.sep
+            if any(directory.startswith(parent + os.sep) for parent in rewalked):
+                continue
+            rewalked.append(directory)
+            for known in [d for d in self.directories if d == directory or d.startswith(prefix)]:
+                del self.directories[known]
+            before = {file_path: self.files.pop(file_path) for file_path in
+                      [f for f in self.files if f.startswith(prefix)]}
+            after = self._record_tree(directory)
+            changed.update(file_path for file_path in before.keys() | after.keys()
+                           if before.get(file_path) != after.get(file_path))
+
+        if changed:
+            self.sweep_every = 1
+            self.polls_since_sweep = 0
+        elif swept:
+            self.sweep_every = min(self.sweep_every * 2, self.MAX_SWEEP_BACKOFF)
+        return sorted(changed)
+
+    def wait(self, timeout: Optional[float]) -> List[str]:
+        """Poll until something changes or timeout seconds pass (forever if None)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.poll_interval
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.monotonic(), 0.0))
+            time.sleep(delay)
+
+            changed = self._poll()
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+class ProjectWatcher:
+    """Watches a project for source changes and hands them out in debounced batches.
+
+    A batch starts with the first change and ends once no further change arrives for
+    `debounce` seconds (or after `max_delay` seconds), so a burst of saves or a branch
+    checkout becomes a single batch. Uses inotify where available and polling otherwise.
+    """
+
+    def __init__(self, parser: XcodeParser, project_path: str, debounce: float = 0.5,
+                 max_delay: float = 10.0, poll_interval: float = 1.0, use_polling: bool = False):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.backend = None
+        if not use_polling:
+            try:
+                self.backend = InotifyBackend(parser, project_path)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}); falling back to polling")
+        if self.backend is None:
+            self.backend = PollingBackend(parser, project_path, poll_interval)
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if isinstance(self.backend, InotifyBackend) else "polling"
+
+    def next_batch(self, timeout: Optional[float] = None) -> Set[str]:
+        """Block until files change and return the changed file and directory paths.
+
+        With a timeout, returns an empty set if nothing changed within timeout seconds.
+        """
+        changed: Set[str] = set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not changed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return changed
+            changed.update(self.backend.wait(remaining))
+
+        deadline = time.monotonic() + self.max_delay
+        while time.monotonic() < deadline:
+            more = self.backend.wait(self.debounce)
+            if not more:
+                break
+            changed.update(more)
+        return changed
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from scan_cache import BlobScanCache, ScanCache
+from xcode_parser import XcodeParser, TodoItem
+
+class GitError(Exception):
+    """Raised when a git command fails."""
+
+def run_git(repo_path: str, *args: str) -> bytes:
+    """Run a git command in repo_path and return its raw stdout."""
+    try:
+        result = subprocess.run(['git', '-C', repo_path] + list(args),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    except OSError as e:
+        raise GitError(f"could not run git: {e}")
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', errors='replace').strip()
+        raise GitError(f"git {' '.join(args)} failed: {message}")
+    return result.stdout
+
+def split_nul(output: bytes) -> List[str]:
+    """Split NUL-separated git output (-z) into paths."""
+    return [item.decode('utf-8', errors='surrogateescape') for item in output.split(b'\0') if item]
+
+class GitDiffScanner:
+    """Scans only the files git reports as changed since the last successfully synced commit.
+
+    The state file records that commit, the TODO/completion rows of every source file at the
+    time, and which paths differed from the commit (uncommitted or untracked changes), so the
+    next run can rebuild the full TODO set from the previous one plus a rescan of the delta.
+    """
+
+    VERSION = 1
+
+    def __init__(self, parser: XcodeParser, state_path: str):
+        self.parser = parser
+        self.state_path = state_path
+        self.fingerprint = self.state_fingerprint(parser)
+        self.pending_state: Optional[Dict] = None
+
+    @staticmethod
+    def state_fingerprint(parser: XcodeParser) -> str:
+        """Hash the scan settings plus the settings that decide which files are scanned.
+
+        The recorded rows are only valid for the same file set, so turning ignore files on or
+        off, naming another ignore file or excluding other directories forces a full scan.
+        """
+        config = parser.config
+        settings = {
+            "scan": ScanCache.config_fingerprint(config),
+            "respect_gitignore": config.respect_gitignore,
+            "ignore_file": config.ignore_file,
+            "excluded_dirs": sorted(parser.EXCLUDED_DIRS),
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _load_state(self) -> Optional[Dict]:
+        """Load the previous sync state, or None if it is missing, unreadable or stale."""
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable git sync state {self.state_path}: {e}")
+            return None
+        if state.get("version") != self.VERSION or state.get("fingerprint") != self.fingerprint:
+            print("Scan settings changed since the last sync; performing a full scan")
+            return None
+        return state
+
+    def _source_paths(self, paths: List[str]) -> List[str]:
+        """Keep only the paths find_source_files would scan."""
+        return [path for path in paths if self.parser.is_source_path(path)]
+
+    def _list_files(self, project_path: str) -> List[str]:
+        """List tracked and untracked (not ignored) source files under the project."""
+        output = run_git(project_path, 'ls-files', '-z', '--cached', '--others', '--exclude-standard')
+        return sorted(set(self._source_paths(split_nul(output))))
+
+    def _volatile_paths(self, project_path: str) -> List[str]:
+        """List paths whose working-tree contents differ from HEAD, including untracked files."""
+        changed = split_nul(run_git(project_path, 'diff', '--name-only', '-z', '--relative', 'HEAD'))
+        untracked = split_nul(run_git(project_path, 'ls-files', '-z', '--others', '--exclude-standard'))
+        return sorted(set(self._source_paths(changed + untracked)))
+
+    def _changes_since(self, project_path: str, commit: str) -> List[Tuple[str, str, Optional[str]]]:
+        """Return (status, path, renamed_to) entries for the working tree relative to commit."""
+        output = run_git(project_path, 'diff', '--name-status', '-z', '-M', '--relative', commit)
+        items = split_nul(output)
+        changes = []
+        index = 0
+        while index < len(items):
+            status = items[index]
+            if status[0] in ('R', 'C'):
+                changes.append((status, items[index + 1], items[index + 2]))
+                index += 3
+            else:
+                changes.append((status, items[index + 1], None))
+                index += 2
+        return changes
+
+    def scan(self, project_path: str, workers: Optional[int] = None) -> Tuple[List[TodoItem], List[TodoItem]]:
+        """Scan the project, rescanning only files changed since the last synced commit."""
+        print(f"Scanning project: {project_path} (git incremental)")
+
+        if workers is None:
+            workers = self.parser.config.scan_workers
+
+        head = run_git(project_path, 'rev-parse', 'HEAD').decode().strip()
+        state = self._load_state()
+        files: Dict[str, Dict] = {}
+        to_scan: Set[str] = set()
+
+        changes = None
+        if state and state.get("commit"):
+            try:
+                changes = self._changes_since(project_path, state["commit"])
+            except GitError as e:
+                print(f"Warning: cannot diff against last synced commit {state['commit'][:12]} ({e}); "
+                      f"performing a full scan")
+
+        if changes is None:
+            to_scan.update(self._list_files(project_path))
+            print(f"Found {len(to_scan)} source files to scan")
+        else:
+            files = state["files"]
+            for status, path, renamed_to in changes:
+                if status.startswith('R'):
+                    entry = files.pop(path, None)
+                    if self.parser.is_source_path(renamed_to):
+                        # An exact rename keeps its TODOs; anything else is rescanned
+                        if status == 'R100' and entry is not None:
+                            files[renamed_to] = entry
+                        else:
+                            to_scan.add(renamed_to)
+                elif status.startswith('C'):
+                    if self.parser.is_source_path(renamed_to):
+                        to_scan.add(renamed_to)
+                elif status.startswith('D'):
+                    files.pop(path, None)
+                elif self.parser.is_source_path(path):
+                    to_scan.add(path)
+
+            # Paths that differed from the last synced commit may have changed again
+            to_scan.update(state.get("volatile", []))
+            to_scan.update(self._volatile_paths(project_path))
+            print(f"Found {len(to_scan)} changed source files to scan since {state['commit'][:12]}")
+
+        scan_paths = []
+        for relative_path in sorted(to_scan):
+            full_path = str(Path(project_path) / relative_path)
+            if os.path.isfile(full_path):
+                scan_paths.append(full_path)
+            else:
+                files.pop(relative_path, None)
+
+        # Tracked files can still match an ignore pattern; skip them as a full walk would
+        kept = set(self.parser.walker.filter_ignored(scan_paths, project_path))
+        for full_path in scan_paths:
+            if full_path not in kept:
+                files.pop(os.path.relpath(full_path, project_path), None)
+        scan_paths = [full_path for full_path in scan_paths if full_path in kept]
+
+        for full_path, todos, completions in self.parser.scan_files(scan_paths, workers):
+            relative_path = os.path.relpath(full_path, project_path)
+            files[relative_path] = {
+                "todos": self.parser.rows_from_items(todos),
+                "completions": self.parser.rows_from_items(completions),
+            }
+            if todos or completions:
+                print(f"  {full_path}: {len(todos)} TODOs, {len(completions)} completions")
+
+        all_todos = []
+        all_completions = []
+        for relative_path in sorted(files):
+            full_path = str(Path(project_path) / relative_path)
+            all_todos.extend(self.parser.items_from_rows(files[relative_path]["todos"], full_path))
+            all_completions.extend(self.parser.items_from_rows(files[relative_path]["completions"], full_path))
+
+        self.pending_state = {
+            "version": self.VERSION,
+            "fingerprint": self.fingerprint,
+            "commit": head,
+            "volatile": self._volatile_paths(project_path),
+            "files": files,
+        }
+
+        print(f"\nTotal: {len(all_todos)} TODO items, {len(all_completions)} completion items")
+        return all_todos, all_completions
+
+    def mark_synced(self):
+        """Record the scanned commit as successfully synced."""
+        if self.pending_state is None:
+            return
+        temp_path = f"{self.state_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.pending_state, f, separators=(',', ':'))
+            os.replace(temp_path, self.state_path)
+            print(f"Recorded synced commit {self.pending_state['commit'][:12]}")
+        except OSError as e:
+            print(f"Warning: could not write git sync state {self.state_path}: {e}")
+
+class GitCommitScanner:
+    """Scans the source files of a commit straight from the git object store, without a checkout.
+
+    The commit's tree is listed with ls-tree and the blobs not already in the blob cache are
+    streamed through one `git cat-file --batch` process. Results are reported with paths under
+    project_path, as if the commit were checked out there, so tasks match a working-tree sync.
+    Ignore files are not consulted: every tracked source file of the commit is scanned.
+    """
+
+    def __init__(self, parser: XcodeParser, blob_cache: Optional[BlobScanCache] = None):
+        self.parser = parser
+        self.blob_cache = blob_cache or BlobScanCache(None, parser.config)
+
+    def list_blobs(self, project_path: str, revision: str) -> List[Tuple[str, str]]:
+        """(relative_path, blob_sha) of the source files under project_path in revision."""
+        blobs = []
+        for entry in split_nul(run_git(project_path, 'ls-tree', '-r', '-z', revision)):
+            info, _, relative_path = entry.partition('\t')
+            mode, object_type, sha = info.split(' ')
+            # Submodules and symlinks have no scannable contents
+            if object_type != 'blob' or mode == '120000':
+                continue
+            if self.parser.is_source_path(relative_path):
+                blobs.append((relative_path, sha))
+        return blobs
+
+    def read_blobs(self, project_path: str, shas: List[str]) -> Iterator[Tuple[str, bytes]]:
+        """Yield (sha, contents) for each blob, read through a single cat-file process."""
+        if not shas:
+            return
+        try:
+            process = subprocess.Popen(['git', '-C', project_path, 'cat-file', '--batch', '--buffer'],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            raise GitError(f"could not run git: {e}")
+
+        # Requests are written from a thread so neither pipe can fill up and block the other side
+        def write_requests():
+            try:
+                process.stdin.write(''.join(f"{sha}\n" for sha in shas).encode('ascii'))
+                process.stdin.close()
+            except OSError:
+                pass
+        writer = threading.Thread(target=write_requests, daemon=True)
+        writer.start()
+
+        try:
+            for sha in shas:
+                header = process.stdout.readline().split()
+                if len(header) != 3:
+                    raise GitError(f"git cat-file could not read blob {sha}")
+                data = process.stdout.read(int(header[2]))
+                process.stdout.read(1)
+                yield sha, data
+        finally:
+            process.stdout.close()
+            process.kill()
+            process.wait()
+            writer.join()
+
+    def scan(self, project_path: str, revision: str) -> List[Tuple[str, List[TodoItem], List[TodoItem]]]:
+        """Scan revision's source files under project_path, parsing only blobs not seen before."""
+        commit = run_git(project_path, 'rev-parse', '--verify', f"{revision}^{{commit}}").decode().strip()
+        print(f"Scanning project: {project_path} at {revision} ({commit[:12]})")
+
+        blobs = self.list_blobs(project_path, commit)
+        cache = self.blob_cache
+        cache.load()
+        rows: Dict[str, Tuple[List, List]] = {}
+        to_read = []
+        for _, sha in blobs:
+            if sha in rows:
+                continue
+            cached = cache.lookup(sha)
+            if cached is None:
+                to_read.append(sha)
+                rows[sha] = ([], [])
+            else:
+                rows[sha] = cached
+        print(f"Found {len(blobs)} source files, {len(to_read)} blobs to parse")
+
+        paths = {}
+        for relative_path, sha in blobs:
+            paths.setdefault(sha, relative_path)
+        for sha, data in self.read_blobs(project_path, to_read):
+            todos, completions = self.parser.scan_blob(data, os.path.join(project_path, paths[sha]))
+            rows[sha] = (self.parser.rows_from_items(todos), self.parser.rows_from_items(completions))
+            cache.store(sha, *rows[sha])
+        cache.save()
+
+        scan_results = []
+        todo_count = 0
+        completion_count = 0
+        for relative_path, sha in blobs:
+            full_path = os.path.join(project_path, relative_path)
+            todos = self.parser.items_from_rows(rows[sha][0], full_path)
+            completions = self.parser.items_from_rows(rows[sha][1], full_path)
+            if todos or completions:
+                print(f"  {full_path}: {len(todos)} TODOs, {len(completions)} completions")
+            todo_count += len(todos)
+            completion_count += len(completions)
+            scan_results.append((full_path, todos, completions))
+
+        print(f"\nTotal: {todo_count} TODO items, {completion_count} completion items")
+        print(cache.summary())
+        return scan_results
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+End-to-end load harness for the sync path.
+Runs full syncs against a local fake Todoist server at several scales and checks the result.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from config import Config
+from fake_todoist import FakeTodoistServer
+from todoist_sync import TodoistSync
+
+def legacy_task_content(index: int) -> str:
+    """Content of a pre-existing task that a DONE marker in the generated project completes."""
+    return f"Legacy item #{index:07d}"
+
+def create_load_project(root: Path, todo_count: int, completion_count: int, todos_per_file: int = 50):
+    """Write a project with exactly todo_count TODOs and completion_count DONE markers."""
+    markers = [f"    // TODO: Load item #{index:07d}" for index in range(todo_count)]
+    markers += [f"    // DONE: {legacy_task_content(index)}" for index in range(completion_count)]
+
+    for file_index, start in enumerate(range(0, len(markers), todos_per_file)):
+        directory = root / f"Module{file_index % 20}"
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = []
+        for marker in markers[start:start + todos_per_file]:
+            lines.append("    let value = compute(input)")
+            lines.append(marker)
+        with open(directory / f"File{file_index}.swift", 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+def build_config(server: FakeTodoistServer, project_id: str, args) -> Config:
+    """Point a Config at the fake server with the sync options under test."""
+    config = Config()
+    config.todoist_api_token = "load-test-token"
+    config.todoist_api_url = server.url
+    config.todoist_sync_api_url = server.url
+    config.set_project_id(project_id)
+    config.batch_writes = args.batch
+    config.max_in_flight = args.concurrency
+    config.http_max_retries = args.max_retries
+    config.scan_cache_path = None
+    config.git_state_path = None
+    config.state_db_path = None
+    config.journal_path = None
+    config.metrics_json_path = None
+    config.metrics_prometheus_path = None
+    config.scan_revision = None
+    config.blob_cache_path = None
+    return config
+
+def timed_sync(sync: TodoistSync, project_path: str):
+    """Run one sync with its progress output discarded; return (success, seconds)."""
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        success = sync.sync_project(project_path)
+    return success, time.perf_counter() - start
+
+def run_load(todo_count: int, args) -> dict:
+    """Sync a generated project of todo_count TODOs into a fresh fake server, twice, and verify it."""
+    completion_count = max(1, todo_count // 10)
+    server = FakeTodoistServer(latency=args.latency, error_rate=args.error_rate,
+                               rate_limit=args.rate_limit, rate_window=args.rate_window).start()
+    temp_dir = tempfile.mkdtemp(prefix="todoist_sync_load_")
+    try:
+        project = server.add_project("Load test")
+        for index in range(completion_count):
+            server.add_task(project["id"], legacy_task_content(index))
+        create_load_project(Path(temp_dir), todo_count, completion_count)
+
+        sync = TodoistSync(build_config(server, project["id"], args))
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            todos, _ = sync.parser.parse_project(temp_dir)
+        expected = Counter(sync.parser.get_todo_content_for_todoist(todo, temp_dir) for todo in todos)
+
+        server.reset_stats()
+        success, seconds = timed_sync(sync, temp_dir)
+        first = server.stats()
+        client = sync.todoist_client.connection_stats()
+
+        open_tasks = Counter(task["content"] for task in server.open_tasks(project["id"]))
+        correct = sum(1 for content in expected if open_tasks.get(content) == 1)
+        duplicates = sum(count - 1 for content, count in open_tasks.items() if content in expected and count > 1)
+        legacy_open = sum(1 for index in range(completion_count) if open_tasks.get(legacy_task_content(index)))
+
+        # A second sync over the unchanged project, reading tasks back from the server, should write nothing
+        sync.todoist_client.invalidate_cache()
+        server.reset_stats()
+        _, resync_seconds = timed_sync(sync, temp_dir)
+        second = server.stats()
+        sync.todoist_client.close()
+    finally:
+        server.stop()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return {
+        "todos": todo_count,
+        "completions": completion_count,
+        "success": success,
+        "seconds": round(seconds, 3),
+        "api_calls": first["requests"],
+        "calls_by_endpoint": first["calls"],
+        "bytes_sent_by_client": first["bytes_received"],
+        "bytes_received_by_client": first["bytes_sent"],
+        "rate_limited": first["rate_limited"],
+        "server_errors": first["server_errors"],
+        "client_retries": client["retries"],
+        "tasks_correct": correct,
+        "tasks_missing": len(expected) - correct - sum(1 for content in expected if open_tasks.get(content, 0) > 1),
+        "tasks_duplicated": duplicates,
+        "completions_closed": completion_count - legacy_open,
+        "resync_seconds": round(resync_seconds, 3),
+        "resync_writes": sum(count for endpoint, count in second["calls"].items() if not endpoint.startswith("GET")),
+    }
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Load-test full syncs against a local fake Todoist server")
+    parser.add_argument('--todos', type=int, nargs='+', default=[10, 1000, 100000],
+                        help='TODO counts to sync, one run each (default: 10 1000 100000)')
+    parser.add_argument('--batch', action='store_true', help='Sync with batched Sync API writes')
+    parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight when not batching')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the fake server waits per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--rate-limit', type=int, default=0,
+                        help='Requests allowed per --rate-window before answering 429 (0 = unlimited)')
+    parser.add_argument('--rate-window', type=float, default=60.0, help='Rate limit window in seconds')
+    parser.add_argument('--max-retries', type=int, default=5, help='Client retries per request')
+    parser.add_argument('--output', metavar='FILE', help='Write results as JSON to FILE')
+    args = parser.parse_args()
+
+    results = []
+    for todo_count in args.todos:
+        print(f"Syncing {todo_count} TODOs...")
+        result = run_load(todo_count, args)
+        results.append(result)
+        print(f"  {result['seconds']:.2f}s | {result['api_calls']} API calls | "
+              f"{result['bytes_sent_by_client'] / 1e3:.1f} KB sent, {result['bytes_received_by_client'] / 1e3:.1f} KB received | "
+              f"{result['rate_limited']} x 429, {result['server_errors']} x 5xx, {result['client_retries']} retries")
+        print(f"  correct: {result['tasks_correct']}/{todo_count} tasks, {result['tasks_missing']} missing, "
+              f"{result['tasks_duplicated']} duplicated, {result['completions_closed']}/{result['completions']} completions closed")
+        print(f"  resync: {result['resync_seconds']:.2f}s, {result['resync_writes']} writes")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"options": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
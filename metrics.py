@@ -0,0 +1,178 @@
+import json
+import os
+import re
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the API latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "todoist_sync_phase_seconds": ("gauge", "Wall time spent in each phase of the last sync run."),
+    "todoist_sync_files_scanned_total": ("counter", "Source files scanned."),
+    "todoist_sync_files_skipped_total": ("counter", "Source files skipped as binary, minified or with an over-long line, by reason."),
+    "todoist_sync_bytes_scanned_total": ("counter", "Bytes of source read by the scanner."),
+    "todoist_sync_regex_seconds_total": ("counter", "Time spent matching TODO and completion patterns."),
+    "todoist_sync_api_requests_total": ("counter", "Todoist API requests sent, by endpoint and status."),
+    "todoist_sync_api_retries_total": ("counter", "Todoist API requests retried, by endpoint."),
+    "todoist_sync_api_request_bytes_total": ("counter", "Request payload bytes sent, by endpoint."),
+    "todoist_sync_api_response_bytes_total": ("counter", "Response payload bytes received, by endpoint."),
+    "todoist_sync_api_request_duration_seconds": ("histogram", "Todoist API request latency, by endpoint."),
+    "todoist_sync_tasks_total": ("counter", "Tasks added, updated and completed by the sync."),
+    "todoist_sync_last_run_timestamp_seconds": ("gauge", "Unix time the report was written."),
+}
+
+_ID_SEGMENT = re.compile(r'/[^/]*\d[^/]*')
+
+def endpoint_name(method: str, path: str) -> str:
+    """Label an API call by method and path with task IDs templated out, e.g. "POST /tasks/{id}/close"."""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+_NULL_PHASE = nullcontext()
+
+class _Phase:
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.add("todoist_sync_phase_seconds", time.perf_counter() - self.start, phase=self.name)
+
+class Metrics:
+    """Per-run timings and counters shared by the parser, the API client and the sync.
+
+    When disabled (the default) every recording method returns immediately, so
+    instrumented code pays one attribute check. Reports are written as JSON and in the
+    Prometheus text exposition format for the node exporter's textfile collector.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.values: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], List] = {}
+
+    def add(self, name: str, value: float = 1, **labels):
+        """Increase a counter (or accumulate a gauge such as a phase time)."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a sample in a latency histogram."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def reset(self):
+        """Forget everything recorded so far, so the next report covers only the next run.
+
+        Long-lived processes (--watch, --serve) call this at the start of every sync cycle.
+        """
+        with self.lock:
+            self.values.clear()
+            self.histograms.clear()
+
+    def phase(self, name: str):
+        """Context manager adding the wall time of its block to a phase; repeated phases accumulate."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def get(self, name: str, **labels) -> float:
+        return self.values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def phase_summary(self) -> str:
+        """One line listing the time spent in each phase, in the order phases were first entered."""
+        phases = [(dict(labels)["phase"], value) for (name, labels), value in self.values.items()
+                  if name == "todoist_sync_phase_seconds"]
+        return "Phases: " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in phases)
+
+    def to_dict(self) -> Dict:
+        """Group samples by metric name, each with its labels and value (or histogram)."""
+        report: Dict[str, List] = {}
+        with self.lock:
+            for (name, labels), value in sorted(self.values.items()):
+                report.setdefault(name, []).append({"labels": dict(labels), "value": round(value, 6)})
+            for (name, labels), (buckets, total, count) in sorted(self.histograms.items()):
+                report.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": count,
+                    "sum": round(total, 6),
+                    "buckets": {str(bound): buckets[index] for index, bound in enumerate(LATENCY_BUCKETS)},
+                })
+        return report
+
+    @staticmethod
+    def _format_labels(labels: Dict) -> str:
+        if not labels:
+            return ""
+        escaped = []
+        for key, value in labels.items():
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped.append(f'{key}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for name, samples in self.to_dict().items():
+            kind, help_text = HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample in samples:
+                labels = sample["labels"]
+                if kind != "histogram":
+                    lines.append(f"{name}{self._format_labels(labels)} {sample['value']}")
+                    continue
+                for bound, count in sample["buckets"].items():
+                    lines.append(f"{name}_bucket{self._format_labels(dict(labels, le=bound))} {count}")
+                lines.append(f"{name}_bucket{self._format_labels(dict(labels, le='+Inf'))} {sample['count']}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {sample['sum']}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {sample['count']}")
+        return "\n".join(lines) + "\n"
+
+    def _write_atomically(self, path: str, text: str):
+        # The textfile collector may read at any moment, so never expose a partial file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def write_reports(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        """Write the JSON and/or Prometheus reports, reporting failures without raising."""
+        if not self.enabled:
+            return
+        print(self.phase_summary())
+        self.set("todoist_sync_last_run_timestamp_seconds", time.time())
+        for path, render in ((json_path, lambda: json.dumps(self.to_dict(), indent=2)),
+                             (prometheus_path, self.to_prometheus)):
+            if not path:
+                continue
+            try:
+                self._write_atomically(path, render())
+                print(f"Metrics written to {path}")
+            except OSError as e:
+                print(f"Warning: could not write metrics to {path}: {e}")
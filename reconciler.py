@@ -0,0 +1,187 @@
+import os
+import re
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+from xcode_parser import XcodeParser, TodoItem, normalize_todo_text
+
+# Fingerprint line written into task descriptions by XcodeParser.get_todo_description
+FINGERPRINT_PATTERN = re.compile(r'^Fingerprint: ([0-9a-f]+)\s*$', re.MULTILINE)
+
+def task_fingerprint(task: Dict) -> Optional[str]:
+    """Extract the TODO fingerprint stored in a task's description, if any."""
+    match = FINGERPRINT_PATTERN.search(task.get('description') or '')
+    return match.group(1) if match else None
+
+class SubstringIndex:
+    """Aho-Corasick automaton over a set of needles.
+
+    Finds, for every needle, the first haystack that contains it as a substring in a single
+    pass over the haystacks, instead of testing every needle against every haystack.
+    """
+
+    def __init__(self, needles: List[str]):
+        self.needles = needles
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[List[int]] = [[]]
+        self.output_link: List[int] = [-1]
+
+        for needle_id, needle in enumerate(needles):
+            state = 0
+            for char in needle:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.output_link.append(-1)
+                state = next_state
+            self.outputs[state].append(needle_id)
+
+        # Breadth-first pass to compute failure links and links to the nearest matching suffix
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                suffix = self.fail[child]
+                self.output_link[child] = suffix if self.outputs[suffix] else self.output_link[suffix]
+
+    def first_matches(self, haystacks: List[str]) -> Dict[int, int]:
+        """Map each needle ID to the index of the first haystack containing it."""
+        found: Dict[int, int] = {}
+        remaining = len(self.needles)
+
+        for needle_id, needle in enumerate(self.needles):
+            # The empty string is contained in every haystack
+            if not needle and haystacks:
+                found[needle_id] = 0
+                remaining -= 1
+
+        goto, fail, output_link = self.goto, self.fail, self.output_link
+        outputs = [list(ids) for ids in self.outputs]
+        for index, haystack in enumerate(haystacks):
+            if remaining <= 0:
+                break
+            state = 0
+            for char in haystack:
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+
+                match_state = state if outputs[state] else output_link[state]
+                while match_state > 0:
+                    ids = outputs[match_state]
+                    if ids:
+                        for needle_id in ids:
+                            if needle_id not in found:
+                                found[needle_id] = index
+                                remaining -= 1
+                        # Every needle ending here is resolved; later haystacks need not report it
+                        outputs[match_state] = []
+                    match_state = output_link[match_state]
+
+        return found
+
+class Reconciler:
+    """Decides which TODOs to create or update and which tasks to complete against a snapshot of existing tasks.
+    
+    Both the dry run and the real sync go through this class, so they always agree. TODOs are
+    matched to tasks by the fingerprint stored in the task description, falling back to the exact
+    task content for tasks created before fingerprints existed. Paths in task content and
+    fingerprints are relative to project_root; tasks written when they were relative to the
+    working directory are still recognised and rewritten. Completions are matched to the first
+    open task whose content contains the completion text, resolved in one indexed pass; tasks
+    that a scanned TODO already tracks are never completed.
+    """
+
+    CREATE = "create"
+    UPDATE = "update"
+    UNCHANGED = "unchanged"
+
+    def __init__(self, parser: XcodeParser, existing_tasks: List[Dict], project_root: str):
+        self.parser = parser
+        self.project_root = project_root
+        # Earlier versions formatted paths relative to the working directory
+        cwd = os.getcwd()
+        self.legacy_root = None if os.path.abspath(project_root) == cwd else cwd
+        self.existing_tasks = existing_tasks
+        self.open_tasks = [task for task in existing_tasks if not task.get('is_completed', False)]
+        self.tasks_by_content: Dict[str, Dict] = {}
+        self.tasks_by_fingerprint: Dict[str, Dict] = {}
+        for task in existing_tasks:
+            self.tasks_by_content.setdefault(task['content'], task)
+            fingerprint = task_fingerprint(task)
+            if fingerprint:
+                self.tasks_by_fingerprint.setdefault(fingerprint, task)
+        # Occurrences of each (file, normalised text) seen so far, for fingerprinting repeated TODOs
+        self.occurrences: Dict[Tuple[str, str], int] = {}
+        # IDs of tasks matched to a scanned TODO, which completions must not close
+        self.claimed: Set[str] = set()
+
+    def plan_todo(self, todo: TodoItem) -> Tuple[str, str, str, Optional[Dict]]:
+        """Decide what to do with a scanned TODO.
+        
+        Returns (action, content, description, task) where action is CREATE, UPDATE (the task
+        moved or predates fingerprints) or UNCHANGED, and task is the matching existing task.
+        TODOs must be passed in file order, exactly once per sync.
+        """
+        key = (todo.file_path, normalize_todo_text(todo.content))
+        occurrence = self.occurrences.get(key, 0)
+        self.occurrences[key] = occurrence + 1
+        
+        parser = self.parser
+        fingerprint = parser.get_todo_fingerprint(todo, self.project_root, occurrence)
+        content = parser.get_todo_content_for_todoist(todo, self.project_root)
+        description = parser.get_todo_description(todo, self.project_root, fingerprint)
+        
+        task = self.tasks_by_fingerprint.get(fingerprint)
+        if task is None and self.legacy_root:
+            task = self.tasks_by_fingerprint.get(parser.get_todo_fingerprint(todo, self.legacy_root, occurrence))
+            if task is None:
+                task = self.tasks_by_content.get(parser.get_todo_content_for_todoist(todo, self.legacy_root))
+                if task is not None and task_fingerprint(task):
+                    task = None
+        if task is None:
+            task = self.tasks_by_content.get(content)
+            if task is None:
+                return self.CREATE, content, description, None
+            if task_fingerprint(task):
+                # Same text and location, but tracked under another fingerprint; leave it alone
+                self.claimed.add(str(task['id']))
+                return self.UNCHANGED, content, description, task
+        
+        self.claimed.add(str(task['id']))
+        if task['content'] == content and (task.get('description') or '') == description:
+            return self.UNCHANGED, content, description, task
+        return self.UPDATE, content, description, task
+
+    def match_completions(self, completions: List[TodoItem]) -> List[Tuple[TodoItem, Dict]]:
+        """Pair each completion with the first open task containing its text, in completion order.
+        
+        Tasks claimed by plan_todo are skipped, so every TODO must be planned first.
+        """
+        open_tasks = [task for task in self.open_tasks if str(task['id']) not in self.claimed]
+        if not completions or not open_tasks:
+            return []
+
+        needle_ids: Dict[str, int] = {}
+        for completion in completions:
+            needle_ids.setdefault(completion.content, len(needle_ids))
+
+        index = SubstringIndex(list(needle_ids))
+        first_task = index.first_matches([task['content'] for task in open_tasks])
+
+        matches = []
+        for completion in completions:
+            task_index = first_task.get(needle_ids[completion.content])
+            if task_index is not None:
+                matches.append((completion, open_tasks[task_index]))
+        return matches
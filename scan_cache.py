@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+from config import Config
+
+class ScanCache:
+    """On-disk cache of per-file scan results, keyed on file mtime, size and optionally content hash.
+
+    With no cache_path the entries only live in memory and carry over from one scan to the
+    next, as in the resident sync server.
+    """
+
+    VERSION = 1
+
+    def __init__(self, cache_path: Optional[str], config: Config, use_content_hash: bool = False):
+        self.cache_path = cache_path
+        self.use_content_hash = use_content_hash
+        self.fingerprint = self.config_fingerprint(config)
+        self.entries: Dict[str, Dict] = {}
+        self.seen = set()
+        self.pending_stats: Dict[str, os.stat_result] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.invalidated = False
+
+    @staticmethod
+    def config_fingerprint(config: Config) -> str:
+        """Hash the settings that affect scan results, so changing them invalidates the cache."""
+        settings = {
+            "todo_patterns": list(config.todo_patterns),
+            "completion_patterns": list(config.completion_patterns),
+            "source_extensions": sorted(config.source_extensions),
+            "marker_keywords": list(config.marker_keywords),
+            "skip_binary_files": config.skip_binary_files,
+            "minified_line_length": config.minified_line_length,
+            "max_line_bytes": config.max_line_bytes,
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Hash a file's raw contents."""
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def load(self):
+        """Load cached entries from disk, discarding them if the scan settings changed."""
+        entries = self.entries
+        self.entries = {}
+        self.seen = set()
+        self.pending_stats = {}
+        self.hits = self.misses = self.evicted = 0
+        self.invalidated = False
+
+        if self.cache_path is None:
+            self.entries = entries
+            return
+        if not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable scan cache {self.cache_path}: {e}")
+            return
+
+        if data.get("version") != self.VERSION or data.get("fingerprint") != self.fingerprint:
+            self.invalidated = True
+            return
+
+        self.entries = data.get("files", {})
+
+    def save(self):
+        """Write the cache to disk, evicting entries for files that no longer exist in the scan."""
+        stale = [file_path for file_path in self.entries if file_path not in self.seen]
+        for file_path in stale:
+            del self.entries[file_path]
+        self.evicted = len(stale)
+        if self.cache_path is None:
+            return
+
+        data = {
+            "version": self.VERSION,
+            "fingerprint": self.fingerprint,
+            "files": self.entries,
+        }
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: could not write scan cache {self.cache_path}: {e}")
+
+    def lookup(self, file_path: str) -> Optional[Tuple[List[Tuple[str, int, str]], List[Tuple[str, int, str]]]]:
+        """Return the cached (todos, completions) rows for an unchanged file, or None on a miss."""
+        self.seen.add(file_path)
+        entry = self.entries.get(file_path)
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+
+        if entry is not None and entry["size"] == stat.st_size:
+            if entry["mtime_ns"] == stat.st_mtime_ns:
+                self.hits += 1
+                return entry["todos"], entry["completions"]
+
+            # The file was touched (e.g. by a checkout) but its contents may be unchanged
+            if self.use_content_hash and entry.get("sha1"):
+                try:
+                    if self.hash_file(file_path) == entry["sha1"]:
+                        entry["mtime_ns"] = stat.st_mtime_ns
+                        self.hits += 1
+                        return entry["todos"], entry["completions"]
+                except OSError:
+                    pass
+
+        # Remember the pre-scan stat so a file modified during the scan is not cached as fresh
+        self.pending_stats[file_path] = stat
+        self.misses += 1
+        return None
+
+    def store(self, file_path: str, todos: List[Tuple[str, int, str]], completions: List[Tuple[str, int, str]]):
+        """Record the scan results for a file along with its current stat (and hash, if enabled)."""
+        self.seen.add(file_path)
+        try:
+            stat = self.pending_stats.pop(file_path, None) or os.stat(file_path)
+            entry = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "todos": todos,
+                "completions": completions,
+            }
+            if self.use_content_hash:
+                entry["sha1"] = self.hash_file(file_path)
+        except OSError:
+            self.entries.pop(file_path, None)
+            return
+
+        self.entries[file_path] = entry
+
+    def summary(self) -> str:
+        """Describe cache effectiveness for the scan summary."""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        line = f"Scan cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {self.evicted} evicted"
+        if self.invalidated:
+            line += " (invalidated: scan settings changed)"
+        return line
+
+class BlobScanCache:
+    """Scan results keyed by git blob SHA, shared by every commit, branch and tag scanned.
+
+    A blob's contents never change, so its entry needs no stat or hash check: a file with
+    the same contents in two commits is parsed once, and scanning a new commit only parses
+    the blobs it changed. Rows carry no file path, so renamed files hit the cache too.
+    """
+
+    VERSION = 1
+
+    def __init__(self, cache_path: Optional[str], config: Config):
+        self.cache_path = cache_path
+        self.fingerprint = ScanCache.config_fingerprint(config)
+        self.entries: Dict[str, List] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loaded = False
+        self.dirty = False
+
+    def load(self):
+        """Load the cache from disk once, discarding it if the scan settings changed."""
+        self.hits = self.misses = 0
+        if self.loaded or self.cache_path is None or not os.path.exists(self.cache_path):
+            self.loaded = True
+            return
+        self.loaded = True
+
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable blob cache {self.cache_path}: {e}")
+            return
+        if data.get("version") == self.VERSION and data.get("fingerprint") == self.fingerprint:
+            self.entries = data.get("blobs", {})
+
+    def lookup(self, blob_sha: str) -> Optional[Tuple[List[Tuple[str, int, str]], List[Tuple[str, int, str]]]]:
+        """Return the cached (todos, completions) rows of a blob, or None if it was never parsed."""
+        entry = self.entries.get(blob_sha)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def store(self, blob_sha: str, todos: List[Tuple[str, int, str]], completions: List[Tuple[str, int, str]]):
+        self.entries[blob_sha] = [todos, completions]
+        self.dirty = True
+
+    def save(self):
+        """Write the cache to disk if anything was added."""
+        if self.cache_path is None or not self.dirty:
+            return
+        data = {
+            "version": self.VERSION,
+            "fingerprint": self.fingerprint,
+            "blobs": self.entries,
+        }
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.cache_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Warning: could not write blob cache {self.cache_path}: {e}")
+
+    def summary(self) -> str:
+        """Describe cache effectiveness for the scan summary."""
+        return f"Blob cache: {self.hits} blobs reused, {self.misses} parsed, {len(self.entries)} cached"
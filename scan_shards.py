@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+from scan_cache import ScanCache
+from git_scanner import GitError, run_git
+from xcode_parser import XcodeParser, TodoItem
+
+def shard_of(relative_path: str, shard_count: int) -> int:
+    """Shard a project-relative path belongs to; the same on every node and every run."""
+    digest = hashlib.sha1(relative_path.replace(os.sep, '/').encode('utf-8', errors='surrogateescape')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse a 1-based "INDEX/COUNT" shard spec (as in CI node indices) into (index, count), 0-based index."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"invalid shard {value!r}, expected INDEX/COUNT such as 2/8")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard {value!r}, INDEX must be between 1 and COUNT")
+    return index - 1, count
+
+def project_revision(project_path: str) -> Optional[str]:
+    """Commit checked out at project_path, or None outside a git repository."""
+    try:
+        return run_git(project_path, 'rev-parse', '--verify', '-q', 'HEAD').decode('ascii').strip() or None
+    except GitError:
+        return None
+
+def _checksum(manifest: Dict) -> str:
+    payload = {key: value for key, value in manifest.items() if key != "checksum"}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+class ShardManifest:
+    """Scan results of one shard of a project, written by one CI node and merged by another.
+
+    The project's source files are split into shards by a hash of their project-relative
+    path. Each manifest records, besides its shard's TODO and completion rows, a hash of the
+    scan settings, a hash of the project's full source file list and the checked-out commit;
+    the merge refuses manifests that disagree on any of them (a shard scanned from another
+    commit or configuration), that are missing, duplicated or whose checksum does not match.
+    """
+
+    VERSION = 1
+
+    def __init__(self, parser: XcodeParser):
+        self.parser = parser
+
+    @staticmethod
+    def file_list_hash(relative_paths: List[str]) -> str:
+        """Hash of a project's source file list, independent of the order the walk found it in."""
+        joined = '\0'.join(sorted(path.replace(os.sep, '/') for path in relative_paths))
+        return hashlib.sha256(joined.encode('utf-8', errors='surrogateescape')).hexdigest()
+
+    def scan(self, project_path: str, shard_index: int, shard_count: int, manifest_path: str,
+             workers: Optional[int] = None) -> bool:
+        """Scan one shard of a project and write its manifest to manifest_path."""
+        print(f"Scanning project: {project_path} (shard {shard_index + 1}/{shard_count})")
+        if workers is None:
+            workers = self.parser.config.scan_workers
+
+        # Directory listing order differs between checkouts; positions follow the sorted
+        # relative paths so that every node numbers the files the same way
+        source_files = sorted(self.parser.find_source_files(project_path),
+                              key=lambda file_path: os.path.relpath(file_path, project_path).replace(os.sep, '/'))
+        relative_paths = [os.path.relpath(file_path, project_path) for file_path in source_files]
+        selected = [(position, file_path, relative_path)
+                    for position, (file_path, relative_path) in enumerate(zip(source_files, relative_paths))
+                    if shard_of(relative_path, shard_count) == shard_index]
+        print(f"Found {len(source_files)} source files, {len(selected)} in this shard")
+
+        files = []
+        scanned = self.parser.iter_files([file_path for _, file_path, _ in selected], workers)
+        for (position, _, relative_path), (_, todos, completions) in zip(selected, scanned):
+            if todos or completions:
+                files.append([position, relative_path,
+                              self.parser.rows_from_items(todos), self.parser.rows_from_items(completions)])
+
+        manifest = {
+            "version": self.VERSION,
+            "shard": shard_index,
+            "shard_count": shard_count,
+            "settings": ScanCache.config_fingerprint(self.parser.config),
+            "file_list": self.file_list_hash(relative_paths),
+            "revision": project_revision(project_path),
+            "file_count": len(selected),
+            "files": files,
+        }
+        manifest["checksum"] = _checksum(manifest)
+
+        temp_path = f"{manifest_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, separators=(',', ':'))
+            os.replace(temp_path, manifest_path)
+        except OSError as e:
+            print(f"Error writing shard manifest {manifest_path}: {e}")
+            return False
+
+        print(f"Wrote shard {shard_index + 1}/{shard_count} manifest to {manifest_path}")
+        return True
+
+    def _load(self, manifest_path: str) -> Optional[Dict]:
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading shard manifest {manifest_path}: {e}")
+            return None
+        if not isinstance(manifest, dict) or manifest.get("version") != self.VERSION:
+            print(f"Error: {manifest_path} is not a version {self.VERSION} shard manifest")
+            return None
+        if manifest.get("checksum") != _checksum(manifest):
+            print(f"Error: shard manifest {manifest_path} is corrupt (checksum mismatch)")
+            return None
+        return manifest
+
+    def merge(self, project_path: str, manifest_paths: List[str]) -> Optional[List[Tuple[str, List[TodoItem], List[TodoItem]]]]:
+        """Combine shard manifests into per-file scan results, ordered by project-relative path.
+
+        Returns None (after printing why) unless every shard of one scan is present and intact.
+        """
+        manifests = []
+        for manifest_path in manifest_paths:
+            manifest = self._load(manifest_path)
+            if manifest is None:
+                return None
+            manifests.append((manifest_path, manifest))
+        if not manifests:
+            print("Error: no shard manifests given")
+            return None
+
+        # All shards must come from the same scan: same split, settings, file list and commit
+        for key in ("shard_count", "revision", "settings", "file_list"):
+            values = {}
+            for manifest_path, manifest in manifests:
+                values.setdefault(manifest[key], []).append(manifest_path)
+            if len(values) > 1:
+                groups = "; ".join(f"{str(value)[:12]}: {', '.join(paths)}" for value, paths in values.items())
+                print(f"Error: shard manifests disagree on {key} (stale shard?) - {groups}")
+                return None
+
+        shard_count = manifests[0][1]["shard_count"]
+        seen = {}
+        for manifest_path, manifest in manifests:
+            if manifest["shard"] in seen:
+                print(f"Error: {seen[manifest['shard']]} and {manifest_path} are both shard "
+                      f"{manifest['shard'] + 1}/{shard_count}")
+                return None
+            seen[manifest["shard"]] = manifest_path
+        missing = [str(index + 1) for index in range(shard_count) if index not in seen]
+        if missing:
+            print(f"Error: missing shard manifests for shard(s) {', '.join(missing)} of {shard_count}")
+            return None
+
+        revision = manifests[0][1]["revision"]
+        current_revision = project_revision(project_path)
+        if revision and current_revision and revision != current_revision:
+            print(f"Error: shard manifests were scanned at {revision[:12]}, "
+                  f"but {project_path} is at {current_revision[:12]}")
+            return None
+
+        entries = sorted((entry for _, manifest in manifests for entry in manifest["files"]),
+                         key=lambda entry: entry[0])
+        scan_results = []
+        todo_count = 0
+        completion_count = 0
+        for _, relative_path, todo_rows, completion_rows in entries:
+            file_path = os.path.join(project_path, relative_path)
+            todos = self.parser.items_from_rows(todo_rows, file_path)
+            completions = self.parser.items_from_rows(completion_rows, file_path)
+            todo_count += len(todos)
+            completion_count += len(completions)
+            scan_results.append((file_path, todos, completions))
+
+        file_count = sum(manifest["file_count"] for _, manifest in manifests)
+        print(f"Merged {shard_count} shard manifests covering {file_count} source files")
+        print(f"\nTotal: {todo_count} TODO items, {completion_count} completion items")
+        return scan_results
@@ -0,0 +1,124 @@
+import sqlite3
+from typing import Dict, List, Optional
+from todoist_client import TodoistClient
+
+class StateStore:
+    """Local SQLite mirror of Todoist tasks, kept current with incremental Sync API pulls.
+
+    Each task row records its project, content, description and completion state, so a
+    project's tasks can be read without downloading the project. The stored sync token lets
+    each pull fetch only what changed since the last one.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            project_id TEXT,
+            content TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            is_completed INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS tasks_project ON tasks (project_id, is_completed);
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(self.SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def sync_token(self) -> str:
+        """The token of the last successful pull, or "*" if the store has never been synced."""
+        return self._get_meta("sync_token") or "*"
+
+    def _upsert_rows(self, tasks: List[Dict]):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO tasks (id, project_id, content, description, is_completed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(str(task['id']), str(task.get('project_id') or ''), task.get('content') or '',
+              task.get('description') or '', 1 if task.get('is_completed') else 0)
+             for task in tasks]
+        )
+
+    def pull(self, client: TodoistClient) -> bool:
+        """Apply task changes since the last pull, falling back to a full resync if the token is rejected."""
+        sync_token = self.sync_token
+        body = client.sync_items(sync_token)
+        if body is None and sync_token != "*":
+            print("Sync token rejected; performing a full resync")
+            body = client.sync_items("*")
+        if body is None or "sync_token" not in body:
+            return False
+
+        items = body.get("items", [])
+        with self.connection:
+            if body.get("full_sync"):
+                self.connection.execute("DELETE FROM tasks")
+
+            deleted = [str(item['id']) for item in items if item.get('is_deleted')]
+            self.connection.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in deleted])
+            self._upsert_rows([
+                {
+                    'id': item['id'],
+                    'project_id': item.get('project_id'),
+                    'content': item.get('content'),
+                    'description': item.get('description'),
+                    'is_completed': item.get('checked', False),
+                }
+                for item in items if not item.get('is_deleted')
+            ])
+            self._set_meta("sync_token", body["sync_token"])
+
+        kind = "full" if body.get("full_sync") else "incremental"
+        print(f"Pulled {len(items)} changed tasks ({kind} sync)")
+        return True
+
+    def get_tasks(self, project_id: str) -> List[Dict]:
+        """Return the open tasks of a project, shaped like TodoistClient.get_tasks results."""
+        rows = self.connection.execute(
+            "SELECT id, project_id, content, description, is_completed FROM tasks "
+            "WHERE project_id = ? AND is_completed = 0 ORDER BY rowid",
+            (str(project_id),)
+        ).fetchall()
+        return [
+            {
+                'id': row['id'],
+                'project_id': row['project_id'],
+                'content': row['content'],
+                'description': row['description'],
+                'is_completed': bool(row['is_completed']),
+            }
+            for row in rows
+        ]
+
+    def record_task(self, task: Dict, project_id: Optional[str] = None):
+        """Record a task created or updated by this sync."""
+        if project_id and not task.get('project_id'):
+            task = dict(task, project_id=project_id)
+        with self.connection:
+            existing = self.connection.execute("SELECT * FROM tasks WHERE id = ?", (str(task['id']),)).fetchone()
+            if existing is not None:
+                task = dict({key: existing[key] for key in existing.keys()}, **{k: v for k, v in task.items() if v})
+            self._upsert_rows([task])
+
+    def record_completed(self, task_id: str):
+        """Record that this sync closed a task."""
+        with self.connection:
+            self.connection.execute("UPDATE tasks SET is_completed = 1 WHERE id = ?", (str(task_id),))
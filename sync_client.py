@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Thin client for the resident sync server (todoist_sync.py --serve).
+Only uses the standard library so it starts quickly; runs the sync in-process when no server is listening.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Dict, List, Optional
+
+def default_socket_path() -> str:
+    """Socket the server listens on unless TODOIST_SYNC_SOCKET or --socket says otherwise.
+
+    The per-user runtime directory is preferred; without one the socket lives in the user's
+    state directory, never in a shared directory such as /tmp.
+    """
+    if os.environ.get('TODOIST_SYNC_SOCKET'):
+        return os.environ['TODOIST_SYNC_SOCKET']
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], f"todoist_sync-{os.getuid()}.sock")
+    state_dir = os.environ.get('XDG_STATE_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'state')
+    return os.path.join(state_dir, 'todoist_sync', 'sync.sock')
+
+def send_request(socket_path: str, request: Dict) -> Optional[bool]:
+    """Send one request and echo the server's output as it arrives.
+
+    Returns whether the command succeeded, or None if no server is listening on socket_path.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        client.close()
+        return None
+
+    with client, client.makefile('rb') as responses:
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        for line in responses:
+            message = json.loads(line)
+            if "output" in message:
+                sys.stdout.write(message["output"])
+                sys.stdout.flush()
+            elif "success" in message:
+                return message["success"]
+    print("Error: the sync server closed the connection before the command finished")
+    return False
+
+def in_process_argv(args: argparse.Namespace) -> List[str]:
+    """Command line for todoist_sync.py equivalent to a client request."""
+    if args.command == 'list-projects':
+        return ['--list-projects']
+    argv = [args.project_path]
+    if args.command == 'dry-run':
+        argv.append('--dry-run')
+    if args.project_id:
+        argv += ['--project-id', args.project_id]
+    if args.offline:
+        argv.append('--offline')
+    return argv
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Run a sync through the resident sync server, or in-process")
+    parser.add_argument('command', choices=['sync', 'dry-run', 'list-projects', 'stop'],
+                        help='What to run; "stop" shuts the server down')
+    parser.add_argument('project_path', nargs='?', help='Path to the Xcode project (sync and dry-run)')
+    parser.add_argument('--project-id', help='Todoist project ID (default: the server\'s)')
+    parser.add_argument('--offline', action='store_true', help='With dry-run, plan against the local task state only')
+    parser.add_argument('--socket', metavar='PATH', help='Server socket (default: TODOIST_SYNC_SOCKET or a per-user path)')
+    parser.add_argument('--no-fallback', action='store_true', help='Fail instead of syncing in-process without a server')
+    args = parser.parse_args()
+
+    if args.command in ('sync', 'dry-run') and not args.project_path:
+        parser.error(f"project_path is required for {args.command}")
+    if args.project_path:
+        # The server has its own working directory; both it and the in-process fallback get this path
+        args.project_path = os.path.abspath(args.project_path)
+
+    request = {
+        "command": args.command,
+        "project_path": args.project_path,
+        "project_id": args.project_id,
+        "offline": args.offline,
+    }
+    success = send_request(args.socket or default_socket_path(), request)
+    if success is not None:
+        sys.exit(0 if success else 1)
+
+    if args.command == 'stop' or args.no_fallback:
+        print("Error: no sync server is running")
+        sys.exit(1)
+
+    # No server: run the same command in this process
+    import todoist_sync
+    todoist_sync.main(in_process_argv(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import json
+import os
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+class SyncJournal:
+    """Append-only local log of planned Todoist writes and their outcomes.
+
+    Each operation (create, update or close) is written with a stable key before it is sent
+    and marked done once Todoist confirms it. The key doubles as the request's idempotency
+    key (X-Request-Id, or the Sync API command uuid), so a resent operation is not applied
+    twice. Operations still pending when a sync is interrupted or runs out of request budget
+    are picked up by the next run. A partially written last line is ignored.
+    """
+
+    VERSION = 1
+
+    # Order in which pending operations are sent: closes, then updates, then creates
+    KIND_ORDER = {"close": 0, "update": 1, "create": 2}
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self.operations: Dict[str, Dict] = {}
+        self.file = None
+        self._load()
+
+    @staticmethod
+    def new_operation(kind: str, project_id: str, content: str, description: Optional[str] = None,
+                      task_id: Optional[str] = None) -> Dict:
+        """Describe one write; content is the task's (new) content, also used for progress output."""
+        return {"key": str(uuid.uuid4()), "kind": kind, "project_id": str(project_id),
+                "content": content, "description": description, "task_id": task_id}
+
+    def _load(self):
+        if not os.path.exists(self.journal_path):
+            return
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            print(f"Warning: ignoring unreadable sync journal {self.journal_path}: {e}")
+            return
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "version" in record and record["version"] != self.VERSION:
+                print(f"Warning: ignoring sync journal {self.journal_path} written by another version")
+                self.operations = {}
+                return
+            if "op" in record:
+                self.operations[record["op"]["key"]] = record["op"]
+            elif "done" in record or "dropped" in record:
+                self.operations.pop(record.get("done") or record.get("dropped"), None)
+
+    def _append(self, records: Iterable[Dict], sync: bool = False):
+        if self.file is None:
+            new_file = not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) == 0
+            self.file = open(self.journal_path, 'a', encoding='utf-8')
+            if new_file:
+                self.file.write(json.dumps({"version": self.VERSION}) + "\n")
+        self.file.write("".join(json.dumps(record, separators=(',', ':')) + "\n" for record in records))
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def pending(self, project_id: str) -> List[Dict]:
+        """Operations of a project not yet confirmed, in sending order."""
+        operations = [op for op in self.operations.values() if op["project_id"] == str(project_id)]
+        return sorted(operations, key=lambda op: self.KIND_ORDER[op["kind"]])
+
+    def record_planned(self, operations: List[Dict]):
+        """Write operations to disk before any of them is sent."""
+        if not operations:
+            return
+        for op in operations:
+            self.operations[op["key"]] = op
+        self._append(({"op": op} for op in operations), sync=True)
+
+    def record_done(self, key: str, task_id: Optional[str] = None):
+        if self.operations.pop(key, None) is not None:
+            self._append([{"done": key, "task_id": task_id}])
+
+    def record_dropped(self, keys: List[str]):
+        """Forget operations that no longer apply; the next plan recomputes what is still needed."""
+        keys = [key for key in keys if self.operations.pop(key, None) is not None]
+        if keys:
+            self._append({"dropped": key} for key in keys)
+
+    def compact(self):
+        """Rewrite the journal with only the pending operations (removing it when none are left)."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        try:
+            if not self.operations:
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+                return
+            temp_path = f"{self.journal_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"version": self.VERSION}) + "\n")
+                for op in self.operations.values():
+                    f.write(json.dumps({"op": op}, separators=(',', ':')) + "\n")
+            os.replace(temp_path, self.journal_path)
+        except OSError as e:
+            print(f"Warning: could not compact sync journal {self.journal_path}: {e}")
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+def _checksum(data: Dict) -> str:
+    payload = {key: value for key, value in data.items() if key != "checksum"}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+class SyncPlan:
+    """The Todoist writes of one sync, computed by --plan and executed later by --apply.
+
+    Operations have the same shape as sync journal operations (see SyncJournal.new_operation)
+    and keep their keys, which serve as idempotency keys when the plan is applied. The plan
+    also records a version of the project's task state it was computed against, so applying
+    it after the tasks changed can be refused instead of acting on a stale plan.
+    """
+
+    VERSION = 1
+
+    def __init__(self, project_id: str, state_version: str, operations: List[Dict],
+                 project_path: Optional[str] = None):
+        self.project_id = str(project_id)
+        self.state_version = state_version
+        self.operations = operations
+        self.project_path = project_path
+
+    @staticmethod
+    def task_state_version(tasks: List[Dict]) -> str:
+        """Hash of the fields of a project's tasks that planning depends on."""
+        state = sorted((str(task['id']), task.get('content') or '', task.get('description') or '',
+                        bool(task.get('is_completed', False))) for task in tasks)
+        return hashlib.sha256(json.dumps(state, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+    def save(self, plan_path: str) -> bool:
+        """Write the plan to plan_path; returns whether it was written."""
+        data = {
+            "version": self.VERSION,
+            "project_id": self.project_id,
+            "project_path": self.project_path,
+            "state_version": self.state_version,
+            "operations": [{key: value for key, value in op.items() if key != "project_id"}
+                           for op in self.operations],
+        }
+        data["checksum"] = _checksum(data)
+
+        temp_path = f"{plan_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+            os.replace(temp_path, plan_path)
+        except OSError as e:
+            print(f"Error writing sync plan {plan_path}: {e}")
+            return False
+        return True
+
+    @classmethod
+    def load(cls, plan_path: str) -> Optional['SyncPlan']:
+        """Read a plan written by save, or return None (after printing why) if it cannot be used."""
+        try:
+            with open(plan_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading sync plan {plan_path}: {e}")
+            return None
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            print(f"Error: {plan_path} is not a version {cls.VERSION} sync plan")
+            return None
+        if data.get("checksum") != _checksum(data):
+            print(f"Error: sync plan {plan_path} is corrupt or was edited (checksum mismatch)")
+            return None
+
+        project_id = str(data["project_id"])
+        operations = [dict(op, project_id=project_id) for op in data["operations"]]
+        return cls(project_id, data["state_version"], operations, data.get("project_path"))
+
+    def counts(self) -> Dict[str, int]:
+        """Number of operations of each kind."""
+        counts = {"create": 0, "update": 0, "close": 0}
+        for op in self.operations:
+            counts[op["kind"]] += 1
+        return counts
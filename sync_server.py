@@ -0,0 +1,187 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import time
+from contextlib import redirect_stdout
+from typing import Dict
+from scan_cache import ScanCache
+
+class _OutputStream:
+    """File-like stdout replacement that forwards printed text to a client line by line.
+
+    A client that disconnects mid-request does not interrupt the sync; the rest of the
+    output is dropped.
+    """
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.buffer = ""
+        self.connected = True
+
+    def send(self, message: Dict):
+        if not self.connected:
+            return
+        try:
+            self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+        except OSError:
+            self.connected = False
+
+    def write(self, text: str) -> int:
+        self.buffer += text
+        if '\n' in self.buffer:
+            complete, _, self.buffer = self.buffer.rpartition('\n')
+            self.send({"output": complete + '\n'})
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            self.send({"output": self.buffer})
+            self.buffer = ""
+
+class SyncServer:
+    """Long-lived sync process answering sync_client.py requests on a Unix socket.
+
+    One TodoistSync is kept for the server's lifetime, so compiled patterns, the scan worker
+    pool, pooled HTTP connections, the task cache and the request budget stay warm between
+    requests. Each project also gets an in-memory scan cache: files unchanged since the
+    previous request are not re-parsed. Requests are handled one at a time in arrival order.
+    """
+
+    def __init__(self, sync, socket_path: str):
+        self.sync = sync
+        self.socket_path = socket_path
+        self.default_project_id = sync.config.get_project_id()
+        self.scan_caches: Dict[str, ScanCache] = {}
+        self.running = False
+
+    def handle(self, request: Dict) -> bool:
+        """Run one request with stdout already redirected to the client; returns success."""
+        command = request.get("command")
+        if command == "list-projects":
+            self.sync.list_projects()
+            return True
+        if command == "stop":
+            print("Stopping sync server")
+            self.running = False
+            return True
+        if command not in ("sync", "dry-run"):
+            print(f"Error: unknown command {command!r}")
+            return False
+
+        project_path = request.get("project_path")
+        if not project_path:
+            print("Error: project_path is required")
+            return False
+
+        config = self.sync.config
+        config.set_project_id(request.get("project_id") or self.default_project_id)
+        scan_cache = self.scan_caches.get(project_path)
+        if scan_cache is None:
+            scan_cache = self.scan_caches[project_path] = ScanCache(None, config, config.scan_cache_use_hash)
+        self.sync.parser.scan_cache = scan_cache
+
+        self.sync.metrics.reset()
+        with self.sync.metrics.phase("total"):
+            success = self.sync.sync_project(project_path, command == "dry-run", bool(request.get("offline")))
+        self.sync.write_metrics()
+        return success
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline())
+                except ValueError:
+                    return
+                if not isinstance(request, dict):
+                    return
+
+                output = _OutputStream(self.wfile)
+                started = time.perf_counter()
+                with redirect_stdout(output):
+                    try:
+                        success = server.handle(request)
+                    except Exception as e:
+                        print(f"Error: {type(e).__name__}: {e}")
+                        success = False
+                output.flush()
+                output.send({"success": success, "seconds": round(time.perf_counter() - started, 3)})
+                print(f"{request.get('command')} {request.get('project_path') or ''}: "
+                      f"{'ok' if success else 'failed'} in {time.perf_counter() - started:.2f}s")
+
+        return Handler
+
+    def _already_running(self) -> bool:
+        """Whether another server answers on the socket (a stale socket file is not an error)."""
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+
+    def serve_forever(self) -> bool:
+        """Serve requests until a client sends "stop" or the process is interrupted."""
+        try:
+            existing = os.lstat(self.socket_path)
+        except FileNotFoundError:
+            existing = None
+        except OSError as e:
+            print(f"Error: cannot check {self.socket_path}: {e}")
+            return False
+        if existing is not None:
+            if not stat.S_ISSOCK(existing.st_mode):
+                print(f"Error: {self.socket_path} exists and is not a socket; not replacing it")
+                return False
+            if self._already_running():
+                print(f"Error: a sync server is already listening on {self.socket_path}")
+                return False
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error: cannot remove the stale socket {self.socket_path}: {e}")
+                return False
+
+        # Only the current user may connect: the socket, and a directory created for it, get
+        # no group/other access
+        socket_dir = os.path.dirname(self.socket_path)
+        if socket_dir and not os.path.isdir(socket_dir):
+            try:
+                os.makedirs(socket_dir, mode=0o700)
+            except OSError as e:
+                print(f"Error: could not create {socket_dir}: {e}")
+                return False
+        old_umask = os.umask(0o177)
+        try:
+            unix_server = socketserver.UnixStreamServer(self.socket_path, self._handler_class())
+        except OSError as e:
+            print(f"Error: could not listen on {self.socket_path}: {e}")
+            return False
+        finally:
+            os.umask(old_umask)
+
+        self.sync.parser.start_scan_pool(self.sync.config.scan_workers)
+        self.running = True
+        print(f"Sync server listening on {self.socket_path}")
+        try:
+            while self.running:
+                unix_server.handle_request()
+        except KeyboardInterrupt:
+            print("\nStopping sync server")
+        finally:
+            unix_server.server_close()
+            self.sync.parser.close_scan_pool()
+            self.sync.todoist_client.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        return True
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from fake_todoist import FakeTodoistServer
+from todoist_sync import TodoistSync
+
+def build_config(server: FakeTodoistServer, project_id: str, **options) -> Config:
+    """A Config pointed at the fake server, with every on-disk cache and state file off unless given."""
+    config = Config()
+    config.todoist_api_token = "test-token"
+    config.todoist_api_url = server.url
+    config.todoist_sync_api_url = server.url
+    config.set_project_id(project_id)
+    config.http_max_retries = 2
+    config.rate_limit = 0
+    config.scan_cache_path = None
+    config.git_state_path = None
+    config.state_db_path = None
+    config.journal_path = None
+    config.metrics_json_path = None
+    config.metrics_prometheus_path = None
+    config.scan_revision = None
+    config.blob_cache_path = None
+    for key, value in options.items():
+        setattr(config, key, value)
+    return config
+
+@pytest.fixture
+def fake_server():
+    server = FakeTodoistServer().start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def project_id(fake_server):
+    return fake_server.add_project("Tests")["id"]
+
+@pytest.fixture
+def make_sync(fake_server, project_id):
+    """Factory for a TodoistSync against the fake server; keyword arguments override Config attributes."""
+    def make(**options) -> TodoistSync:
+        return TodoistSync(build_config(fake_server, project_id, **options))
+    return make
+
+@pytest.fixture
+def write_project(tmp_path):
+    """Write {relative path: text} files under tmp_path/project and return the project directory."""
+    def write(files, root=None):
+        root = root or tmp_path / "project"
+        for relative_path, text in files.items():
+            path = root / relative_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+        return root
+    return write
+
+class GitRepo:
+    """A throwaway git repository for scanner tests."""
+
+    def __init__(self, root):
+        self.root = root
+        self.git("init", "-q")
+
+    def git(self, *args):
+        subprocess.run(["git", "-C", str(self.root), "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+                       + list(args), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def commit(self, message: str, tag=None):
+        """Commit everything in the working tree, optionally tagging the commit."""
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message)
+        if tag:
+            self.git("tag", tag)
+
+@pytest.fixture
+def git_repo(write_project, tmp_path):
+    """Write {relative path: text} files into a new git repository and return it, uncommitted."""
+    def create(files) -> GitRepo:
+        return GitRepo(write_project(files, tmp_path / "repo"))
+    return create
@@ -0,0 +1,61 @@
+from todoist_client import TodoistClient
+
+def make_client(fake_server, **options) -> TodoistClient:
+    options.setdefault("max_retries", 0)
+    return TodoistClient("test-token", base_url=fake_server.url, sync_url=fake_server.url, **options)
+
+def test_flush_sends_full_batches_in_queue_order(fake_server, project_id):
+    client = make_client(fake_server, batch_size=3)
+    for index in range(7):
+        client.queue_create_task(f"Task {index}", project_id, ref=index)
+
+    results = client.flush_commands(full_batches_only=True)
+    assert [result["ref"] for result in results] == list(range(6))
+    assert client.pending_command_count() == 1
+    results += client.flush_commands()
+    assert client.pending_command_count() == 0
+
+    assert fake_server.stats()["calls"] == {"POST /sync": 3}
+    assert [result["ref"] for result in results] == list(range(7))
+    assert all(result["ok"] and result["error"] is None for result in results)
+    tasks = {task["id"]: task["content"] for task in fake_server.open_tasks(project_id)}
+    assert [tasks[result["task_id"]] for result in results] == [f"Task {index}" for index in range(7)]
+
+def test_failed_commands_are_reported_per_command(fake_server, project_id):
+    task = fake_server.add_task(project_id, "Existing")
+    client = make_client(fake_server)
+    client.queue_create_task("New", project_id, ref="create")
+    client.queue_close_task("999999", ref="missing")
+    client.queue_update_task(task["id"], content="Renamed", ref="update")
+
+    results = {result["ref"]: result for result in client.flush_commands()}
+    assert results["create"]["ok"] and results["create"]["task_id"]
+    assert not results["missing"]["ok"]
+    assert results["missing"]["error"] == "command failed"
+    assert results["missing"]["task_id"] == "999999"
+    assert results["update"]["ok"] and results["update"]["task_id"] == task["id"]
+    assert sorted(t["content"] for t in fake_server.open_tasks(project_id)) == ["New", "Renamed"]
+
+def test_failed_batch_request_fails_every_command(fake_server, project_id):
+    client = make_client(fake_server)
+    client.queue_create_task("One", project_id, ref=1)
+    client.queue_create_task("Two", project_id, ref=2)
+    fake_server.fail_next("POST /sync", 400)
+
+    results = client.flush_commands()
+    assert [result["ref"] for result in results] == [1, 2]
+    assert all(not result["ok"] and result["task_id"] is None and "400" in result["error"] for result in results)
+    assert fake_server.open_tasks(project_id) == []
+
+def test_batched_sync_writes_through_the_sync_api(fake_server, project_id, make_sync, write_project):
+    project = write_project({"App.swift": "".join(f"// TODO: Item {index}\n" for index in range(5))})
+    fake_server.add_task(project_id, "Old item")
+    (project / "Done.swift").write_text("// DONE: Old item\n")
+
+    sync = make_sync(batch_writes=True, batch_size=2)
+    assert sync.sync_project(str(project))
+    assert sync.last_counts == {"added": 5, "updated": 0, "completed": 1}
+    calls = fake_server.stats()["calls"]
+    assert calls["GET /tasks"] == 1 and calls["POST /sync"] == 3 and "POST /tasks" not in calls
+    assert sorted(task["content"] for task in fake_server.open_tasks(project_id)) == [
+        f"Item {index} (App.swift:{index + 1})" for index in range(5)]
@@ -0,0 +1,63 @@
+import os
+
+SOURCES = {
+    "Sources/App.swift": "let a = 1\n// TODO: Wire up the settings screen\nlet b = 2\n// FIXME: Crash on empty input\n",
+    "Sources/Model/Store.swift": "// TODO: Persist the cache\n",
+}
+
+def test_sync_from_another_directory_creates_nothing(fake_server, project_id, make_sync, write_project, tmp_path, monkeypatch):
+    write_project(SOURCES)
+
+    monkeypatch.chdir(tmp_path)
+    assert make_sync().sync_project("project")
+    first = fake_server.open_tasks(project_id)
+    assert len(first) == 3
+    assert sorted(task["content"] for task in first) == [
+        "Crash on empty input (Sources/App.swift:4)",
+        "Persist the cache (Sources/Model/Store.swift:1)",
+        "Wire up the settings screen (Sources/App.swift:2)",
+    ]
+
+    monkeypatch.chdir(tmp_path / "project" / "Sources")
+    fake_server.reset_stats()
+    sync = make_sync()
+    assert sync.sync_project("..")
+    assert sync.last_counts == {"added": 0, "updated": 0, "completed": 0}
+    assert fake_server.stats()["calls"] == {"GET /tasks": 1}
+    assert fake_server.open_tasks(project_id) == first
+
+def test_absolute_and_relative_project_paths_agree(fake_server, project_id, make_sync, write_project, tmp_path, monkeypatch):
+    write_project(SOURCES)
+    monkeypatch.chdir(tmp_path)
+    assert make_sync().sync_project(os.path.join(tmp_path, "project"))
+    first = fake_server.open_tasks(project_id)
+
+    sync = make_sync()
+    assert sync.sync_project("project")
+    assert sync.last_counts == {"added": 0, "updated": 0, "completed": 0}
+    assert fake_server.open_tasks(project_id) == first
+
+def test_tasks_with_working_directory_paths_are_migrated(fake_server, project_id, make_sync, write_project, tmp_path, monkeypatch):
+    project = write_project(SOURCES)
+    monkeypatch.chdir(tmp_path)
+    sync = make_sync()
+    # Tasks as earlier versions wrote them, with paths relative to the working directory
+    for file_path, todos, _ in sync.parser.iter_project("project"):
+        for todo in todos:
+            fingerprint = sync.parser.get_todo_fingerprint(todo, os.curdir)
+            fake_server.add_task(project_id, sync.parser.get_todo_content_for_todoist(todo, os.curdir),
+                                 sync.parser.get_todo_description(todo, os.curdir, fingerprint))
+    legacy_ids = sorted(task["id"] for task in fake_server.open_tasks(project_id))
+
+    sync = make_sync()
+    assert sync.sync_project("project")
+    assert sync.last_counts == {"added": 0, "updated": 3, "completed": 0}
+    tasks = fake_server.open_tasks(project_id)
+    assert sorted(task["id"] for task in tasks) == legacy_ids
+    assert all(task["content"].endswith(("(Sources/App.swift:2)", "(Sources/App.swift:4)",
+                                         "(Sources/Model/Store.swift:1)")) for task in tasks)
+
+    monkeypatch.chdir(project)
+    sync = make_sync()
+    assert sync.sync_project(".")
+    assert sync.last_counts == {"added": 0, "updated": 0, "completed": 0}
@@ -0,0 +1,119 @@
+import shutil
+
+import pytest
+
+from config import Config
+from git_scanner import GitDiffScanner
+from xcode_parser import XcodeParser
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+def todo_set(todos):
+    return sorted((todo.file_path, todo.content, todo.line_number) for todo in todos)
+
+def full_scan(parser, root):
+    todos, _ = parser.parse_project(str(root))
+    return todo_set(todos)
+
+def incremental_scan(parser, root, state_path):
+    scanner = GitDiffScanner(parser, state_path)
+    todos, _ = scanner.scan(str(root))
+    scanner.mark_synced()
+    return todo_set(todos)
+
+def test_incremental_scan_follows_edits_deletes_and_renames(git_repo, tmp_path):
+    repo = git_repo({
+        "Keep.swift": "// TODO: Untouched\n",
+        "Edit.swift": "// TODO: Before\n",
+        "Gone.swift": "// TODO: Deleted soon\n",
+        "Old/Name.swift": "// TODO: Moves with its file\n",
+    })
+    repo.commit("first")
+    parser = XcodeParser(Config())
+    state_path = str(tmp_path / "git_state.json")
+    assert incremental_scan(parser, repo.root, state_path) == full_scan(parser, repo.root)
+
+    (repo.root / "Edit.swift").write_text("// TODO: After\n// FIXME: Added\n")
+    (repo.root / "Gone.swift").unlink()
+    (repo.root / "New").mkdir()
+    repo.git("mv", "Old/Name.swift", "New/Name.swift")
+    (repo.root / "Added.swift").write_text("// TODO: Brand new\n")
+    repo.commit("second")
+    # Uncommitted and untracked changes are picked up as well
+    (repo.root / "Keep.swift").write_text("// TODO: Untouched\n// TODO: Local edit\n")
+    (repo.root / "Scratch.swift").write_text("// TODO: Untracked\n")
+
+    result = incremental_scan(parser, repo.root, state_path)
+    assert result == full_scan(parser, repo.root)
+    contents = [content for _, content, _ in result]
+    assert "Deleted soon" not in contents and "Before" not in contents
+    assert {"After", "Added", "Moves with its file", "Brand new", "Local edit", "Untracked"} <= set(contents)
+
+    # Reverting the local edits is noticed on the next run, although HEAD did not move
+    (repo.root / "Keep.swift").write_text("// TODO: Untouched\n")
+    (repo.root / "Scratch.swift").unlink()
+    assert incremental_scan(parser, repo.root, state_path) == full_scan(parser, repo.root)
+
+def test_unchanged_files_are_not_rescanned(git_repo, tmp_path, capsys):
+    repo = git_repo({f"File{index}.swift": f"// TODO: Item {index}\n" for index in range(10)})
+    repo.commit("first")
+    parser = XcodeParser(Config())
+    state_path = str(tmp_path / "git_state.json")
+    incremental_scan(parser, repo.root, state_path)
+
+    (repo.root / "File3.swift").write_text("// TODO: Item 3 changed\n")
+    repo.commit("second")
+    capsys.readouterr()
+    assert incremental_scan(parser, repo.root, state_path) == full_scan(parser, repo.root)
+    assert "Found 1 changed source files to scan" in capsys.readouterr().out
+
+def test_changed_scan_settings_force_a_full_scan(git_repo, tmp_path, capsys):
+    repo = git_repo({"App.swift": "// TODO: One\n// HACK: Two\n"})
+    repo.commit("first")
+    state_path = str(tmp_path / "git_state.json")
+    incremental_scan(XcodeParser(Config()), repo.root, state_path)
+
+    config = Config()
+    config.marker_keywords = config.marker_keywords + ["HACK"]
+    capsys.readouterr()
+    incremental_scan(XcodeParser(config), repo.root, state_path)
+    assert "performing a full scan" in capsys.readouterr().out
+
+@pytest.mark.parametrize("option, value", [("respect_gitignore", False), ("ignore_file", None),
+                                           ("ignore_file", ".otherignore")])
+def test_changed_walker_settings_force_a_full_scan(git_repo, tmp_path, capsys, option, value):
+    repo = git_repo({
+        ".gitignore": "Generated/\n",
+        ".todoistignore": "Vendor/\n",
+        "App.swift": "// TODO: App\n",
+        "Generated/Model.swift": "// TODO: Generated\n",
+        "Vendor/Lib.swift": "// TODO: Vendored\n",
+    })
+    # A tracked file is still skipped by the walker while .gitignore is respected
+    repo.git("add", "-f", "Generated/Model.swift")
+    repo.commit("first")
+    state_path = str(tmp_path / "git_state.json")
+    assert [content for _, content, _ in incremental_scan(XcodeParser(Config()), repo.root, state_path)] == ["App"]
+
+    config = Config()
+    setattr(config, option, value)
+    parser = XcodeParser(config)
+    capsys.readouterr()
+    result = incremental_scan(parser, repo.root, state_path)
+    assert "Scan settings changed" in capsys.readouterr().out
+    assert result == full_scan(parser, repo.root)
+    assert len(result) == 2
+
+def test_state_is_only_recorded_after_a_successful_sync(git_repo, tmp_path, fake_server, project_id, make_sync):
+    repo = git_repo({"App.swift": "// TODO: One\n"})
+    repo.commit("first")
+    state_path = tmp_path / "git_state.json"
+
+    fake_server.error_rate = 1.0
+    assert not make_sync(git_state_path=str(state_path), http_max_retries=0).sync_project(str(repo.root))
+    assert not state_path.exists()
+
+    fake_server.error_rate = 0.0
+    assert make_sync(git_state_path=str(state_path)).sync_project(str(repo.root))
+    assert state_path.exists()
+    assert [task["content"] for task in fake_server.open_tasks(project_id)] == ["One (App.swift:1)"]
@@ -0,0 +1,81 @@
+import os
+import shutil
+
+import pytest
+
+from config import Config
+from git_scanner import GitCommitScanner, GitError
+from scan_cache import BlobScanCache
+from xcode_parser import XcodeParser
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+@pytest.fixture
+def repo(git_repo):
+    repo = git_repo({
+        "App/Main.swift": "// TODO: Start the app\nlet x = 1\n// DONE: Old launch screen\n",
+        "App/Copy.swift": "// TODO: Start the app\nlet x = 1\n// DONE: Old launch screen\n",
+        "Lib/Util.m": "// FIXME: Leaks on retry\n",
+        "README.txt": "TODO: not a source file\n",
+    })
+    repo.commit("first", tag="v1")
+    (repo.root / "Lib" / "Util.m").write_text("// FIXME: Leaks on retry\n// TODO: Add a timeout\n")
+    repo.commit("second", tag="v2")
+    # Uncommitted work must not show up in commit scans
+    (repo.root / "App" / "Main.swift").write_text("// TODO: Work in progress\n")
+    return repo
+
+def rows(parser, scan_results, root):
+    return {os.path.relpath(file_path, root): (parser.rows_from_items(todos), parser.rows_from_items(completions))
+            for file_path, todos, completions in scan_results if todos or completions}
+
+def test_commit_scan_matches_a_checkout(repo, tmp_path):
+    parser = XcodeParser(Config())
+    for tag in ("v1", "v2"):
+        checkout = tmp_path / f"checkout-{tag}"
+        repo.git("worktree", "add", "-q", "--detach", str(checkout), tag)
+        expected = rows(parser, parser.iter_project(str(checkout)), checkout)
+        assert rows(parser, GitCommitScanner(parser).scan(str(repo.root), tag), repo.root) == expected
+    assert sorted(expected) == ["App/Copy.swift", "App/Main.swift", "Lib/Util.m"]
+    assert len(expected["Lib/Util.m"][0]) == 2
+
+def test_commit_scan_of_a_subdirectory(repo):
+    parser = XcodeParser(Config())
+    results = rows(parser, GitCommitScanner(parser).scan(str(repo.root / "Lib"), "v2"), repo.root / "Lib")
+    assert list(results) == ["Util.m"]
+
+def test_blob_cache_reuses_unchanged_blobs(repo, tmp_path):
+    parser = XcodeParser(Config())
+    cache_path = str(tmp_path / "blobs.json")
+
+    first = BlobScanCache(cache_path, parser.config)
+    GitCommitScanner(parser, first).scan(str(repo.root), "v1")
+    # Main.swift and Copy.swift are the same blob, parsed once
+    assert (first.hits, first.misses) == (0, 2)
+
+    second = BlobScanCache(cache_path, parser.config)
+    results = GitCommitScanner(parser, second).scan(str(repo.root), "v2")
+    assert (second.hits, second.misses) == (1, 1)
+    assert rows(parser, results, repo.root)["Lib/Util.m"][0] == [("Leaks on retry", 1, "FIXME"), ("Add a timeout", 2, "TODO")]
+
+def test_changed_scan_settings_discard_the_blob_cache(repo, tmp_path):
+    parser = XcodeParser(Config())
+    cache_path = str(tmp_path / "blobs.json")
+    GitCommitScanner(parser, BlobScanCache(cache_path, parser.config)).scan(str(repo.root), "v1")
+
+    config = Config()
+    config.marker_keywords = config.marker_keywords + ["HACK"]
+    cache = BlobScanCache(cache_path, config)
+    GitCommitScanner(XcodeParser(config), cache).scan(str(repo.root), "v1")
+    assert cache.hits == 0
+
+def test_unknown_revision_is_an_error(repo):
+    parser = XcodeParser(Config())
+    with pytest.raises(GitError):
+        GitCommitScanner(parser).scan(str(repo.root), "no-such-tag")
+
+def test_sync_from_a_commit(repo, fake_server, project_id, make_sync):
+    sync = make_sync(scan_revision="v1")
+    assert sync.sync_project(str(repo.root))
+    assert sorted(task["content"] for task in fake_server.open_tasks(project_id)) == [
+        "Leaks on retry (Lib/Util.m:1)", "Start the app (App/Copy.swift:1)", "Start the app (App/Main.swift:1)"]
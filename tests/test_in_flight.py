@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from todoist_sync import InFlightRunner
+
+def test_results_are_reported_in_submission_order():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def call(index):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        # Later calls finish first
+        time.sleep(0.02 * (8 - index))
+        with lock:
+            running -= 1
+        return index
+
+    reported = []
+    runner = InFlightRunner(3)
+    for index in range(8):
+        runner.submit(call, (index,), reported.append)
+    runner.close()
+
+    assert reported == list(range(8))
+    assert peak == 3
+
+def test_inline_runner_reports_immediately():
+    reported = []
+    runner = InFlightRunner(1)
+    runner.submit(lambda value: value * 2, (21,), reported.append)
+    assert reported == [42]
+    runner.close()
+
+def test_exception_from_a_call_surfaces_and_the_pool_shuts_down():
+    def call(index):
+        if index == 2:
+            raise ValueError("boom")
+        return index
+
+    reported = []
+    runner = InFlightRunner(4)
+    with pytest.raises(ValueError):
+        for index in range(5):
+            runner.submit(call, (index,), reported.append)
+        runner.close()
+    assert reported == [0, 1]
+    with pytest.raises(RuntimeError):
+        runner.executor.submit(call, 0)
+
+def test_concurrent_sync_reports_in_plan_order_and_survives_failures(fake_server, project_id, make_sync,
+                                                                    write_project, capsys):
+    project = write_project({"App.swift": "".join(f"// TODO: Item {index:02d}\n" for index in range(20))})
+    fake_server.latency = 0.01
+    fake_server.fail_next("POST /tasks", 400, count=3)
+
+    sync = make_sync(max_in_flight=4)
+    assert sync.sync_project(str(project))
+    assert sync.last_counts["added"] == 17
+    output = capsys.readouterr().out
+    assert output.count("✗ Failed to add") == 3
+    reported = [line.split(": ", 1)[1] for line in output.splitlines() if line.startswith(("✓ Added", "✗ Failed to add"))]
+    assert reported == [f"Item {index:02d} (App.swift:{index + 1})" for index in range(20)]
+
+    # The next run creates exactly the three that failed
+    sync = make_sync(max_in_flight=4)
+    assert sync.sync_project(str(project))
+    assert sync.last_counts["added"] == 3
+    contents = sorted(task["content"] for task in fake_server.open_tasks(project_id))
+    assert contents == [f"Item {index:02d} (App.swift:{index + 1})" for index in range(20)]
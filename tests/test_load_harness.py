@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from load_test import build_config, run_load
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_args(**options) -> argparse.Namespace:
+    defaults = dict(batch=False, concurrency=1, latency=0.0, error_rate=0.0, rate_limit=0, rate_window=60.0,
+                    max_retries=5)
+    defaults.update(options)
+    return argparse.Namespace(**defaults)
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"batch": True},
+    {"concurrency": 4},
+    {"concurrency": 4, "error_rate": 0.1},
+], ids=["serial", "batch", "concurrent", "concurrent-errors"])
+def test_small_load_run_is_correct(options):
+    result = run_load(60, load_args(**options))
+    assert result["success"]
+    assert result["tasks_correct"] == 60
+    assert result["tasks_missing"] == 0 and result["tasks_duplicated"] == 0
+    assert result["completions_closed"] == result["completions"] == 6
+    assert result["resync_writes"] == 0
+    if options.get("error_rate"):
+        assert result["client_retries"] == result["server_errors"] > 0
+
+def test_local_state_settings_from_the_environment_are_ignored(fake_server, monkeypatch, tmp_path):
+    # A developer's .env must not make load runs resume journals or write reports into the tree
+    for name in ("TODOIST_SYNC_SCAN_CACHE", "TODOIST_SYNC_GIT_STATE", "TODOIST_SYNC_STATE_DB",
+                 "TODOIST_SYNC_JOURNAL", "TODOIST_SYNC_METRICS_JSON", "TODOIST_SYNC_METRICS_PROM",
+                 "TODOIST_SYNC_BLOB_CACHE"):
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+    config = build_config(fake_server, "1", load_args())
+    for attribute in ("scan_cache_path", "git_state_path", "state_db_path", "journal_path",
+                      "metrics_json_path", "metrics_prometheus_path", "blob_cache_path"):
+        assert getattr(config, attribute) is None, attribute
+
+def test_cli_writes_a_report(tmp_path):
+    output = tmp_path / "load.json"
+    completed = subprocess.run([sys.executable, os.path.join(REPO, "load_test.py"), "--todos", "10", "20",
+                                "--output", str(output)], cwd=tmp_path, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+    report = json.loads(output.read_text())
+    assert [result["todos"] for result in report["results"]] == [10, 20]
+    assert all(result["tasks_correct"] == result["todos"] for result in report["results"])
@@ -0,0 +1,86 @@
+import json
+import shutil
+
+import pytest
+
+from todoist_sync import load_manifest
+
+def write_manifest(tmp_path, data, name="projects.json"):
+    path = tmp_path / name
+    path.write_text(data if isinstance(data, str) else json.dumps(data))
+    return str(path)
+
+def open_contents(fake_server, project_id):
+    return sorted(task["content"] for task in fake_server.open_tasks(project_id))
+
+def test_manifest_paths_are_resolved_against_its_directory(tmp_path):
+    manifest = write_manifest(tmp_path, [
+        {"path": "App", "project_id": 123, "scan_cache": "cache/app.json", "git_state": "state/app.json"},
+        {"path": "/abs/Lib", "project_id": "456"},
+    ])
+    assert load_manifest(manifest) == [
+        {"path": str(tmp_path / "App"), "project_id": "123",
+         "scan_cache": str(tmp_path / "cache" / "app.json"), "git_state": str(tmp_path / "state" / "app.json")},
+        {"path": "/abs/Lib", "project_id": "456"},
+    ]
+    # The short form maps paths to project IDs
+    assert load_manifest(write_manifest(tmp_path, {"App": "1", "Lib": 2}, "short.json")) == [
+        {"path": str(tmp_path / "App"), "project_id": "1"},
+        {"path": str(tmp_path / "Lib"), "project_id": "2"},
+    ]
+
+@pytest.mark.parametrize("data, message", [
+    ("{not json", "Error reading manifest"),
+    ([], "lists no projects"),
+    ({}, "lists no projects"),
+    ("\"projects\"", "lists no projects"),
+    ([{"path": "App", "project_id": "1"}, {"path": "Lib"}], "manifest entry 2 needs a path and a project_id"),
+    ([{"project_id": "1"}], "manifest entry 1 needs a path and a project_id"),
+    (["App"], "manifest entry 1 needs a path and a project_id"),
+], ids=["invalid-json", "empty-list", "empty-object", "not-a-list", "no-project-id", "no-path", "not-an-object"])
+def test_invalid_manifests_are_rejected(tmp_path, capsys, data, message):
+    assert load_manifest(write_manifest(tmp_path, data)) is None
+    assert message in capsys.readouterr().out
+
+def test_missing_manifest_is_rejected(tmp_path, capsys, make_sync):
+    assert not make_sync().sync_manifest(str(tmp_path / "missing.json"))
+    assert "Error reading manifest" in capsys.readouterr().out
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_each_project_uses_only_its_own_settings(fake_server, make_sync, git_repo, write_project, tmp_path, capsys):
+    repo = git_repo({"Repo.swift": "// TODO: In the repository\n"})
+    repo.commit("first")
+    plain = write_project({"Plain.swift": "// TODO: Not in git\n"}, tmp_path / "plain")
+    repo_project = fake_server.add_project("Repo")["id"]
+    plain_project = fake_server.add_project("Plain")["id"]
+    manifest = write_manifest(tmp_path, [
+        {"path": str(repo.root), "project_id": repo_project, "git_state": "repo_state.json"},
+        {"path": str(plain), "project_id": plain_project, "scan_cache": "plain_cache.json"},
+    ])
+
+    assert make_sync().sync_manifest(manifest)
+    out = capsys.readouterr().out
+    assert open_contents(fake_server, repo_project) == ["In the repository (Repo.swift:1)"]
+    assert open_contents(fake_server, plain_project) == ["Not in git (Plain.swift:1)"]
+    # The git state of the first project is not used for the second, which is not a repository
+    assert (tmp_path / "repo_state.json").exists()
+    assert "git incremental scan unavailable" not in out
+    with open(tmp_path / "plain_cache.json") as f:
+        assert list(json.load(f)["files"]) == [str(plain / "Plain.swift")]
+
+def test_failed_project_does_not_stop_the_others(fake_server, make_sync, write_project, tmp_path, capsys):
+    first = write_project({"First.swift": "// TODO: First\n"}, tmp_path / "first")
+    second = write_project({"Second.swift": "// TODO: Second\n"}, tmp_path / "second")
+    first_project = fake_server.add_project("First")["id"]
+    second_project = fake_server.add_project("Second")["id"]
+    manifest = write_manifest(tmp_path, {str(first): first_project, str(second): second_project})
+
+    # Every attempt to fetch the first project's tasks fails
+    fake_server.fail_next("GET /tasks", 503, count=3)
+    sync = make_sync()
+    assert not sync.sync_manifest(manifest)
+    out = capsys.readouterr().out
+    assert open_contents(fake_server, first_project) == []
+    assert open_contents(fake_server, second_project) == ["Second (Second.swift:1)"]
+    assert "FAILED" in out and "(1 failed)" in out
+    assert sync.config.get_project_id() == second_project
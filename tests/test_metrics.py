@@ -0,0 +1,29 @@
+import json
+
+from metrics import Metrics
+from sync_server import SyncServer
+
+def test_reset_forgets_counters_and_histograms():
+    metrics = Metrics(True)
+    metrics.add("todoist_sync_files_scanned_total", 3)
+    metrics.observe("todoist_sync_api_request_duration_seconds", 0.2, endpoint="GET /tasks")
+    metrics.reset()
+    assert metrics.to_dict() == {}
+
+def test_server_reports_cover_one_request(fake_server, project_id, make_sync, write_project, tmp_path):
+    project = write_project({"App.swift": "// TODO: One\n// TODO: Two\n"})
+    report_path = tmp_path / "metrics.json"
+    server = SyncServer(make_sync(metrics_json_path=str(report_path)), str(tmp_path / "sync.sock"))
+
+    def report():
+        samples = json.loads(report_path.read_text())
+        return {name: sum(sample["value"] for sample in samples.get(name, []))
+                for name in ("todoist_sync_tasks_total", "todoist_sync_files_scanned_total")}
+
+    request = {"command": "sync", "project_path": str(project)}
+    assert server.handle(request)
+    assert report() == {"todoist_sync_tasks_total": 2, "todoist_sync_files_scanned_total": 1}
+
+    (project / "App.swift").write_text("// TODO: One\n// TODO: Two\n// TODO: Three\n")
+    assert server.handle(request)
+    assert report() == {"todoist_sync_tasks_total": 1, "todoist_sync_files_scanned_total": 1}
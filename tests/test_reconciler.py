@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from reconciler import SubstringIndex
+
+def open_contents(fake_server, project_id):
+    return sorted(task["content"] for task in fake_server.open_tasks(project_id))
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_task_tracked_by_a_todo_is_not_completed(fake_server, project_id, make_sync, write_project, tmp_path,
+                                                 capsys, journal):
+    project = write_project({"a.swift": "// TODO: one\n// TODO: two\n"})
+    options = {"journal_path": str(tmp_path / "journal")} if journal else {}
+    assert make_sync(**options).sync_project(str(project))
+
+    # The TODO moved down and a DONE with the same text took its place
+    write_project({"a.swift": "// TODO: one\n// DONE: two\n\n// TODO: two\n"})
+    sync = make_sync(**options)
+    capsys.readouterr()
+    assert sync.sync_project(str(project))
+    assert sync.last_counts == {"added": 0, "updated": 1, "completed": 0}
+    assert "✓ Completed" not in capsys.readouterr().out
+    assert open_contents(fake_server, project_id) == ["one (a.swift:1)", "two (a.swift:4)"]
+
+    assert make_sync(**options).sync_project(str(project), dry_run=True)
+    assert "No changes needed" in capsys.readouterr().out
+
+def test_completion_still_closes_a_task_no_todo_tracks(fake_server, project_id, make_sync, write_project):
+    project = write_project({"a.swift": "// TODO: one\n// TODO: two\n"})
+    assert make_sync().sync_project(str(project))
+
+    write_project({"a.swift": "// TODO: one\n// DONE: two\n"})
+    sync = make_sync()
+    assert sync.sync_project(str(project))
+    assert sync.last_counts == {"added": 0, "updated": 0, "completed": 1}
+    assert open_contents(fake_server, project_id) == ["one (a.swift:1)"]
+
+def naive_first_matches(needles, haystacks):
+    found = {}
+    for needle_id, needle in enumerate(needles):
+        for index, haystack in enumerate(haystacks):
+            if needle in haystack:
+                found[needle_id] = index
+                break
+    return found
+
+@pytest.mark.parametrize("needles, haystacks", [
+    # Nested needles: each is a prefix, suffix or infix of another
+    (["he", "she", "his", "hers", "her", "e", "s"], ["ushers", "his", "hershe"]),
+    (["abc", "bc", "c", "abcd", "bcd"], ["xabcx", "zzbcd", "abcd"]),
+    # Overlapping occurrences and needles only found through failure links
+    (["aa", "aaa", "aaaa", "ab", "ba"], ["a", "aab", "aaaa", "ba"]),
+    (["abab", "bab", "abba"], ["ababa", "abba"]),
+    # Duplicate and empty needles
+    (["same", "same", "", "x"], ["a same thing", "x"]),
+    (["", "a"], []),
+    (["missing"], ["nothing", "here"]),
+])
+def test_substring_index_matches_naive_search(needles, haystacks):
+    assert SubstringIndex(needles).first_matches(haystacks) == naive_first_matches(needles, haystacks)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_substring_index_matches_naive_search_on_random_text(seed):
+    rng = random.Random(seed)
+    alphabet = "ab" if seed % 2 else "abc"
+    def text(low, high):
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(low, high)))
+    needles = [text(0, 5) for _ in range(rng.randint(1, 30))]
+    haystacks = [text(0, 12) for _ in range(rng.randint(0, 15))]
+    index = SubstringIndex(needles)
+    expected = naive_first_matches(needles, haystacks)
+    assert index.first_matches(haystacks) == expected, (needles, haystacks)
+    # The automaton is not consumed by a search
+    assert index.first_matches(haystacks) == expected
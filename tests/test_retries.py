@@ -0,0 +1,89 @@
+import time
+
+from fake_todoist import FakeTodoistServer
+from todoist_client import TodoistClient
+
+def make_client(fake_server, **options) -> TodoistClient:
+    options.setdefault("max_retries", 3)
+    options.setdefault("backoff_factor", 0.001)
+    return TodoistClient("test-token", base_url=fake_server.url, sync_url=fake_server.url, **options)
+
+def test_server_errors_are_retried_until_success(fake_server, project_id):
+    fake_server.add_task(project_id, "Existing")
+    fake_server.fail_next("GET /tasks", 503, count=2)
+    client = make_client(fake_server)
+
+    assert [task["content"] for task in client.get_tasks(project_id)] == ["Existing"]
+    assert fake_server.stats()["calls"] == {"GET /tasks": 3}
+    assert client.connection_stats()["retries"] == 2
+
+def test_retries_stop_after_max_retries(fake_server, project_id):
+    fake_server.fail_next("GET /tasks", 502, count=5)
+    client = make_client(fake_server, max_retries=2)
+
+    assert client.get_tasks(project_id) is None
+    assert fake_server.stats()["calls"] == {"GET /tasks": 3}
+
+def test_client_errors_are_not_retried(fake_server, project_id):
+    fake_server.fail_next("POST /tasks", 400)
+    client = make_client(fake_server)
+
+    assert client.create_task("Rejected", project_id) is None
+    assert fake_server.stats()["calls"] == {"POST /tasks": 1}
+    assert fake_server.open_tasks(project_id) == []
+
+def test_backoff_honours_retry_after():
+    server = FakeTodoistServer(rate_limit=1, rate_window=1.0).start()
+    try:
+        project = server.add_project("Throttled")
+        client = make_client(server)
+        assert client.get_tasks(project["id"]) == []
+        client.invalidate_cache()
+        start = time.monotonic()
+        assert client.get_tasks(project["id"]) == []
+        assert time.monotonic() - start >= 0.9
+        assert server.stats()["rate_limited"] == 1
+    finally:
+        server.stop()
+
+def test_retried_create_reuses_its_request_id(fake_server, project_id):
+    # The first attempt is applied but its reply is lost; the retry must not create a second task
+    fake_server.fail_next("POST /tasks", 503, apply=True)
+    client = make_client(fake_server)
+
+    task = client.create_task("Once", project_id)
+    assert task is not None
+    assert [t["id"] for t in fake_server.open_tasks(project_id)] == [task["id"]]
+    stats = fake_server.stats()
+    assert stats["calls"] == {"POST /tasks": 2}
+    assert stats["replayed"] == 1
+
+def test_explicit_request_id_makes_a_repeated_create_a_no_op(fake_server, project_id):
+    client = make_client(fake_server)
+    first = client.create_task("Journalled", project_id, request_id="op-1")
+    second = client.create_task("Journalled", project_id, request_id="op-1")
+    assert first == second
+    assert len(fake_server.open_tasks(project_id)) == 1
+
+def test_resent_command_uuid_is_applied_once(fake_server, project_id):
+    client = make_client(fake_server)
+    client.queue_create_task("Batched", project_id, command_id="command-1")
+    first = client.flush_commands()
+    client.queue_create_task("Batched", project_id, command_id="command-1")
+    second = client.flush_commands()
+
+    assert first[0]["ok"] and second[0]["ok"]
+    assert first[0]["task_id"] == second[0]["task_id"]
+    assert len(fake_server.open_tasks(project_id)) == 1
+    assert fake_server.stats()["replayed"] == 1
+
+def test_lost_batch_reply_is_retried_without_reapplying(fake_server, project_id):
+    fake_server.fail_next("POST /sync", 500, apply=True)
+    client = make_client(fake_server)
+    client.queue_create_task("A", project_id, ref="a")
+    client.queue_create_task("B", project_id, ref="b")
+
+    results = client.flush_commands()
+    assert all(result["ok"] for result in results)
+    assert sorted(task["content"] for task in fake_server.open_tasks(project_id)) == ["A", "B"]
+    assert fake_server.stats()["calls"] == {"POST /sync": 2}
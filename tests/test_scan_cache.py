@@ -0,0 +1,125 @@
+import json
+import os
+
+from config import Config
+from scan_cache import ScanCache
+from xcode_parser import XcodeParser
+
+FILES = {
+    "App/Main.swift": "// TODO: Start\n// DONE: Launch screen\n",
+    "App/View.swift": "// FIXME: Layout\n",
+    "Lib/Util.m": "int x = 1;\n",
+}
+
+def make_parser(cache_path, **options) -> XcodeParser:
+    config = Config()
+    config.scan_cache_path = str(cache_path)
+    for key, value in options.items():
+        setattr(config, key, value)
+    return XcodeParser(config)
+
+def scan(parser, project):
+    todos, completions = parser.parse_project(str(project))
+    cache = parser.scan_cache
+    return (cache.hits, cache.misses), sorted(str(item) for item in todos + completions)
+
+def touch(path, offset_ns=10_000_000_000):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+def test_unchanged_files_are_served_from_the_cache(write_project, tmp_path):
+    project = write_project(FILES)
+    cache_path = tmp_path / "cache.json"
+    counts, expected = scan(make_parser(cache_path), project)
+    assert counts == (0, 3)
+
+    # A new process with the same settings reuses every entry
+    assert scan(make_parser(cache_path), project) == ((3, 0), expected)
+    assert len(expected) == 3
+
+def test_mtime_or_size_changes_are_rescanned(write_project, tmp_path):
+    project = write_project(FILES)
+    cache_path = tmp_path / "cache.json"
+    scan(make_parser(cache_path), project)
+
+    main = project / "App" / "Main.swift"
+    main.write_text("// TODO: Start now\n// DONE: Launch screen\n")
+    touch(project / "App" / "View.swift")
+    counts, results = scan(make_parser(cache_path), project)
+    assert counts == (1, 2)
+    assert f"TODO: Start now ({main}:1)" in results
+
+def test_content_hash_keeps_touched_files_cached(write_project, tmp_path):
+    project = write_project(FILES)
+    cache_path = tmp_path / "cache.json"
+    scan(make_parser(cache_path, scan_cache_use_hash=True), project)
+
+    touch(project / "App" / "View.swift")
+    # Same size and a new mtime, but different contents: the hash catches it
+    main = project / "App" / "Main.swift"
+    main.write_text(main.read_text().replace("Start", "Stop!"))
+    touch(main)
+    counts, results = scan(make_parser(cache_path, scan_cache_use_hash=True), project)
+    assert counts == (2, 1)
+    assert f"TODO: Stop! ({main}:1)" in results
+
+    assert scan(make_parser(cache_path, scan_cache_use_hash=True), project)[0] == (3, 0)
+
+def test_changed_scan_settings_invalidate_the_cache(write_project, tmp_path):
+    project = write_project(FILES)
+    cache_path = tmp_path / "cache.json"
+    scan(make_parser(cache_path), project)
+
+    parser = make_parser(cache_path, completion_patterns=[])
+    counts, results = scan(parser, project)
+    assert counts == (0, 3)
+    assert parser.scan_cache.invalidated
+    assert not any(line.startswith("DONE") for line in results)
+
+    assert ScanCache.config_fingerprint(Config()) != ScanCache.config_fingerprint(parser.config)
+    for option, value in [("skip_binary_files", False), ("max_line_bytes", 1024),
+                          ("source_extensions", {".swift"}), ("marker_keywords", ["TODO"])]:
+        config = Config()
+        setattr(config, option, value)
+        assert ScanCache.config_fingerprint(config) != ScanCache.config_fingerprint(Config()), option
+
+def test_deleted_files_are_evicted(write_project, tmp_path):
+    project = write_project(FILES)
+    cache_path = tmp_path / "cache.json"
+    scan(make_parser(cache_path), project)
+
+    (project / "Lib" / "Util.m").unlink()
+    parser = make_parser(cache_path)
+    assert scan(parser, project)[0] == (2, 0)
+    assert parser.scan_cache.evicted == 1
+    with open(cache_path) as f:
+        assert sorted(os.path.relpath(path, project) for path in json.load(f)["files"]) == [
+            os.path.join("App", "Main.swift"), os.path.join("App", "View.swift")]
+
+def test_file_changed_during_the_scan_is_not_cached_as_fresh(write_project, tmp_path):
+    project = write_project(FILES)
+    cache_path = tmp_path / "cache.json"
+    parser = make_parser(cache_path)
+    main = str(project / "App" / "Main.swift")
+
+    scan_file = parser.scan_file
+    def scan_then_edit(file_path):
+        result = scan_file(file_path)
+        if file_path == main:
+            with open(main, "a") as f:
+                f.write("// TODO: Written while scanning\n")
+        return result
+    parser.scan_file = scan_then_edit
+    scan(parser, project)
+
+    counts, results = scan(make_parser(cache_path), project)
+    assert counts == (2, 1)
+    assert f"TODO: Written while scanning ({main}:3)" in results
+
+def test_unreadable_cache_is_ignored(write_project, tmp_path, capsys):
+    project = write_project(FILES)
+    cache_path = tmp_path / "cache.json"
+    cache_path.write_text("{not json")
+    assert scan(make_parser(cache_path), project)[0] == (0, 3)
+    assert "ignoring unreadable scan cache" in capsys.readouterr().out
+    assert scan(make_parser(cache_path), project)[0] == (3, 0)
@@ -0,0 +1,48 @@
+import io
+import tracemalloc
+
+from config import Config
+from metrics import Metrics
+from xcode_parser import XcodeParser
+
+def make_parser(**options) -> XcodeParser:
+    config = Config()
+    for key, value in options.items():
+        setattr(config, key, value)
+    parser = XcodeParser(config)
+    parser.metrics = Metrics(True)
+    return parser
+
+def skipped(parser: XcodeParser, reason: str) -> float:
+    return parser.metrics.get("todoist_sync_files_skipped_total", reason=reason)
+
+def test_single_line_minified_file_is_skipped_from_the_first_block():
+    data = b"var a=1;" * (8 * 1024 * 1024) + b"// TODO: never seen\n"
+    parser = make_parser()
+
+    tracemalloc.start()
+    try:
+        assert parser.scan_blob(data, "bundle.min.js") == ([], [])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert skipped(parser, "minified") == 1
+    # Only the first block is read, not the whole 64MB line
+    assert peak < 4 * parser.READ_CHUNK_SIZE
+
+def test_over_long_line_is_skipped_or_scanned_in_text_mode():
+    head = b"".join(b"let value%d = %d\n" % (index, index) for index in range(200)) + b"// TODO: before\n"
+    data = head + b"x" * (3 * 1024 * 1024) + b"\n// TODO: after\n"
+
+    parser = make_parser(max_line_bytes=1024 * 1024)
+    assert parser.scan_blob(data, "Generated.swift") == ([], [])
+    assert skipped(parser, "long_line") == 1
+
+    parser = make_parser(max_line_bytes=1024 * 1024, skip_binary_files=False)
+    todos, _ = parser.scan_blob(data, "Generated.swift")
+    assert [(todo.content, todo.line_number) for todo in todos] == [("before", 201), ("after", 203)]
+
+def test_long_lines_under_the_limit_match_the_text_scan():
+    data = b"// TODO: first\n" + b"y" * (3 * 1024 * 1024) + b" // TODO: tail\n// FIXME: last\n"
+    parser = make_parser(skip_binary_files=False)
+    assert parser.scan_blob(data, "Long.swift") == parser._scan_file_text("Long.swift", lambda: io.BytesIO(data))
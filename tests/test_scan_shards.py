@@ -0,0 +1,61 @@
+from config import Config
+from scan_shards import ShardManifest
+from xcode_parser import XcodeParser
+
+FILES = {f"Sources/File{index}.swift": f"// TODO: Item {index}\n// DONE: Old {index}\n" for index in range(8)}
+
+def scan_shards(parser, project, tmp_path, shard_count, prefix):
+    paths = []
+    for index in range(shard_count):
+        manifest_path = str(tmp_path / f"{prefix}-{index + 1}.json")
+        assert ShardManifest(parser).scan(str(project), index, shard_count, manifest_path, workers=1)
+        paths.append(manifest_path)
+    return paths
+
+def merged_rows(parser, scan_results, project):
+    return [(parser.relative_path(file_path, str(project)), parser.rows_from_items(todos), parser.rows_from_items(completions))
+            for file_path, todos, completions in scan_results]
+
+def test_shards_from_trees_listed_in_different_orders_merge(write_project, tmp_path):
+    first = write_project(FILES, tmp_path / "node-a")
+    second = write_project(dict(reversed(list(FILES.items()))), tmp_path / "node-b")
+
+    parser = XcodeParser(Config())
+    reversed_parser = XcodeParser(Config())
+    # Whatever order the filesystem lists the files in, the other node sees the opposite one
+    find_source_files = reversed_parser.find_source_files
+    reversed_parser.find_source_files = lambda *args: list(reversed(find_source_files(*args)))
+
+    manifests = (scan_shards(parser, first, tmp_path, 3, "a")[:2]
+                 + scan_shards(reversed_parser, second, tmp_path, 3, "b")[2:])
+    results = ShardManifest(parser).merge(str(first), manifests)
+    assert results is not None
+
+    expected = [(file_path, todos, completions) for file_path, todos, completions in parser.iter_project(str(first))
+                if todos or completions]
+    assert merged_rows(parser, results, first) == sorted(merged_rows(parser, expected, first))
+
+def test_shard_from_a_changed_tree_is_refused(write_project, tmp_path, capsys):
+    project = write_project(FILES)
+    parser = XcodeParser(Config())
+    manifests = scan_shards(parser, project, tmp_path, 2, "before")
+    write_project({"Sources/Late.swift": "// TODO: Added after the first shard\n"})
+    manifests[1] = scan_shards(parser, project, tmp_path, 2, "after")[1]
+
+    assert ShardManifest(parser).merge(str(project), manifests) is None
+    assert "disagree on file_list" in capsys.readouterr().out
+
+def test_missing_and_corrupt_shards_are_refused(write_project, tmp_path, capsys):
+    project = write_project(FILES)
+    parser = XcodeParser(Config())
+    manifests = scan_shards(parser, project, tmp_path, 2, "shard")
+
+    assert ShardManifest(parser).merge(str(project), manifests[:1]) is None
+    assert "missing shard manifests for shard(s) 2 of 2" in capsys.readouterr().out
+
+    with open(manifests[1]) as f:
+        text = f.read()
+    with open(manifests[1], "w") as f:
+        f.write(text.replace("Item", "Itme"))
+    assert ShardManifest(parser).merge(str(project), manifests) is None
+    assert "checksum mismatch" in capsys.readouterr().out
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from config import Config
+from metrics import Metrics
+from xcode_parser import XcodeParser
+
+def project_files(count=40):
+    """Files of uneven size, so worker chunks finish out of order."""
+    rng = random.Random(0)
+    files = {}
+    for index in range(count):
+        lines = []
+        for line in range(rng.choice([1, 5, 2000])):
+            if rng.random() < 0.05:
+                lines.append(f"// TODO: file {index} line {line}")
+            elif rng.random() < 0.02:
+                lines.append(f"// DONE: file {index} line {line}")
+            else:
+                lines.append(f"let value{line} = {line}")
+        files[f"Dir{index % 4}/File{index}.swift"] = "\n".join(lines) + "\n"
+    files["Empty.swift"] = ""
+    files["Dir0/Binary.swift"] = "// TODO: skipped\n\0\n"
+    return files
+
+def make_parser(**options) -> XcodeParser:
+    config = Config()
+    config.scan_chunk_size = 2
+    for key, value in options.items():
+        setattr(config, key, value)
+    parser = XcodeParser(config)
+    parser.metrics = Metrics(True)
+    return parser
+
+def scan(parser, project, workers):
+    return [(file_path, parser.rows_from_items(todos), parser.rows_from_items(completions))
+            for file_path, todos, completions in parser.iter_project(str(project), workers)]
+
+def scan_counters(parser):
+    return {key: value for key, value in parser.metrics.values.items()
+            if key[0] in ("todoist_sync_files_scanned_total", "todoist_sync_bytes_scanned_total",
+                          "todoist_sync_files_skipped_total")}
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_workers_match_a_serial_scan(write_project, workers):
+    project = write_project(project_files())
+    serial_parser = make_parser()
+    serial = scan(serial_parser, project, 1)
+    assert len(serial) == 42 and any(todos for _, todos, _ in serial)
+
+    parser = make_parser()
+    assert scan(parser, project, workers) == serial
+    # Counters recorded inside the workers are added to the parent's
+    assert scan_counters(parser) == scan_counters(serial_parser)
+
+def test_shared_pool_matches_a_serial_scan(write_project):
+    project = write_project(project_files())
+    serial = scan(make_parser(), project, 1)
+
+    parser = make_parser()
+    parser.start_scan_pool(3)
+    try:
+        pool = parser.scan_pool
+        assert scan(parser, project, 3) == serial
+        # The pool is reused by the next scan, which still sees file changes
+        write_project({"Dir1/File1.swift": "// TODO: changed\n"})
+        changed = scan(parser, project, 3)
+        assert parser.scan_pool is pool
+    finally:
+        parser.close_scan_pool()
+    assert parser.scan_pool is None
+    assert changed == scan(make_parser(), project, 1)
+
+def test_workers_fill_in_scan_cache_misses_in_order(write_project, tmp_path):
+    project = write_project(project_files())
+    serial = scan(make_parser(), project, 1)
+    cache_path = str(tmp_path / "cache.json")
+    scan(make_parser(scan_cache_path=cache_path), project, 1)
+
+    # Every third file changes, so cache hits and worker results interleave
+    for index in range(0, 40, 3):
+        write_project({f"Dir{index % 4}/File{index}.swift": f"// TODO: rewritten {index}\n"})
+    expected = scan(make_parser(), project, 1)
+    assert expected != serial
+
+    parser = make_parser(scan_cache_path=cache_path)
+    assert scan(parser, project, 3) == expected
+    assert (parser.scan_cache.hits, parser.scan_cache.misses) == (28, 14)
+
+def test_sync_with_workers_matches_a_serial_sync(fake_server, make_sync, write_project):
+    project = write_project(project_files(12))
+    serial_project = fake_server.add_project("Serial")["id"]
+    pooled_project = fake_server.add_project("Pooled")["id"]
+
+    serial_sync = make_sync(scan_workers=1)
+    serial_sync.config.set_project_id(serial_project)
+    assert serial_sync.sync_project(str(project))
+    pooled_sync = make_sync(scan_workers=3)
+    pooled_sync.config.set_project_id(pooled_project)
+    assert pooled_sync.sync_project(str(project))
+
+    assert pooled_sync.last_counts == serial_sync.last_counts
+    assert ([task["content"] for task in fake_server.open_tasks(pooled_project)]
+            == [task["content"] for task in fake_server.open_tasks(serial_project)])
@@ -0,0 +1,100 @@
+import pytest
+
+from config import Config
+from xcode_parser import XcodeParser
+
+CORPUS = {
+    "plain.swift": b"// TODO: First\nlet a = 1\n    //todo  lower case\n/* FIXME: block */\n# DONE: hash\n"
+                   b"// COMPLETED: long form\n// TODO: a // DONE: b\n/* TODO: unterminated\n",
+    "no_final_newline.swift": b"let x = 1\n// FIXME: at the very end",
+    "crlf.swift": b"// TODO: windows\r\nlet x = 1\r\n// DONE: windows done\r\n",
+    "mixed_endings.swift": b"// TODO: unix\n// TODO: windows\r\n\r\n// DONE: last\n",
+    "old_mac.swift": b"// TODO: classic\r// DONE: classic done\rlet x = 1\r",
+    "unicode.swift": "// TODO: café ☕\n// DONE: naïve\n// ＴＯＤＯ: fullwidth is not a marker\n".encode(),
+    # Case-insensitive matching folds these onto ASCII letters, but the byte prefilter cannot see them
+    "lookalikes.swift": "// F\u0131XME: dotless i\nlet x = 1\n// F\u0130XME: dotted capital I\n".encode(),
+    # Dropping the invalid byte while decoding joins the keyword back together
+    "invalid_utf8.swift": b"// TO\xffDO: split by an invalid byte\n// DONE: \xfe\xfeok\n",
+    "latin1.swift": "// TODO: résumé\n".encode("latin-1"),
+    "bom.swift": b"\xef\xbb\xbf// TODO: after a BOM\n",
+    "empty.swift": b"",
+    "only_newlines.swift": b"\n\n\n",
+    "no_markers.swift": b"".join(b"let value%d = %d\n" % (index, index) for index in range(500)),
+    "many.swift": b"".join(b"// TODO: item %d\nlet x = %d\n// DONE: item %d\n" % (index, index, index)
+                           for index in range(300)),
+}
+
+def make_parser(**options) -> XcodeParser:
+    config = Config()
+    for key, value in options.items():
+        setattr(config, key, value)
+    return XcodeParser(config)
+
+def rows(items):
+    return [(item.content, item.line_number, item.todo_type) for item in items]
+
+def per_line(parser, file_path):
+    """Results of the original two-pass, line-by-line scan."""
+    return rows(parser.parse_file_for_todos(file_path)), rows(parser.parse_file_for_completions(file_path))
+
+def single_pass(parser, file_path):
+    todos, completions = parser.scan_file(file_path)
+    return rows(todos), rows(completions)
+
+@pytest.fixture
+def corpus(tmp_path):
+    paths = {}
+    for name, data in CORPUS.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        paths[name] = str(path)
+    return paths
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"marker_keywords": []},
+    # The same group name twice cannot be combined into one pattern
+    {"todo_patterns": [r"//\s*TODO:\s*(?P<text>.+)", r"#\s*FIXME:\s*(?P<text>.+)"]},
+], ids=["prefilter", "no-prefilter", "no-combined-pattern"])
+def test_single_pass_scan_matches_the_per_line_scan(corpus, options):
+    parser = make_parser(**options)
+    assert (parser.prefilter_keywords is None) == ("marker_keywords" in options)
+    assert (parser.combined_pattern is None) == ("todo_patterns" in options)
+    for name, file_path in corpus.items():
+        assert single_pass(parser, file_path) == per_line(parser, file_path), name
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 16, 61])
+def test_results_do_not_depend_on_chunk_boundaries(corpus, chunk_size):
+    parser = make_parser()
+    parser.READ_CHUNK_SIZE = chunk_size
+    for name, file_path in corpus.items():
+        assert single_pass(parser, file_path) == per_line(parser, file_path), name
+
+def test_marker_split_across_chunks(tmp_path):
+    data = b"x" * 100 + b"\n// TODO: straddles the boundary\n// DONE: and this one\n"
+    file_path = tmp_path / "split.swift"
+    file_path.write_bytes(data)
+    parser = make_parser()
+    expected = per_line(parser, str(file_path))
+    for boundary in range(95, len(data)):
+        parser.READ_CHUNK_SIZE = boundary
+        assert single_pass(parser, str(file_path)) == expected, boundary
+
+def test_lookalikes_are_found(corpus):
+    todos, completions = single_pass(make_parser(), corpus["lookalikes.swift"])
+    assert todos == [("dotless i", 1, "FIXME"), ("dotted capital I", 3, "FIXME")]
+    assert completions == []
+
+def test_nul_bytes_skip_the_file_unless_scanning_everything(tmp_path):
+    file_path = tmp_path / "Asset.swift"
+    file_path.write_bytes(b"// TODO: inside a binary\n\0\0\0\n// DONE: also inside\n")
+
+    assert single_pass(make_parser(), str(file_path)) == ([], [])
+    parser = make_parser(skip_binary_files=False)
+    assert single_pass(parser, str(file_path)) == per_line(parser, str(file_path))
+    assert single_pass(parser, str(file_path))[0] == [("inside a binary", 1, "TODO")]
+
+def test_scan_blob_matches_scan_file(corpus):
+    parser = make_parser()
+    for name, file_path in corpus.items():
+        assert parser.scan_blob(CORPUS[name], file_path) == parser.scan_file(file_path), name
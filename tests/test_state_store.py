@@ -0,0 +1,35 @@
+import sqlite3
+
+from state_store import StateStore
+
+def test_offline_dry_run_uses_the_pulled_mirror(fake_server, project_id, make_sync, write_project, tmp_path, capsys):
+    project = write_project({"App.swift": "// TODO: First\n// TODO: Second\n"})
+    db_path = str(tmp_path / "state.db")
+    assert make_sync(state_db_path=db_path).sync_project(str(project))
+    assert len(fake_server.open_tasks(project_id)) == 2
+
+    (project / "App.swift").write_text("// TODO: First\n// TODO: Second\n// TODO: Third\n")
+    fake_server.reset_stats()
+    capsys.readouterr()
+    assert make_sync(state_db_path=db_path).sync_project(str(project), dry_run=True, offline=True)
+    assert fake_server.stats()["requests"] == 0
+    output = capsys.readouterr().out
+    assert "Would add 1 new TODO tasks" in output and "+ Third (App.swift:3)" in output
+
+def test_databases_with_the_old_fingerprint_column_still_work(fake_server, project_id, make_sync, write_project, tmp_path):
+    db_path = str(tmp_path / "state.db")
+    connection = sqlite3.connect(db_path)
+    connection.executescript("""
+        CREATE TABLE tasks (id TEXT PRIMARY KEY, project_id TEXT, content TEXT NOT NULL,
+                            description TEXT NOT NULL DEFAULT '', is_completed INTEGER NOT NULL DEFAULT 0,
+                            fingerprint TEXT);
+        CREATE INDEX tasks_fingerprint ON tasks (fingerprint);
+    """)
+    connection.close()
+
+    project = write_project({"App.swift": "// TODO: First\n"})
+    assert make_sync(state_db_path=db_path).sync_project(str(project))
+    sync = make_sync(state_db_path=db_path)
+    assert sync.sync_project(str(project))
+    assert sync.last_counts == {"added": 0, "updated": 0, "completed": 0}
+    assert [task["content"] for task in StateStore(db_path).get_tasks(project_id)] == ["First (App.swift:1)"]
@@ -0,0 +1,128 @@
+import io
+import os
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+from sync_client import default_socket_path, send_request
+from sync_server import SyncServer
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_env(fake_server, project_id):
+    env = {key: value for key, value in os.environ.items() if not key.startswith("TODOIST_")}
+    env.update(TODOIST_API_TOKEN="test-token", TODOIST_API_URL=fake_server.url,
+               TODOIST_SYNC_API_URL=fake_server.url, TODOIST_PROJECT_ID=project_id)
+    return env
+
+def client(args, cwd, env):
+    return subprocess.run([sys.executable, os.path.join(REPO, "sync_client.py")] + args,
+                          cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+
+def test_server_and_fallback_sync_the_same_tasks(fake_server, project_id, write_project, tmp_path):
+    project = write_project({
+        "Sources/App.swift": "// TODO: Wire up the settings screen\nlet b = 2\n// FIXME: Crash on empty input\n",
+        "Tests/AppTests.swift": "// TODO: Cover the empty state\n",
+    })
+    env = run_env(fake_server, project_id)
+    socket_path = str(tmp_path / "sync.sock")
+    server_dir = tmp_path / "server"
+    server_dir.mkdir()
+
+    server = subprocess.Popen([sys.executable, os.path.join(REPO, "todoist_sync.py"), "--serve", "--socket", socket_path],
+                              cwd=server_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(socket_path):
+            assert server.poll() is None and time.monotonic() < deadline, "sync server did not start"
+            time.sleep(0.05)
+
+        result = client(["sync", "project", "--socket", socket_path, "--no-fallback"], tmp_path, env)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert client(["stop", "--socket", socket_path], tmp_path, env).returncode == 0
+        server.wait(timeout=30)
+    finally:
+        if server.poll() is None:
+            server.kill()
+    tasks = fake_server.open_tasks(project_id)
+    assert len(tasks) == 3
+
+    # No server any more: the client syncs in-process, from another directory
+    fake_server.reset_stats()
+    result = client(["sync", "..", "--socket", socket_path], project / "Sources", env)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Added: 0 tasks" in result.stdout and "Updated: 0 tasks" in result.stdout
+    assert fake_server.stats()["requests"] == 1
+    assert fake_server.open_tasks(project_id) == tasks
+
+def test_default_socket_path_is_per_user(monkeypatch, tmp_path):
+    monkeypatch.delenv("TODOIST_SYNC_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert default_socket_path() == f"/run/user/1000/todoist_sync-{os.getuid()}.sock"
+
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    assert default_socket_path() == str(tmp_path / "state" / "todoist_sync" / "sync.sock")
+    monkeypatch.delenv("XDG_STATE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert default_socket_path() == str(tmp_path / ".local" / "state" / "todoist_sync" / "sync.sock")
+
+    monkeypatch.setenv("TODOIST_SYNC_SOCKET", "/custom.sock")
+    assert default_socket_path() == "/custom.sock"
+
+def serve_in_background(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.running:
+        assert thread.is_alive() and time.monotonic() < deadline, "sync server did not start"
+        time.sleep(0.01)
+    return thread
+
+def test_socket_and_its_directory_are_private(make_sync, tmp_path):
+    socket_path = tmp_path / "run" / "sync.sock"
+    server = SyncServer(make_sync(), str(socket_path))
+    thread = serve_in_background(server)
+    try:
+        assert stat.S_IMODE(os.stat(socket_path.parent).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+    finally:
+        with redirect_stdout(io.StringIO()):
+            assert send_request(str(socket_path), {"command": "stop"})
+        thread.join(timeout=30)
+    assert not socket_path.exists()
+
+def test_stale_socket_is_replaced(make_sync, tmp_path):
+    socket_path = str(tmp_path / "sync.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    server = SyncServer(make_sync(), socket_path)
+    thread = serve_in_background(server)
+    with redirect_stdout(io.StringIO()):
+        assert send_request(socket_path, {"command": "stop"})
+    thread.join(timeout=30)
+
+def test_socket_path_problems_are_reported(make_sync, tmp_path, monkeypatch, capsys):
+    # A regular file in the way is left alone
+    regular = tmp_path / "notes.txt"
+    regular.write_text("keep me")
+    assert not SyncServer(make_sync(), str(regular)).serve_forever()
+    assert "exists and is not a socket" in capsys.readouterr().out
+    assert regular.read_text() == "keep me"
+
+    # A stale socket that cannot be removed is an error, not a traceback
+    socket_path = str(tmp_path / "sync.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    def refuse(path):
+        raise PermissionError(13, "Permission denied", path)
+    monkeypatch.setattr(os, "unlink", refuse)
+    assert not SyncServer(make_sync(), socket_path).serve_forever()
+    assert f"cannot remove the stale socket {socket_path}" in capsys.readouterr().out
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from sync_journal import SyncJournal
+from todoist_client import RequestBudget
+
+def test_failed_task_fetch_stops_the_sync(fake_server, project_id, make_sync, write_project):
+    project = write_project({"App.swift": "// TODO: Ship it\n"})
+    fake_server.add_task(project_id, "Existing task")
+    fake_server.error_rate = 1.0
+
+    for dry_run in (True, False):
+        sync = make_sync(http_max_retries=0)
+        assert not sync.sync_project(str(project), dry_run)
+    assert set(fake_server.stats()["calls"]) == {"GET /tasks"}
+    assert [task["content"] for task in fake_server.open_tasks(project_id)] == ["Existing task"]
+
+def test_failed_task_fetch_keeps_the_journal(fake_server, project_id, make_sync, write_project, tmp_path):
+    project = write_project({"App.swift": "// TODO: Ship it\n"})
+    journal_path = str(tmp_path / "journal")
+    SyncJournal(journal_path).record_planned([SyncJournal.new_operation("create", project_id, "Left over")])
+
+    fake_server.error_rate = 1.0
+    assert not make_sync(http_max_retries=0, journal_path=journal_path).sync_project(str(project))
+    assert [op["content"] for op in SyncJournal(journal_path).pending(project_id)] == ["Left over"]
+
+    fake_server.error_rate = 0.0
+    sync = make_sync(journal_path=journal_path)
+    assert sync.sync_project(str(project))
+    assert sorted(task["content"] for task in fake_server.open_tasks(project_id)) == ["Left over", "Ship it (App.swift:1)"]
+    assert SyncJournal(journal_path).pending(project_id) == []
+
+def test_budget_counts_throttled_time_once_for_concurrent_callers():
+    budget = RequestBudget(600)
+    budget.tokens = 0.0
+    threads = [threading.Thread(target=budget.acquire) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    assert budget.used == 4
+    # Four tokens at 10/s take about 0.4s; summing every caller's wait would report about 1.0s
+    assert 0.3 <= budget.waited <= elapsed + 0.05
@@ -0,0 +1,69 @@
+import json
+
+from sync_plan import SyncPlan
+
+def open_contents(fake_server, project_id):
+    return sorted(task["content"] for task in fake_server.open_tasks(project_id))
+
+def make_plan(make_sync, project, plan_path):
+    sync = make_sync()
+    assert sync.sync_project(str(project), plan_path=str(plan_path))
+    return SyncPlan.load(str(plan_path))
+
+def test_plan_applies_cleanly(fake_server, project_id, make_sync, write_project, tmp_path, capsys):
+    project = write_project({"App.swift": "// TODO: Keep\n// TODO: Old\n"})
+    assert make_sync().sync_project(str(project))
+    write_project({"App.swift": "\n// TODO: Keep\n// DONE: Old\n// FIXME: New\n"})
+
+    plan_path = tmp_path / "plan.json"
+    plan = make_plan(make_sync, project, plan_path)
+    assert plan.counts() == {"create": 1, "update": 1, "close": 1}
+    # Planning writes nothing
+    assert open_contents(fake_server, project_id) == ["Keep (App.swift:1)", "Old (App.swift:2)"]
+
+    fake_server.reset_stats()
+    sync = make_sync()
+    assert sync.apply_plan(str(plan_path))
+    assert sync.last_counts == {"added": 1, "updated": 1, "completed": 1}
+    assert open_contents(fake_server, project_id) == ["Keep (App.swift:2)", "New (App.swift:4)"]
+    # No scan: one task fetch, then the three writes
+    assert fake_server.stats()["calls"]["GET /tasks"] == 1
+
+    capsys.readouterr()
+    assert make_sync().sync_project(str(project), dry_run=True)
+    assert "No changes needed" in capsys.readouterr().out
+
+def test_plan_is_refused_once_the_tasks_change(fake_server, project_id, make_sync, write_project, tmp_path, capsys):
+    project = write_project({"App.swift": "// TODO: Planned\n"})
+    plan_path = tmp_path / "plan.json"
+    make_plan(make_sync, project, plan_path)
+
+    fake_server.add_task(project_id, "Added by someone else")
+    capsys.readouterr()
+    assert not make_sync().apply_plan(str(plan_path))
+    assert "tasks changed since the plan was computed" in capsys.readouterr().out
+    assert open_contents(fake_server, project_id) == ["Added by someone else"]
+
+def test_applied_plan_cannot_be_applied_again(fake_server, project_id, make_sync, write_project, tmp_path, capsys):
+    project = write_project({"App.swift": "// TODO: Once\n"})
+    plan_path = tmp_path / "plan.json"
+    make_plan(make_sync, project, plan_path)
+
+    assert make_sync().apply_plan(str(plan_path))
+    capsys.readouterr()
+    assert not make_sync().apply_plan(str(plan_path))
+    assert "refusing to apply it" in capsys.readouterr().out
+    assert open_contents(fake_server, project_id) == ["Once (App.swift:1)"]
+
+def test_edited_plan_is_refused(fake_server, project_id, make_sync, write_project, tmp_path, capsys):
+    project = write_project({"App.swift": "// TODO: Original\n"})
+    plan_path = tmp_path / "plan.json"
+    make_plan(make_sync, project, plan_path)
+
+    data = json.loads(plan_path.read_text())
+    data["operations"][0]["content"] = "Tampered"
+    plan_path.write_text(json.dumps(data))
+    capsys.readouterr()
+    assert not make_sync().apply_plan(str(plan_path))
+    assert "checksum mismatch" in capsys.readouterr().out
+    assert fake_server.open_tasks(project_id) == []
@@ -0,0 +1,112 @@
+import random
+import time
+
+from todoist_client import TodoistClient
+
+def make_client(fake_server, **options) -> TodoistClient:
+    return TodoistClient("test-token", base_url=fake_server.url, sync_url=fake_server.url, **options)
+
+def task_fetches(fake_server) -> int:
+    return fake_server.stats()["calls"].get("GET /tasks", 0)
+
+def test_task_lists_are_cached_until_the_ttl_expires(fake_server, project_id):
+    fake_server.add_task(project_id, "Existing")
+    client = make_client(fake_server, cache_ttl=0.2)
+
+    assert [task["content"] for task in client.get_tasks(project_id)] == ["Existing"]
+    assert [task["content"] for task in client.get_tasks(project_id)] == ["Existing"]
+    assert task_fetches(fake_server) == 1
+    assert (client.cache_hits, client.cache_misses) == (1, 1)
+
+    time.sleep(0.25)
+    client.get_tasks(project_id)
+    assert task_fetches(fake_server) == 2
+
+def test_zero_ttl_disables_the_cache(fake_server, project_id):
+    client = make_client(fake_server, cache_ttl=0)
+    client.get_tasks(project_id)
+    client.get_tasks(project_id)
+    assert task_fetches(fake_server) == 2
+    assert not client.tasks_cache
+
+def test_least_recently_used_project_is_evicted(fake_server):
+    projects = [fake_server.add_project(f"P{index}")["id"] for index in range(3)]
+    client = make_client(fake_server, cache_max_projects=2)
+
+    client.get_tasks(projects[0])
+    client.get_tasks(projects[1])
+    client.get_tasks(projects[0])
+    client.get_tasks(projects[2])
+    assert list(client.tasks_cache) == [projects[0], projects[2]]
+    assert task_fetches(fake_server) == 3
+
+    client.get_tasks(projects[0])
+    assert task_fetches(fake_server) == 3
+    client.get_tasks(projects[1])
+    assert task_fetches(fake_server) == 4
+
+def test_writes_keep_the_cached_list_current(fake_server, project_id):
+    client = make_client(fake_server)
+    client.get_tasks(project_id)
+
+    created = client.create_task("New", project_id)
+    other = client.create_task("Other", project_id)
+    assert client.update_task(other["id"], content="Renamed")
+    assert client.close_task(created["id"])
+    assert [task["content"] for task in client.get_tasks(project_id)] == ["Renamed"]
+    assert task_fetches(fake_server) == 1
+    assert [task["content"] for task in fake_server.open_tasks(project_id)] == ["Renamed"]
+
+def test_content_lookups_between_writes_do_not_rebuild_the_index(fake_server, project_id, monkeypatch):
+    for index in range(50):
+        fake_server.add_task(project_id, f"Existing {index}")
+    client = make_client(fake_server)
+    assert client.find_task_by_content("Existing 7", project_id)["content"] == "Existing 7"
+    index = client.tasks_cache[project_id]["by_content"]
+
+    builds = []
+    content_index = client._content_index
+    def counting_index(entry):
+        if entry["by_content"] is None:
+            builds.append(entry)
+        return content_index(entry)
+    monkeypatch.setattr(client, "_content_index", counting_index)
+
+    for number in range(20):
+        task = client.create_task(f"Created {number}", project_id)
+        assert client.find_task_by_content(f"Created {number}", project_id) == task
+        if number % 2:
+            client.update_task(task["id"], content=f"Updated {number}")
+            assert client.find_task_by_content(f"Created {number}", project_id) is None
+        if number % 3 == 0:
+            client.close_task(task["id"])
+            assert client.find_task_by_content(f"Created {number}", project_id) is None
+    assert builds == []
+    assert client.tasks_cache[project_id]["by_content"] is index
+    assert task_fetches(fake_server) == 1
+
+def test_content_index_agrees_with_a_scan_of_the_list(fake_server, project_id):
+    rng = random.Random(0)
+    contents = [f"Task {index}" for index in range(8)]
+    client = make_client(fake_server)
+    client.find_task_by_content(contents[0], project_id)
+
+    for _ in range(200):
+        tasks = client.get_tasks(project_id)
+        action = rng.random()
+        if action < 0.4 or not tasks:
+            client.create_task(rng.choice(contents), project_id)
+        elif action < 0.7:
+            client.update_task(rng.choice(tasks)["id"], content=rng.choice(contents))
+        else:
+            client.close_task(rng.choice(tasks)["id"])
+
+        open_tasks = fake_server.open_tasks(project_id)
+        for content in contents:
+            found = client.find_task_by_content(content, project_id)
+            expected_ids = {task["id"] for task in open_tasks if task["content"] == content}
+            if expected_ids:
+                assert found is not None and found["id"] in expected_ids and found["content"] == content
+            else:
+                assert found is None
+    assert task_fetches(fake_server) == 1
@@ -0,0 +1,64 @@
+import pickle
+
+from config import Config
+from xcode_parser import TodoItem, XcodeParser
+
+def test_items_compare_by_path_line_and_content():
+    item = TodoItem("  Fix it ", "App/Main.swift", 3)
+    assert item.content == "Fix it"
+    assert item == TodoItem("Fix it", "App/Main.swift", 3, "FIXME")
+    assert hash(item) == hash(TodoItem("Fix it", "App/Main.swift", 3, "FIXME"))
+    assert item != TodoItem("Fix it", "App/Main.swift", 4)
+    assert item != TodoItem("Fix it", "App/Other.swift", 3)
+    assert item != TodoItem("Fix that", "App/Main.swift", 3)
+    assert item != "TODO: Fix it (App/Main.swift:3)"
+
+    items = {item, TodoItem("Fix it", "App/Main.swift", 3), TodoItem("Other", "App/Main.swift", 3)}
+    assert len(items) == 2
+    assert str(item) == "TODO: Fix it (App/Main.swift:3)"
+
+def test_items_are_slotted_and_share_interned_strings():
+    directory = "App"
+    first = TodoItem("One", directory + "/Main.swift", 1)
+    second = TodoItem("Two", "/".join([directory, "Main.swift"]), 2)
+    assert first.file_path is second.file_path
+    assert first.todo_type is second.todo_type
+    assert not hasattr(first, "__dict__")
+
+def test_unique_id_and_hash_are_built_lazily():
+    item = TodoItem("Lazy", "App/Main.swift", 7)
+    assert item._unique_id is None and item._hash is None
+    assert item.unique_id == "App/Main.swift:7:Lazy"
+    assert item.unique_id is item.unique_id
+    hash(item)
+    assert item._hash is not None
+
+def test_pickled_items_round_trip():
+    item = TodoItem("Pickled", "App/Main.swift", 5, "FIXME")
+    hash(item)
+    item.unique_id
+    copy = pickle.loads(pickle.dumps(item))
+    # Cached values are not carried over; the path is interned again on load
+    assert copy._hash is None and copy._unique_id is None
+    assert copy.file_path is TodoItem("x", "App/Main.swift", 1).file_path
+    assert copy == item and hash(copy) == hash(item)
+    assert (copy.content, copy.file_path, copy.line_number, copy.todo_type) == ("Pickled", "App/Main.swift", 5, "FIXME")
+
+def test_items_from_scan_workers_match_in_process_items(write_project):
+    project = write_project({
+        f"File{index}.swift": "".join(f"// TODO: item {line}\n// DONE: done {line}\n" for line in range(20))
+        for index in range(8)
+    })
+    config = Config()
+    config.scan_chunk_size = 1
+    parser = XcodeParser(config)
+    files = parser.find_source_files(str(project))
+
+    serial = list(parser.scan_files(files, 1))
+    pooled = list(parser.scan_files(files, 2))
+    assert pooled == serial
+    for (_, todos, completions), (_, serial_todos, _) in zip(pooled, serial):
+        assert {hash(todo) for todo in todos} == {hash(todo) for todo in serial_todos}
+        # Items coming back from a worker share the parent's interned path and type strings
+        assert all(item.file_path is serial_todos[0].file_path for item in todos + completions)
+        assert all(todo.todo_type is serial_todos[0].todo_type for todo in todos)
@@ -0,0 +1,167 @@
+import os
+import random
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from config import Config
+from tree_walker import IgnoreRules, translate_pattern
+from xcode_parser import XcodeParser
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+def git_listed(parser, root):
+    """Source files git reports as tracked or untracked-but-not-ignored, as project-relative paths."""
+    output = subprocess.run(["git", "-C", str(root), "ls-files", "-z", "--others", "--cached", "--exclude-standard"],
+                            stdout=subprocess.PIPE, check=True).stdout
+    return sorted(path for path in output.decode().split("\0") if path and parser.is_source_path(path))
+
+def walked(parser, root, top=None):
+    files = parser.walker.walk(str(top or root), str(root))
+    return sorted(os.path.relpath(file_path, root).replace(os.sep, "/") for file_path in files)
+
+RULES_PROJECT = {
+    ".gitignore": "\n".join([
+        "# generated code",
+        "*.generated.swift",
+        "!Keep.generated.swift",
+        "/Anchored.swift",
+        "Docs/*.m",
+        "Vendor/",
+        "**/Mocks/**",
+        "Tests/**/Fixture?.swift",
+        "[Tt]emp*.swift",
+        "[!A-Z]lower.swift",
+        "Trailing.swift   ",
+        "\\#Hash.swift",
+        "Dir.swift/",
+        "Ignored/",
+        "!Ignored/Back.swift",
+    ]) + "\n",
+    "Anchored.swift": "",
+    "Sources/Anchored.swift": "",
+    "Sources/.gitignore": "Local.swift\n/Only/\n!Keep.local.swift\n*.local.swift\n",
+    "Sources/Local.swift": "",
+    "Sources/Nested/Local.swift": "",
+    "Sources/Only/A.swift": "",
+    "Sources/Deep/Only/A.swift": "",
+    "Sources/Keep.local.swift": "",
+    "Sources/Drop.local.swift": "",
+    "Local.swift": "",
+    "App/View.generated.swift": "",
+    "App/Keep.generated.swift": "",
+    "App/View.swift": "",
+    "Docs/Guide.m": "",
+    "Docs/Sub/Guide.m": "",
+    "Vendor/Lib.swift": "",
+    "App/Vendor/Lib.swift": "",
+    "App/Mocks/Mock.swift": "",
+    "App/Mocks/Deep/Mock.swift": "",
+    "Mocks/Top.swift": "",
+    "Tests/Fixture1.swift": "",
+    "Tests/Unit/Fixture2.swift": "",
+    "Tests/Unit/Fixture10.swift": "",
+    "TempFile.swift": "",
+    "App/tempFile.swift": "",
+    "xlower.swift": "",
+    "Xlower.swift": "",
+    "Trailing.swift": "",
+    "#Hash.swift": "",
+    "Dir.swift/A.swift": "",
+    "Other/Dir.swift": "",
+    "Ignored/Back.swift": "",
+    "Scratch/Note.swift": "",
+    "DerivedData/Build.swift": "",
+}
+
+def test_walk_matches_git(git_repo):
+    repo = git_repo(RULES_PROJECT)
+    with open(repo.root / ".git" / "info" / "exclude", "a") as f:
+        f.write("Scratch/\n")
+    repo.git("add", "App/View.swift", "Sources/Anchored.swift")
+    repo.commit("tracked files")
+
+    parser = XcodeParser(Config())
+    expected = git_listed(parser, repo.root)
+    assert walked(parser, repo.root) == expected
+    # Sanity check the fixture: these are listed, everything else above is ignored
+    assert expected == sorted([
+        "App/Keep.generated.swift", "App/View.swift", "Docs/Sub/Guide.m", "Local.swift", "Other/Dir.swift",
+        "Sources/Anchored.swift", "Sources/Deep/Only/A.swift",
+        "Tests/Unit/Fixture10.swift", "Xlower.swift"])
+
+def test_walk_below_the_root_applies_parent_ignore_files(git_repo):
+    repo = git_repo(RULES_PROJECT)
+    parser = XcodeParser(Config())
+    expected = [path for path in git_listed(parser, repo.root) if path.startswith("Sources/")]
+    assert walked(parser, repo.root, repo.root / "Sources") == expected
+    assert walked(parser, repo.root, repo.root / "Vendor") == []
+
+def test_ignore_files_can_be_turned_off(git_repo):
+    repo = git_repo(RULES_PROJECT)
+    config = Config()
+    config.respect_gitignore = False
+    parser = XcodeParser(config)
+    assert "Vendor/Lib.swift" in walked(parser, repo.root)
+    assert "DerivedData/Build.swift" not in walked(parser, repo.root)
+
+def test_git_index_listing_matches_the_walk(git_repo):
+    repo = git_repo(RULES_PROJECT)
+    repo.git("add", "App/View.swift")
+    repo.commit("tracked files")
+    (repo.root / "App" / "View.swift").unlink()
+
+    parser = XcodeParser(Config())
+    listed = parser.walker.git_index_files(str(repo.root))
+    assert sorted(os.path.relpath(path, repo.root) for path in listed) == walked(parser, repo.root)
+
+NAMES = ["a", "b", "ab", "Mocks", "x.y"]
+PATTERNS = ["a", "b/", "/a", "a/b", "*.swift", "a*.swift", "**/b", "a/**", "a/**/b.swift", "?b",
+            "[ab].swift", "x.*", "!a", "!b.swift", "!*/", "*/b.swift", "**/a/*.swift", "Mocks/"]
+
+@pytest.mark.parametrize("seed", range(12))
+def test_random_trees_match_git(git_repo, seed):
+    rng = random.Random(seed)
+    files = {}
+    for _ in range(30):
+        parts = [rng.choice(NAMES) for _ in range(rng.randint(0, 3))]
+        files["/".join(parts + [rng.choice(NAMES).split(".")[0] + ".swift"])] = ""
+    directories = {os.path.dirname(path) for path in files}
+    for directory in rng.sample(sorted(directories), min(3, len(directories))):
+        lines = [rng.choice(PATTERNS) for _ in range(rng.randint(1, 5))]
+        files[os.path.join(directory, ".gitignore")] = "\n".join(lines) + "\n"
+    # A file and a directory cannot share a path
+    for path in list(files):
+        if any(other.startswith(path + "/") for other in files):
+            del files[path]
+
+    repo = git_repo(files)
+    parser = XcodeParser(Config())
+    assert walked(parser, repo.root) == git_listed(parser, repo.root), files
+
+@pytest.mark.parametrize("pattern, path, expected", [
+    ("*.swift", "b.swift", True),
+    ("*.swift", "a/b.swift", False),
+    ("a/*.swift", "a/b/c.swift", False),
+    ("**/c.swift", "c.swift", True),
+    ("**/c.swift", "a/b/c.swift", True),
+    ("a/**", "a/b/c", True),
+    ("a/**/c", "a/c", True),
+    ("a/**/c", "a/x/y/c", True),
+    ("a?c", "a/c", False),
+    ("[!a]b", "bb", True),
+    ("[!a]b", "ab", False),
+    ("\\*b", "*b", True),
+    ("\\*b", "ab", False),
+])
+def test_translate_pattern(pattern, path, expected):
+    assert bool(re.fullmatch(translate_pattern(pattern), path)) is expected
+
+def test_last_matching_rule_wins():
+    rules = IgnoreRules(["*.swift", "!Keep.swift", "# Keep.swift", "build/", "!build/"])
+    assert rules.match("a/Drop.swift", False) is True
+    assert rules.match("a/Keep.swift", False) is False
+    assert rules.match("build", True) is False
+    assert rules.match("build", False) is None
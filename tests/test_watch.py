@@ -0,0 +1,169 @@
+import sys
+
+import pytest
+
+import todoist_sync
+from config import Config
+from file_watcher import InotifyBackend, PollingBackend
+from xcode_parser import XcodeParser
+
+PROJECT = {
+    ".gitignore": "Generated/\n",
+    "App/Main.swift": "// TODO: One\n",
+    "App/Other.swift": "let x = 1\n",
+    "Generated/Stub.swift": "// TODO: Generated\n",
+    "DerivedData/Build.swift": "// TODO: Derived\n",
+}
+
+class ScriptedWatcher:
+    """Stands in for ProjectWatcher: each batch runs the next step, then the watch is interrupted."""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.timeouts = []
+        self.mode = "scripted"
+        self.closed = False
+
+    def next_batch(self, timeout=None):
+        self.timeouts.append(timeout)
+        if not self.steps:
+            raise KeyboardInterrupt
+        return self.steps.pop(0)()
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def watch(monkeypatch, make_sync):
+    """Run watch_project over scripted batches of changes; returns the watcher."""
+    def run(project, steps, **options):
+        watcher = ScriptedWatcher(steps)
+        monkeypatch.setattr(todoist_sync, "ProjectWatcher", lambda *args, **kwargs: watcher)
+        watcher.result = make_sync(http_max_retries=0, **options).watch_project(str(project))
+        return watcher
+    return run
+
+def contents(fake_server, project_id):
+    return sorted(task["content"] for task in fake_server.open_tasks(project_id))
+
+def test_failed_delta_is_sent_again(fake_server, project_id, write_project, watch):
+    project = write_project(PROJECT)
+    main = project / "App" / "Main.swift"
+
+    def add_todo():
+        main.write_text("// TODO: One\n// TODO: Two\n")
+        fake_server.fail_next("POST /tasks", 500)
+        return {str(main)}
+
+    def nothing_changed():
+        return set()
+
+    def unrelated_edit():
+        (project / "App" / "Other.swift").write_text("let x = 2\n")
+        return {str(project / "App" / "Other.swift")}
+
+    watcher = watch(project, [add_todo, nothing_changed, unrelated_edit], watch_retry_delay=5.0)
+    assert watcher.result and watcher.closed
+    assert contents(fake_server, project_id) == ["One (App/Main.swift:1)", "Two (App/Main.swift:2)"]
+    # The failed sync made the watch wait for the retry delay instead of the next change
+    assert watcher.timeouts == [None, 5.0, None, None]
+    assert fake_server.stats()["calls"]["POST /tasks"] == 3
+
+def test_undone_edit_of_a_failed_sync_is_not_sent(fake_server, project_id, write_project, watch):
+    project = write_project(PROJECT)
+    main = project / "App" / "Main.swift"
+
+    def add_todo():
+        main.write_text("// TODO: One\n// TODO: Two\n")
+        fake_server.fail_next("POST /tasks", 500)
+        return {str(main)}
+
+    def undo():
+        main.write_text("// TODO: One\n")
+        return {str(main)}
+
+    watcher = watch(project, [add_todo, undo])
+    assert watcher.result
+    assert contents(fake_server, project_id) == ["One (App/Main.swift:1)"]
+    assert watcher.timeouts[-1] is None
+
+def test_files_unchanged_after_a_failed_initial_sync_are_not_skipped(fake_server, project_id, write_project, watch):
+    project = write_project(PROJECT)
+    fake_server.fail_next("GET /tasks", 500)
+
+    watcher = watch(project, [])
+    assert not watcher.result and watcher.closed
+    assert watcher.timeouts == []
+    assert contents(fake_server, project_id) == []
+
+    fake_server.fail_next("POST /tasks", 500)
+    assert not watch(project, []).result
+    assert watch(project, []).result
+    assert contents(fake_server, project_id) == ["One (App/Main.swift:1)"]
+
+def test_only_changed_source_files_are_rescanned(fake_server, project_id, write_project, watch):
+    project = write_project(PROJECT)
+
+    def changes():
+        (project / "App" / "New").mkdir()
+        (project / "App" / "New" / "Added.swift").write_text("// TODO: Added\n")
+        (project / "Generated" / "Stub.swift").write_text("// TODO: Still generated\n")
+        (project / "App" / "Main.swift").unlink()
+        (project / "App" / "Main.swift").write_text("// DONE: One\n")
+        return {str(project / "App" / "New"), str(project / "Generated" / "Stub.swift"), str(project / "App" / "Main.swift")}
+
+    assert watch(project, [changes]).result
+    assert contents(fake_server, project_id) == ["Added (App/New/Added.swift:1)"]
+
+def test_polling_sees_edits_and_skips_ignored_paths(write_project):
+    project = write_project(PROJECT)
+    backend = PollingBackend(XcodeParser(Config()), str(project), poll_interval=0.01)
+    assert sorted(backend.files) == [str(project / "App" / "Main.swift"), str(project / "App" / "Other.swift")]
+
+    (project / "App" / "Other.swift").write_text("let x = 22\n")
+    assert backend.wait(1.0) == [str(project / "App" / "Other.swift")]
+
+    (project / "App" / "Main.swift").unlink()
+    (project / "App" / "Sub").mkdir()
+    (project / "App" / "Sub" / "New.swift").write_text("// TODO: New\n")
+    (project / "Generated" / "Other.swift").write_text("// TODO: Ignored\n")
+    (project / "DerivedData" / "Other.swift").write_text("// TODO: Excluded\n")
+    assert backend.wait(1.0) == [str(project / "App" / "Main.swift"), str(project / "App" / "Sub" / "New.swift")]
+    assert backend.wait(0.05) == []
+
+def test_idle_polling_backs_off_the_file_sweep(write_project):
+    project = write_project(PROJECT)
+    backend = PollingBackend(XcodeParser(Config()), str(project), poll_interval=0.0)
+    for _ in range(10):
+        assert backend._poll() == []
+    assert backend.sweep_every == PollingBackend.MAX_SWEEP_BACKOFF
+
+    # Edits in place are still found by the next sweep
+    (project / "App" / "Other.swift").write_text("let x = 22\n")
+    polls = 1
+    while not backend._poll():
+        polls += 1
+    assert polls <= PollingBackend.MAX_SWEEP_BACKOFF
+    assert backend.sweep_every == 1
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watches_only_scanned_directories(write_project):
+    project = write_project(dict(PROJECT, **{"node_modules/lib/Index.swift": "// TODO: Vendored\n"}))
+    try:
+        backend = InotifyBackend(XcodeParser(Config()), str(project))
+    except (OSError, AttributeError) as e:
+        pytest.skip(f"inotify unavailable ({e})")
+    try:
+        assert sorted(backend.watches.values()) == [str(project), str(project / "App")]
+
+        (project / "App" / "Sub").mkdir()
+        (project / "App" / "Other.swift").write_text("let x = 22\n")
+        changed = set()
+        for _ in range(20):
+            changed.update(backend.wait(0.1))
+            if len(changed) == 2:
+                break
+        assert changed == {str(project / "App" / "Sub"), str(project / "App" / "Other.swift")}
+        assert str(project / "App" / "Sub") in backend.watches.values()
+    finally:
+        backend.close()
@@ -1,51 +1,403 @@
 import requests
+import heapq
+import itertools
 import json
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
 from datetime import datetime
+from metrics import Metrics, endpoint_name
+
+class RequestBudget:
+    """Token bucket that meters requests against a per-minute budget.
+    
+    Holds up to one minute of requests. Callers that find it empty wait for the next token;
+    when several wait at once the token goes to the lowest priority value first (e.g. closes
+    before creates), and to the earliest caller among equals.
+    """
+    
+    def __init__(self, requests_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, float(requests_per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.used = 0
+        self.waited = 0.0
+    
+    def acquire(self, priority: int = 0):
+        """Take one token, waiting until it is available and no more urgent caller is waiting."""
+        with self.condition:
+            ticket = (priority, next(self.sequence))
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.waiting[0] == ticket and self.tokens >= 1:
+                    heapq.heappop(self.waiting)
+                    self.tokens -= 1
+                    self.used += 1
+                    # Let the next caller in line start its own wait for a token
+                    self.condition.notify_all()
+                    return
+                timeout = (1 - self.tokens) / self.rate if self.waiting[0] == ticket else None
+                self.condition.wait(timeout)
+                if timeout is not None:
+                    # Only the head of the line sleeps for a token; the others queue behind it, so
+                    # counting their waits too would add the same throttled time up once per caller
+                    self.waited += time.monotonic() - now
+    
+    def summary(self) -> str:
+        return f"budget: {self.used} requests at {self.requests_per_minute:g}/min, throttled: {self.waited:.1f}s"
 
 class TodoistClient:
     """Client for interacting with Todoist API."""
     
-    def __init__(self, api_token: str):
+    # Status codes that are worth retrying
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
+    # The Sync API accepts at most 100 commands per request
+    MAX_BATCH_SIZE = 100
+    
+    # Request budget priorities (lower goes first): reads, then closes, updates and creates
+    PRIORITY_READ = 0
+    PRIORITY_CLOSE = 1
+    PRIORITY_UPDATE = 2
+    PRIORITY_CREATE = 3
+    COMMAND_PRIORITIES = {"item_close": PRIORITY_CLOSE, "item_delete": PRIORITY_CLOSE,
+                          "item_update": PRIORITY_UPDATE, "item_add": PRIORITY_CREATE}
+    
+    def __init__(self, api_token: str, base_url: str = "https://api.todoist.com/rest/v2",
+                 pool_size: int = 10, timeout: float = 30.0, max_retries: int = 5,
+                 backoff_factor: float = 0.5, max_backoff: float = 60.0,
+                 sync_url: str = "https://api.todoist.com/sync/v9", batch_size: int = 100,
+                 cache_ttl: float = 60.0, cache_max_projects: int = 32, rate_limit: float = 0,
+                 metrics: Optional[Metrics] = None):
         self.api_token = api_token
-        self.base_url = "https://api.todoist.com/rest/v2"
+        self.base_url = base_url.rstrip('/')
+        self.sync_url = sync_url.rstrip('/')
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.command_queue = []
         self.headers = {
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json"
         }
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        
+        # One keep-alive session so every call reuses pooled connections
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.adapter = adapter
+        
+        # Counters may be updated from several threads when requests run concurrently
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.retry_count = 0
+        self.rate_limited_count = 0
+        
+        # Set when a request is still rate limited (429) after every retry; callers should stop writing
+        self.budget_exhausted = False
+        
+        # Per-endpoint latency, status, retry and payload metrics (disabled unless reporting is on)
+        self.metrics = metrics or Metrics()
+        
+        # Requests per minute shared by every call made through this client (0 = unlimited)
+        self.budget = RequestBudget(rate_limit) if rate_limit > 0 else None
+        
+        # Read-through cache of projects and per-project task lists (cache_ttl <= 0 disables it)
+        self.cache_ttl = cache_ttl
+        self.cache_max_projects = max(1, cache_max_projects)
+        self.cache_lock = threading.RLock()
+        self.projects_cache: Optional[Dict] = None
+        self.tasks_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Compute how long to wait before the next attempt, honouring Retry-After."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.max_backoff)
+                except ValueError:
+                    try:
+                        delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                        return min(max(delay, 0.0), self.max_backoff)
+                    except (TypeError, ValueError):
+                        pass
+        
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+    
+    def _request(self, method: str, path: str, base_url: Optional[str] = None,
+                 priority: int = PRIORITY_READ, request_id: Optional[str] = None, **kwargs) -> requests.Response:
+        """Send a request over the pooled session, retrying transient failures.
+        
+        429 and 5xx responses as well as connection errors are retried with exponential
+        backoff. POSTs carry a stable X-Request-Id (request_id, or a random one) so Todoist can
+        de-duplicate retried writes. Every attempt waits for the request budget at the given
+        priority. The last response is returned (or the last error raised) once retries run out.
+        """
+        headers = kwargs.pop("headers", {})
+        if method == "POST":
+            headers = dict(headers, **{"X-Request-Id": request_id or str(uuid.uuid4())})
+        kwargs.setdefault("timeout", self.timeout)
+        
+        attempt = 0
+        while True:
+            response = None
+            if self.budget is not None:
+                self.budget.acquire(priority)
+            started = time.perf_counter() if self.metrics.enabled else None
+            try:
+                with self.stats_lock:
+                    self.request_count += 1
+                response = self.session.request(method, f"{base_url or self.base_url}{path}", headers=headers, **kwargs)
+                if started is not None:
+                    self._record_request(method, path, response, started)
+                if response.status_code == 429:
+                    with self.stats_lock:
+                        self.rate_limited_count += 1
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    if response.status_code == 429:
+                        self.budget_exhausted = True
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if started is not None:
+                    self._record_request(method, path, None, started)
+                if attempt >= self.max_retries:
+                    raise
+            
+            time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+            with self.stats_lock:
+                self.retry_count += 1
+            self.metrics.add("todoist_sync_api_retries_total", endpoint=endpoint_name(method, path))
+    
+    def _record_request(self, method: str, path: str, response: Optional[requests.Response], started: float):
+        """Record latency, status and payload sizes of one request attempt."""
+        endpoint = endpoint_name(method, path)
+        self.metrics.observe("todoist_sync_api_request_duration_seconds", time.perf_counter() - started, endpoint=endpoint)
+        status = str(response.status_code) if response is not None else "error"
+        self.metrics.add("todoist_sync_api_requests_total", endpoint=endpoint, status=status)
+        if response is not None:
+            body = response.request.body
+            self.metrics.add("todoist_sync_api_request_bytes_total", len(body) if body else 0, endpoint=endpoint)
+            self.metrics.add("todoist_sync_api_response_bytes_total", len(response.content), endpoint=endpoint)
+    
+    def connection_stats(self) -> Dict[str, int]:
+        """Return request, retry and connection reuse counters for this client."""
+        new_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                new_connections += pool.num_connections
+        
+        return {
+            "requests": self.request_count,
+            "retries": self.retry_count,
+            "connections_opened": new_connections,
+            "connections_reused": max(self.request_count - new_connections, 0),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "throttled_seconds": round(self.budget.waited, 1) if self.budget else 0.0,
+            "rate_limited": self.rate_limited_count,
+        }
+    
+    def stats_summary(self) -> str:
+        """Describe HTTP usage for the sync summary."""
+        stats = self.connection_stats()
+        return (f"API requests: {stats['requests']} ({stats['retries']} retries), "
+                f"connections opened: {stats['connections_opened']}, reused: {stats['connections_reused']}, "
+                f"cache hits: {stats['cache_hits']}, misses: {stats['cache_misses']}"
+                + (f", {self.budget.summary()}" if self.budget else "")
+                + (f", rate limited (429): {stats['rate_limited']}" if stats['rate_limited'] else ""))
+    
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+    
+    def _cache_fresh(self, entry: Optional[Dict]) -> bool:
+        """Whether a cache entry exists and is younger than the TTL."""
+        return entry is not None and time.monotonic() - entry["fetched"] < self.cache_ttl
+    
+    def _count_cache(self, hit: bool):
+        with self.stats_lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+    
+    def _cached_tasks(self, project_id: str) -> Optional[Dict]:
+        """Return the fresh cache entry for a project, marking it most recently used."""
+        entry = self.tasks_cache.get(str(project_id))
+        if not self._cache_fresh(entry):
+            return None
+        self.tasks_cache.move_to_end(str(project_id))
+        return entry
+    
+    def _store_tasks(self, project_id: str, tasks: List[Dict]):
+        """Cache a project's task list, evicting the least recently used projects beyond the limit."""
+        self.tasks_cache[str(project_id)] = {
+            "fetched": time.monotonic(),
+            "tasks": {str(task["id"]): task for task in tasks},
+            "by_content": None,
+        }
+        self.tasks_cache.move_to_end(str(project_id))
+        while len(self.tasks_cache) > self.cache_max_projects:
+            self.tasks_cache.popitem(last=False)
+    
+    def _content_index(self, entry: Dict) -> Dict[str, Dict[str, Dict]]:
+        """Map content to the tasks with that content by ID, in the order they were indexed.
+        
+        Built on first use; writes through the client then keep it up to date task by task.
+        """
+        if entry["by_content"] is None:
+            index = {}
+            for task in entry["tasks"].values():
+                index.setdefault(task.get("content"), {})[str(task["id"])] = task
+            entry["by_content"] = index
+        return entry["by_content"]
+    
+    @staticmethod
+    def _unindex_task(index: Dict[str, Dict[str, Dict]], task: Dict):
+        tasks = index.get(task.get("content"))
+        if tasks is not None:
+            tasks.pop(str(task["id"]), None)
+            if not tasks:
+                del index[task.get("content")]
+    
+    def _cache_put_task(self, task: Dict, project_id: Optional[str] = None):
+        """Add or replace a task in the cached list of its project."""
+        with self.cache_lock:
+            task_id = str(task["id"])
+            for cached_project_id, entry in self.tasks_cache.items():
+                old_task = entry["tasks"].get(task_id)
+                if old_task is not None:
+                    new_task = dict(old_task, **task)
+                    entry["tasks"][task_id] = new_task
+                    index = entry["by_content"]
+                    if index is not None:
+                        if new_task.get("content") != old_task.get("content"):
+                            self._unindex_task(index, old_task)
+                        index.setdefault(new_task.get("content"), {})[task_id] = new_task
+                    return
+            
+            entry = self.tasks_cache.get(str(project_id or task.get("project_id")))
+            if entry is not None:
+                entry["tasks"][task_id] = task
+                if entry["by_content"] is not None:
+                    entry["by_content"].setdefault(task.get("content"), {})[task_id] = task
+    
+    def _cache_drop_task(self, task_id: str):
+        """Remove a closed or deleted task from the cache."""
+        with self.cache_lock:
+            for entry in self.tasks_cache.values():
+                task = entry["tasks"].pop(str(task_id), None)
+                if task is not None:
+                    if entry["by_content"] is not None:
+                        self._unindex_task(entry["by_content"], task)
+                    return
+    
+    def invalidate_cache(self, project_id: Optional[str] = None):
+        """Forget cached tasks of one project, or all cached projects and tasks."""
+        with self.cache_lock:
+            if project_id is None:
+                self.projects_cache = None
+                self.tasks_cache.clear()
+            else:
+                self.tasks_cache.pop(str(project_id), None)
     
     def get_projects(self) -> List[Dict]:
         """Get all projects from Todoist."""
+        with self.cache_lock:
+            if self._cache_fresh(self.projects_cache):
+                self._count_cache(True)
+                return list(self.projects_cache["projects"])
+        self._count_cache(False)
+        
         try:
-            response = requests.get(f"{self.base_url}/projects", headers=self.headers)
+            response = self._request("GET", "/projects")
             response.raise_for_status()
-            return response.json()
+            projects = response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching projects: {e}")
             return []
+        
+        if self.cache_ttl > 0:
+            with self.cache_lock:
+                self.projects_cache = {"fetched": time.monotonic(), "projects": projects}
+        return list(projects)
     
-    def get_tasks(self, project_id: str) -> List[Dict]:
-        """Get all tasks from a specific project."""
+    def get_tasks(self, project_id: str) -> Optional[List[Dict]]:
+        """Get all tasks from a specific project, or None if they could not be fetched."""
+        with self.cache_lock:
+            entry = self._cached_tasks(project_id)
+            if entry is not None:
+                self._count_cache(True)
+                return list(entry["tasks"].values())
+        self._count_cache(False)
+        
         try:
             params = {"project_id": project_id}
-            response = requests.get(f"{self.base_url}/tasks", headers=self.headers, params=params)
+            response = self._request("GET", "/tasks", params=params)
             response.raise_for_status()
-            return response.json()
+            tasks = response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching tasks: {e}")
-            return []
+            return None
+        
+        if self.cache_ttl > 0:
+            with self.cache_lock:
+                self._store_tasks(project_id, tasks)
+        return list(tasks)
+    
+    def sync_items(self, sync_token: str = "*") -> Optional[Dict]:
+        """Fetch task changes from the Sync API since sync_token ("*" requests a full sync).
+        
+        Returns the response with the new sync_token, full_sync flag and changed items,
+        or None if the request failed (e.g. the sync token is no longer valid).
+        """
+        try:
+            data = {"sync_token": sync_token, "resource_types": ["items"]}
+            response = self._request("POST", "/sync", base_url=self.sync_url, json=data)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching task changes: {e}")
+            return None
     
-    def create_task(self, content: str, project_id: str, description: str = "") -> Optional[Dict]:
-        """Create a new task in Todoist."""
+    def create_task(self, content: str, project_id: str, description: str = "",
+                    request_id: Optional[str] = None) -> Optional[Dict]:
+        """Create a new task in Todoist; reusing a request_id lets Todoist drop a repeated create."""
         try:
             data = {
                 "content": content,
                 "project_id": project_id,
                 "description": description
             }
-            response = requests.post(f"{self.base_url}/tasks", headers=self.headers, json=data)
+            response = self._request("POST", "/tasks", json=data, priority=self.PRIORITY_CREATE, request_id=request_id)
             response.raise_for_status()
-            return response.json()
+            task = response.json()
+            self._cache_put_task(task, project_id)
+            return task
         except requests.exceptions.RequestException as e:
             print(f"Error creating task: {e}")
             return None
@@ -53,24 +405,28 @@ class TodoistClient:
     def delete_task(self, task_id: str) -> bool:
         """Delete a task from Todoist."""
         try:
-            response = requests.delete(f"{self.base_url}/tasks/{task_id}", headers=self.headers)
+            response = self._request("DELETE", f"/tasks/{task_id}", priority=self.PRIORITY_CLOSE)
             response.raise_for_status()
+            self._cache_drop_task(task_id)
             return True
         except requests.exceptions.RequestException as e:
             print(f"Error deleting task: {e}")
             return False
     
-    def close_task(self, task_id: str) -> bool:
+    def close_task(self, task_id: str, request_id: Optional[str] = None) -> bool:
         """Close (complete) a task in Todoist."""
         try:
-            response = requests.post(f"{self.base_url}/tasks/{task_id}/close", headers=self.headers)
+            response = self._request("POST", f"/tasks/{task_id}/close", priority=self.PRIORITY_CLOSE,
+                                     request_id=request_id)
             response.raise_for_status()
+            self._cache_drop_task(task_id)
             return True
         except requests.exceptions.RequestException as e:
             print(f"Error closing task: {e}")
             return False
     
-    def update_task(self, task_id: str, content: Optional[str] = None, description: Optional[str] = None) -> Optional[Dict]:
+    def update_task(self, task_id: str, content: Optional[str] = None, description: Optional[str] = None,
+                    request_id: Optional[str] = None) -> Optional[Dict]:
         """Update an existing task."""
         try:
             data = {}
@@ -79,16 +435,116 @@ class TodoistClient:
             if description:
                 data["description"] = description
             
-            response = requests.post(f"{self.base_url}/tasks/{task_id}", headers=self.headers, json=data)
+            response = self._request("POST", f"/tasks/{task_id}", json=data, priority=self.PRIORITY_UPDATE,
+                                     request_id=request_id)
             response.raise_for_status()
-            return response.json()
+            task = response.json()
+            self._cache_put_task(dict(task, id=task_id))
+            return task
         except requests.exceptions.RequestException as e:
             print(f"Error updating task: {e}")
             return None
     
+    def queue_command(self, command_type: str, args: Dict, ref=None, temp_id: Optional[str] = None,
+                      command_id: Optional[str] = None) -> Dict:
+        """Queue a Sync API command; ref is handed back with the command's result on flush.
+        
+        command_id becomes the command's uuid, which Todoist uses to ignore a command it has
+        already applied, so a journalled command can be resent safely.
+        """
+        command = {"type": command_type, "uuid": command_id or str(uuid.uuid4()), "args": args}
+        if temp_id:
+            command["temp_id"] = temp_id
+        self.command_queue.append((command, ref))
+        return command
+    
+    def queue_create_task(self, content: str, project_id: str, description: str = "", ref=None,
+                          command_id: Optional[str] = None) -> str:
+        """Queue an item_add command and return its temp ID."""
+        temp_id = str(uuid.uuid4())
+        args = {"content": content, "project_id": project_id, "description": description}
+        self.queue_command("item_add", args, ref, temp_id, command_id)
+        return temp_id
+    
+    def queue_close_task(self, task_id: str, ref=None, command_id: Optional[str] = None):
+        """Queue an item_close command."""
+        self.queue_command("item_close", {"id": task_id}, ref, command_id=command_id)
+    
+    def queue_update_task(self, task_id: str, content: Optional[str] = None, description: Optional[str] = None, ref=None,
+                          command_id: Optional[str] = None):
+        """Queue an item_update command."""
+        args = {"id": task_id}
+        if content:
+            args["content"] = content
+        if description:
+            args["description"] = description
+        self.queue_command("item_update", args, ref, command_id=command_id)
+    
+    def pending_command_count(self) -> int:
+        """Number of queued commands not yet sent."""
+        return len(self.command_queue)
+    
+    def flush_commands(self, full_batches_only: bool = False) -> List[Dict]:
+        """Send queued commands in batches of up to batch_size per request.
+        
+        With full_batches_only, a trailing partial batch stays queued for a later flush.
+        Returns one result per command, in queue order, with the keys
+        command, ref, ok, task_id (the real ID, resolved from temp IDs for item_add) and error.
+        """
+        results = []
+        while self.command_queue and (not full_batches_only or len(self.command_queue) >= self.batch_size):
+            batch = self.command_queue[:self.batch_size]
+            del self.command_queue[:self.batch_size]
+            results.extend(self._send_command_batch(batch))
+        return results
+    
+    def _send_command_batch(self, batch: List) -> List[Dict]:
+        """Send one batch of commands to the Sync API and map statuses back to each command."""
+        try:
+            priority = min(self.COMMAND_PRIORITIES.get(command["type"], self.PRIORITY_READ) for command, _ in batch)
+            response = self._request("POST", "/sync", base_url=self.sync_url, priority=priority,
+                                     json={"commands": [command for command, _ in batch]})
+            response.raise_for_status()
+            body = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error sending {len(batch)} batched commands: {e}")
+            return [{"command": command, "ref": ref, "ok": False, "task_id": None, "error": str(e)}
+                    for command, ref in batch]
+        
+        statuses = body.get("sync_status", {})
+        temp_id_mapping = body.get("temp_id_mapping", {})
+        results = []
+        for command, ref in batch:
+            status = statuses.get(command["uuid"])
+            ok = status == "ok"
+            if "temp_id" in command:
+                task_id = temp_id_mapping.get(command["temp_id"])
+            else:
+                task_id = command["args"].get("id")
+            
+            error = None
+            if not ok:
+                error = status.get("error", str(status)) if isinstance(status, dict) else "no status returned"
+            elif command["type"] == "item_add" and task_id:
+                self._cache_put_task(dict(command["args"], id=task_id))
+            elif command["type"] == "item_update":
+                self._cache_put_task(command["args"])
+            elif command["type"] in ("item_close", "item_delete"):
+                self._cache_drop_task(task_id)
+            results.append({"command": command, "ref": ref, "ok": ok, "task_id": task_id, "error": error})
+        return results
+    
     def find_task_by_content(self, content: str, project_id: str) -> Optional[Dict]:
         """Find a task by its content in a specific project."""
         tasks = self.get_tasks(project_id)
+        if tasks is None:
+            return None
+        with self.cache_lock:
+            entry = self._cached_tasks(project_id)
+            if entry is not None:
+                matches = self._content_index(entry).get(content)
+                return next(iter(matches.values())) if matches else None
+        
         for task in tasks:
             if task.get("content") == content:
                 return task
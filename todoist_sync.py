@@ -4,11 +4,99 @@ Todoist Xcode Sync - Main script for syncing TODO statements from Xcode projects
 """
 
 import argparse
+import json
+import os
 import sys
-from typing import Set, List
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Set, List, Iterable, Iterator, Tuple, Callable, Dict, Optional
 from config import Config
 from xcode_parser import XcodeParser, TodoItem
 from todoist_client import TodoistClient
+from git_scanner import GitDiffScanner, GitCommitScanner, GitError
+from reconciler import Reconciler
+from state_store import StateStore
+from sync_journal import SyncJournal
+from sync_plan import SyncPlan
+from file_watcher import ProjectWatcher
+from scan_cache import ScanCache, BlobScanCache
+from scan_shards import ShardManifest, parse_shard
+from metrics import Metrics
+from sync_server import SyncServer
+from sync_client import default_socket_path
+
+class InFlightRunner:
+    """Runs Todoist client calls on a thread pool with a bounded number of requests in flight.
+    
+    Results are passed to their callbacks in submission order, so progress output and
+    counters match a serial run. With max_in_flight of 1 calls run inline.
+    """
+    
+    def __init__(self, max_in_flight: int = 1):
+        self.max_in_flight = max(1, max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight) if self.max_in_flight > 1 else None
+        self.pending = deque()
+    
+    def submit(self, call: Callable, args: Tuple, on_result: Callable):
+        """Run call(*args) and hand its return value to on_result."""
+        if self.executor is None:
+            on_result(call(*args))
+            return
+        
+        self.pending.append((self.executor.submit(call, *args), on_result))
+        # Keep a short queue behind the running calls so workers never idle, without unbounded buffering
+        while len(self.pending) > self.max_in_flight * 2:
+            self._complete_oldest()
+    
+    def _complete_oldest(self):
+        """Wait for the oldest submitted call and report its result."""
+        future, on_result = self.pending.popleft()
+        on_result(future.result())
+    
+    def close(self):
+        """Wait for all submitted calls and shut the pool down, even if a call raised."""
+        try:
+            while self.pending:
+                self._complete_oldest()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+
+def load_manifest(manifest_path: str) -> Optional[List[Dict]]:
+    """Load a multi-project manifest.
+    
+    The manifest is a JSON object mapping project paths to Todoist project IDs, or a list of
+    {"path", "project_id"} objects that may also set "scan_cache" and "git_state" per project.
+    Relative paths are resolved against the manifest's directory.
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest {manifest_path}: {e}")
+        return None
+    
+    if isinstance(data, dict):
+        data = [{"path": path, "project_id": project_id} for path, project_id in data.items()]
+    
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    for index, entry in enumerate(data if isinstance(data, list) else []):
+        if not isinstance(entry, dict) or not entry.get("path") or not entry.get("project_id"):
+            print(f"Error: manifest entry {index + 1} needs a path and a project_id")
+            return None
+        entry = dict(entry, project_id=str(entry["project_id"]))
+        for key in ("path", "scan_cache", "git_state"):
+            if entry.get(key):
+                entry[key] = os.path.join(base_dir, os.path.expanduser(entry[key]))
+        entries.append(entry)
+    
+    if not entries:
+        print(f"Error: manifest {manifest_path} lists no projects")
+        return None
+    return entries
 
 class TodoistSync:
     """Main sync orchestrator."""
@@ -17,11 +105,65 @@ class TodoistSync:
         self.config = config
         if not config.todoist_api_token:
             raise ValueError("Todoist API token is required")
-        self.todoist_client = TodoistClient(config.todoist_api_token)
+        self.metrics = Metrics(bool(config.metrics_json_path or config.metrics_prometheus_path))
+        self.todoist_client = TodoistClient(
+            config.todoist_api_token,
+            base_url=config.todoist_api_url,
+            pool_size=max(config.http_pool_size, config.max_in_flight),
+            timeout=config.http_timeout,
+            max_retries=config.http_max_retries,
+            sync_url=config.todoist_sync_api_url,
+            batch_size=config.batch_size,
+            cache_ttl=config.cache_ttl,
+            cache_max_projects=config.cache_max_projects,
+            rate_limit=config.rate_limit,
+            metrics=self.metrics
+        )
         self.parser = XcodeParser(config)
+        self.parser.metrics = self.metrics
+        self.state_store = StateStore(config.state_db_path) if config.state_db_path else None
+        self.journal = SyncJournal(config.journal_path) if config.journal_path else None
+        self.blob_cache = BlobScanCache(config.blob_cache_path, config)
+        self.last_counts: Optional[Dict[str, int]] = None
+        # Operations of the last sync that Todoist rejected or that failed to send
+        self.last_failed = 0
+    
+    def write_metrics(self):
+        """Write the configured metrics reports for the run so far."""
+        self.metrics.write_reports(self.config.metrics_json_path, self.config.metrics_prometheus_path)
     
-    def sync_project(self, project_path: str, dry_run: bool = False) -> bool:
-        """Sync TODOs from Xcode project to Todoist."""
+    def _get_existing_tasks(self, project_id: str, offline: bool = False) -> Optional[List[Dict]]:
+        """Get the project's open tasks, from the local state store when one is configured.
+        
+        Returns None if they could not be fetched; a sync must then stop rather than treat the
+        project as empty, which would re-create every task.
+        """
+        with self.metrics.phase("fetch_tasks"):
+            tasks = self._load_existing_tasks(project_id, offline)
+        if tasks is None:
+            print(f"Error: could not fetch the tasks of project {project_id}; stopping without changes")
+        return tasks
+    
+    def _load_existing_tasks(self, project_id: str, offline: bool) -> Optional[List[Dict]]:
+        if self.state_store is None:
+            return self.todoist_client.get_tasks(project_id)
+        
+        if offline:
+            print("Using local task state (offline)")
+        elif not self.state_store.pull(self.todoist_client):
+            print("Warning: could not refresh local task state; fetching tasks directly")
+            return self.todoist_client.get_tasks(project_id)
+        return self.state_store.get_tasks(project_id)
+    
+    def sync_project(self, project_path: str, dry_run: bool = False, offline: bool = False,
+                     shard_manifests: Optional[List[str]] = None, plan_path: Optional[str] = None) -> bool:
+        """Sync TODOs from Xcode project to Todoist.
+        
+        With shard_manifests, the scan results are merged from the manifests written by
+        sharded scans (--shard) instead of scanning the project here. With plan_path, the run
+        is a dry run whose changes are also saved to plan_path for apply_plan.
+        """
+        dry_run = dry_run or plan_path is not None
         if not self.config.validate():
             return False
         
@@ -31,96 +173,605 @@ class TodoistSync:
             print("Use --project-id or set TODOIST_PROJECT_ID in .env file")
             return False
         
-        # Parse the Xcode project
-        todos, completions = self.parser.parse_project(project_path)
+        # Parse the Xcode project; results are streamed file by file into the sync
+        git_scanner = None
+        scan_results = None
+        if shard_manifests is not None:
+            with self.metrics.phase("scan"):
+                scan_results = ShardManifest(self.parser).merge(project_path, shard_manifests)
+            if scan_results is None:
+                print("Error: refusing to sync from incomplete or stale shard manifests")
+                return False
+        elif self.config.scan_revision:
+            try:
+                with self.metrics.phase("scan"):
+                    scan_results = GitCommitScanner(self.parser, self.blob_cache).scan(project_path, self.config.scan_revision)
+            except GitError as e:
+                print(f"Error: cannot scan {self.config.scan_revision} ({e})")
+                return False
+        elif self.config.git_state_path:
+            git_scanner = GitDiffScanner(self.parser, self.config.git_state_path)
+            try:
+                with self.metrics.phase("scan"):
+                    todos, completions = git_scanner.scan(project_path)
+                scan_results = [(project_path, todos, completions)]
+            except GitError as e:
+                print(f"Warning: git incremental scan unavailable ({e}); scanning the whole project")
+                git_scanner = None
+        if scan_results is None:
+            scan_results = self.parser.iter_project(project_path)
+        
+        if offline and not dry_run:
+            print("Error: --offline is only supported together with --dry-run")
+            return False
+        if offline and not self.state_store:
+            print("Error: --offline requires a local state store (--state-db)")
+            return False
         
         if dry_run:
-            return self._dry_run_sync(todos, completions, project_id)
-        else:
-            return self._perform_sync(todos, completions, project_id)
+            return self._dry_run_sync(scan_results, project_id, project_path, offline, plan_path)
+        
+        success = self._perform_sync(scan_results, project_id, project_path)
+        if success and git_scanner:
+            git_scanner.mark_synced()
+        return success
     
-    def _dry_run_sync(self, todos: List[TodoItem], completions: List[TodoItem], project_id: str) -> bool:
-        """Preview what changes would be made without actually making them."""
+    def _dry_run_sync(self, scan_results: Iterable[Tuple[str, List[TodoItem], List[TodoItem]]], project_id: str,
+                      project_path: str, offline: bool = False, plan_path: Optional[str] = None) -> bool:
+        """Preview what changes would be made without actually making them, saving them to plan_path if given."""
         print("\n=== DRY RUN - Preview of changes ===")
+        if self.journal and self.journal.pending(project_id):
+            print(f"Note: {len(self.journal.pending(project_id))} operations from an interrupted sync are pending "
+                  f"in {self.journal.journal_path}; the next sync sends them first")
         
         # Get existing tasks from Todoist
-        existing_tasks = self.todoist_client.get_tasks(project_id)
-        existing_task_contents = {task['content'] for task in existing_tasks}
-        
-        # Find new TODOs to add
-        new_todos = []
-        for todo in todos:
-            todoist_content = self.parser.get_todo_content_for_todoist(todo)
-            if todoist_content not in existing_task_contents:
-                new_todos.append(todo)
-        
-        # Find completed tasks to remove
-        completed_tasks = []
-        for completion in completions:
-            # Look for matching TODO tasks that should be completed
-            for task in existing_tasks:
-                if completion.content in task['content']:
-                    completed_tasks.append(task)
-                    break
+        existing_tasks = self._get_existing_tasks(project_id, offline)
+        if existing_tasks is None:
+            return False
+        reconciler = Reconciler(self.parser, existing_tasks, project_path)
+        
+        # Find new TODOs to add, tracked TODOs whose location changed and completed tasks to remove
+        all_completions = []
+        planned = list(self._plan_todos(scan_results, reconciler, project_id, all_completions))
+        closes = self._plan_closes(reconciler, all_completions, project_id)
+        new_todos = [op for op in planned if op["kind"] == "create"]
+        moved_tasks = [op for op in planned if op["kind"] == "update"]
+        tasks_by_id = {str(task['id']): task for task in existing_tasks}
         
         print(f"\nWould add {len(new_todos)} new TODO tasks:")
-        for todo in new_todos:
-            print(f"  + {self.parser.get_todo_content_for_todoist(todo)}")
+        for op in new_todos:
+            print(f"  + {op['content']}")
         
-        print(f"\nWould complete {len(completed_tasks)} tasks:")
-        for task in completed_tasks:
-            print(f"  ✓ {task['content']}")
+        print(f"\nWould update {len(moved_tasks)} existing tasks:")
+        for op in moved_tasks:
+            old_content = tasks_by_id[str(op["task_id"])]['content']
+            if old_content == op["content"]:
+                print(f"  ~ {op['content']}")
+            else:
+                print(f"  ~ {old_content} -> {op['content']}")
         
-        if not new_todos and not completed_tasks:
+        print(f"\nWould complete {len(closes)} tasks:")
+        for op in closes:
+            print(f"  ✓ {op['content']}")
+        
+        if not new_todos and not moved_tasks and not closes:
             print("\nNo changes needed - everything is in sync!")
         
+        if plan_path:
+            operations = sorted(closes + planned, key=lambda op: SyncJournal.KIND_ORDER[op["kind"]])
+            plan = SyncPlan(project_id, SyncPlan.task_state_version(existing_tasks), operations,
+                            os.path.abspath(project_path))
+            if not plan.save(plan_path):
+                return False
+            print(f"\nPlan with {len(operations)} operations written to {plan_path}; "
+                  f"run with --apply {plan_path} to make these changes")
+        
+        print(f"\n{self.todoist_client.stats_summary()}")
         return True
     
-    def _perform_sync(self, todos: List[TodoItem], completions: List[TodoItem], project_id: str) -> bool:
-        """Actually perform the sync operations."""
+    def _plan_todos(self, scan_results: Iterable[Tuple[str, List[TodoItem], List[TodoItem]]], reconciler: Reconciler,
+                    project_id: str, all_completions: List[TodoItem]) -> Iterator[Dict]:
+        """Yield create and update operations for scanned TODOs, file by file.
+        
+        Completions are collected into all_completions for _plan_closes.
+        """
+        for _, todos, completions in scan_results:
+            for todo in todos:
+                with self.metrics.phase("plan"):
+                    action, todoist_content, description, task = reconciler.plan_todo(todo)
+                    op = None
+                    if action == Reconciler.CREATE:
+                        op = SyncJournal.new_operation("create", project_id, todoist_content, description)
+                    elif action == Reconciler.UPDATE:
+                        # The TODO moved (or predates fingerprints): update the task in place
+                        op = SyncJournal.new_operation("update", project_id, todoist_content, description, task['id'])
+                if op is not None:
+                    yield op
+            all_completions.extend(completions)
+    
+    def _plan_closes(self, reconciler: Reconciler, completions: List[TodoItem], project_id: str) -> List[Dict]:
+        """Close operations for completions, matched against the task snapshot in one pass."""
+        with self.metrics.phase("plan"):
+            return [SyncJournal.new_operation("close", project_id, task['content'], task_id=task['id'])
+                    for _, task in reconciler.match_completions(completions)]
+    
+    def _perform_sync(self, scan_results: Iterable[Tuple[str, List[TodoItem], List[TodoItem]]], project_id: str,
+                      project_path: str) -> bool:
+        """Actually perform the sync operations, one scanned file at a time.
+        
+        Without a request budget or journal, creates and updates are sent as files are scanned.
+        With either, the whole plan is computed first and sent closes first, then updates, then
+        creates, and sending stops once Todoist keeps answering 429. With a journal every
+        operation is recorded before it is sent, and operations left over by an interrupted or
+        throttled run are resumed before anything new is planned.
+        """
         print("\n=== Performing sync ===")
+        client = self.todoist_client
+        client.budget_exhausted = False
+        journal = self.journal
+        scheduled = journal is not None or client.budget is not None
+        
+        batch = self.config.batch_writes
+        counts = {"added": 0, "updated": 0, "completed": 0}
+        self.last_counts = counts
+        self.last_failed = 0
+        
+        resumed = journal.pending(project_id) if journal else []
+        if resumed:
+            # Read the task list fresh: operations that were in flight may have been applied
+            client.invalidate_cache(project_id)
         
         # Get existing tasks from Todoist
-        existing_tasks = self.todoist_client.get_tasks(project_id)
-        existing_task_contents = {task['content'] for task in existing_tasks}
-        
-        # Add new TODOs
-        added_count = 0
-        for todo in todos:
-            todoist_content = self.parser.get_todo_content_for_todoist(todo)
-            if todoist_content not in existing_task_contents:
-                description = self.parser.get_todo_description(todo)
-                task = self.todoist_client.create_task(todoist_content, project_id, description)
-                if task:
-                    print(f"✓ Added: {todoist_content}")
-                    added_count += 1
-                else:
-                    print(f"✗ Failed to add: {todoist_content}")
-        
-        # Handle completions
-        completed_count = 0
-        for completion in completions:
-            # Find matching TODO tasks to complete
-            for task in existing_tasks:
-                if completion.content in task['content'] and not task.get('is_completed', False):
-                    if self.todoist_client.close_task(task['id']):
-                        print(f"✓ Completed: {task['content']}")
-                        completed_count += 1
-                    else:
-                        print(f"✗ Failed to complete: {task['content']}")
-                    break
+        existing_tasks = self._get_existing_tasks(project_id)
+        if existing_tasks is None:
+            if resumed:
+                print(f"{len(resumed)} operations from an interrupted sync stay pending in {journal.journal_path}")
+            return False
         
+        if resumed:
+            left = self._resume_journal(resumed, existing_tasks, project_id, counts)
+            if left:
+                self._report_stopped(left, counts)
+                return False
+            client.invalidate_cache(project_id)
+            existing_tasks = self._get_existing_tasks(project_id)
+            if existing_tasks is None:
+                return False
+        
+        reconciler = Reconciler(self.parser, existing_tasks, project_path)
+        runner = InFlightRunner(1 if batch else self.config.max_in_flight)
+        dispatch = self._operation_dispatcher(runner, project_id, counts)
+        
+        planned = []
+        all_completions = []
+        metrics = self.metrics
+        for op in self._plan_todos(scan_results, reconciler, project_id, all_completions):
+            if scheduled:
+                planned.append(op)
+                continue
+            with metrics.phase("write"):
+                dispatch(op)
+                if batch and client.pending_command_count() >= client.batch_size:
+                    self._flush_batched_commands(counts, full_batches_only=True)
+        
+        # Handle completions once every file is scanned
+        closes = self._plan_closes(reconciler, all_completions, project_id)
+        left = []
+        with metrics.phase("write"):
+            if scheduled:
+                planned = sorted(closes + planned, key=lambda op: SyncJournal.KIND_ORDER[op["kind"]])
+                if journal:
+                    journal.record_planned(planned)
+                left = self._dispatch_until_exhausted(planned, dispatch, runner, counts)
+            else:
+                for op in closes:
+                    dispatch(op)
+                runner.close()
+                if batch:
+                    self._flush_batched_commands(counts)
+        
+        for action, count in counts.items():
+            metrics.add("todoist_sync_tasks_total", count, action=action)
+        
+        if left:
+            self._report_stopped(left, counts)
+            return False
+        if journal:
+            journal.compact()
+        
+        self._report_completed(counts)
+        return True
+    
+    def _report_completed(self, counts: Dict[str, int]):
         print(f"\nSync completed:")
-        print(f"  Added: {added_count} tasks")
-        print(f"  Completed: {completed_count} tasks")
+        print(f"  Added: {counts['added']} tasks")
+        print(f"  Updated: {counts['updated']} tasks")
+        print(f"  Completed: {counts['completed']} tasks")
+        print(f"  {self.todoist_client.stats_summary()}")
+    
+    def apply_plan(self, plan_path: str) -> bool:
+        """Make exactly the changes of a plan saved by a --plan run, without scanning the project.
         
+        The project's tasks are fetched once (or pulled incrementally with a state store) and
+        compared with the task state the plan was computed against; if they changed, the plan
+        is refused and has to be recomputed.
+        """
+        if not self.config.validate():
+            return False
+        plan = SyncPlan.load(plan_path)
+        if plan is None:
+            return False
+        project_id = plan.project_id
+        counts = plan.counts()
+        print(f"Applying plan {plan_path}: {counts['create']} creates, {counts['update']} updates, "
+              f"{counts['close']} closes in project {project_id}")
+        if plan.project_path:
+            print(f"Planned from: {plan.project_path}")
+        
+        journal = self.journal
+        if journal and journal.pending(project_id):
+            print(f"Error: {journal.journal_path} has operations pending from an interrupted sync; "
+                  f"run a sync to finish them, then compute a new plan")
+            return False
+        
+        # Cheap re-check: the task list only, no scan
+        client = self.todoist_client
+        client.invalidate_cache(project_id)
+        existing_tasks = self._get_existing_tasks(project_id)
+        if existing_tasks is None:
+            return False
+        if SyncPlan.task_state_version(existing_tasks) != plan.state_version:
+            print("Error: the project's tasks changed since the plan was computed; refusing to apply it")
+            print("Compute a new plan with --plan")
+            return False
+        
+        print("\n=== Performing sync ===")
+        client.budget_exhausted = False
+        counts = {"added": 0, "updated": 0, "completed": 0}
+        self.last_counts = counts
+        self.last_failed = 0
+        runner = InFlightRunner(1 if self.config.batch_writes else self.config.max_in_flight)
+        dispatch = self._operation_dispatcher(runner, project_id, counts)
+        with self.metrics.phase("write"):
+            if journal:
+                journal.record_planned(plan.operations)
+            left = self._dispatch_until_exhausted(plan.operations, dispatch, runner, counts)
+        
+        for action, count in counts.items():
+            self.metrics.add("todoist_sync_tasks_total", count, action=action)
+        if left:
+            self._report_stopped(left, counts)
+            return False
+        if journal:
+            journal.compact()
+        
+        self._report_completed(counts)
         return True
     
+    def _operation_dispatcher(self, runner: InFlightRunner, project_id: str, counts: Dict[str, int]) -> Callable[[Dict], None]:
+        """Return a function that sends (or, when batching, queues) one planned operation.
+        
+        Results are reported, counted, mirrored to the state store and marked done in the journal.
+        """
+        client = self.todoist_client
+        
+        def on_result(op: Dict, result):
+            content = op["content"]
+            if op["kind"] == "create":
+                verb, done, count = "Added", "add", "added"
+            elif op["kind"] == "update":
+                verb, done, count = "Updated", "update", "updated"
+            else:
+                verb, done, count = "Completed", "complete", "completed"
+            if not result:
+                print(f"✗ Failed to {done}: {content}")
+                self.last_failed += 1
+                return
+            print(f"✓ {verb}: {content}")
+            counts[count] += 1
+            task_id = result["id"] if isinstance(result, dict) else op["task_id"]
+            if self.journal:
+                self.journal.record_done(op["key"], task_id)
+            if self.state_store:
+                if op["kind"] == "close":
+                    self.state_store.record_completed(op["task_id"])
+                else:
+                    self.state_store.record_task(result, project_id)
+        
+        def dispatch(op: Dict):
+            kind = op["kind"]
+            if self.config.batch_writes:
+                if kind == "create":
+                    client.queue_create_task(op["content"], project_id, op["description"], ref=op, command_id=op["key"])
+                elif kind == "update":
+                    client.queue_update_task(op["task_id"], op["content"], op["description"], ref=op, command_id=op["key"])
+                else:
+                    client.queue_close_task(op["task_id"], ref=op, command_id=op["key"])
+            elif kind == "create":
+                runner.submit(client.create_task, (op["content"], project_id, op["description"], op["key"]),
+                              partial(on_result, op))
+            elif kind == "update":
+                runner.submit(client.update_task, (op["task_id"], op["content"], op["description"], op["key"]),
+                              partial(on_result, op))
+            else:
+                runner.submit(client.close_task, (op["task_id"], op["key"]), partial(on_result, op))
+        
+        return dispatch
+    
+    def _dispatch_until_exhausted(self, operations: List[Dict], dispatch: Callable[[Dict], None],
+                                  runner: InFlightRunner, counts: Dict[str, int]) -> List[Dict]:
+        """Send operations in order until Todoist's request budget runs out; return those not sent."""
+        client = self.todoist_client
+        batch = self.config.batch_writes
+        sent = 0
+        for op in operations:
+            if client.budget_exhausted:
+                break
+            dispatch(op)
+            sent += 1
+            if batch and client.pending_command_count() >= client.batch_size:
+                self._flush_batched_commands(counts, full_batches_only=True)
+        runner.close()
+        if batch and not client.budget_exhausted:
+            self._flush_batched_commands(counts)
+        # Commands still queued were never sent
+        unsent = [ref for _, ref in client.command_queue]
+        client.command_queue.clear()
+        return unsent + operations[sent:]
+    
+    def _resume_journal(self, operations: List[Dict], existing_tasks: List[Dict], project_id: str,
+                        counts: Dict[str, int]) -> List[Dict]:
+        """Finish operations a previous run left pending; return those that still could not be sent.
+        
+        Operations already visible in the task list (e.g. a create whose response was lost) are
+        marked done without being resent. Resent operations reuse their idempotency keys.
+        Operations that fail again are dropped: the plan that follows recomputes them if needed.
+        """
+        open_tasks = {str(task['id']): task for task in existing_tasks}
+        created = {(task.get('content'), task.get('description') or '') for task in existing_tasks}
+        applied = []
+        remaining = []
+        for op in operations:
+            task = open_tasks.get(str(op["task_id"]))
+            if op["kind"] == "create":
+                done = (op["content"], op["description"] or '') in created
+            elif op["kind"] == "update":
+                done = task is None or (task.get('content') == op["content"]
+                                        and (not op["description"] or task.get('description') == op["description"]))
+            else:
+                done = task is None
+            (applied if done else remaining).append(op)
+        
+        for op in applied:
+            self.journal.record_done(op["key"], op["task_id"])
+        print(f"Resuming {len(remaining)} pending operations from the sync journal "
+              f"({len(applied)} already applied)")
+        
+        runner = InFlightRunner(1 if self.config.batch_writes else self.config.max_in_flight)
+        dispatch = self._operation_dispatcher(runner, project_id, counts)
+        left = self._dispatch_until_exhausted(remaining, dispatch, runner, counts)
+        if left:
+            return left
+        self.journal.record_dropped([op["key"] for op in remaining])
+        return []
+    
+    def _report_stopped(self, left: List[Dict], counts: Dict[str, int]):
+        """Summarise a sync that stopped because Todoist's request budget ran out."""
+        print(f"\nSync stopped: Todoist is rate limiting requests; {len(left)} operations were not sent")
+        if self.journal:
+            self.journal.compact()
+            pending = len(self.journal.pending(left[0]["project_id"]))
+            print(f"  {pending} unconfirmed operations are kept in {self.journal.journal_path} "
+                  f"and resumed by the next sync")
+        print(f"  Added: {counts['added']}, Updated: {counts['updated']}, Completed: {counts['completed']}")
+        print(f"  {self.todoist_client.stats_summary()}")
+    
+    def _flush_batched_commands(self, counts: Dict[str, int], full_batches_only: bool = False):
+        """Send queued Sync API commands, report each result and update the added/updated/completed counts."""
+        for result in self.todoist_client.flush_commands(full_batches_only):
+            command = result["command"]
+            if not result["ok"]:
+                self.last_failed += 1
+            if self.journal and result["ok"]:
+                self.journal.record_done(command["uuid"], result["task_id"])
+            if command["type"] == "item_add":
+                content = command["args"]["content"]
+                if result["ok"]:
+                    print(f"✓ Added: {content}")
+                    counts["added"] += 1
+                    if self.state_store and result["task_id"]:
+                        self.state_store.record_task(dict(command["args"], id=result["task_id"]))
+                else:
+                    print(f"✗ Failed to add: {content} ({result['error']})")
+            elif command["type"] == "item_update":
+                content = command["args"].get("content", result["ref"]["content"])
+                if result["ok"]:
+                    print(f"✓ Updated: {content}")
+                    counts["updated"] += 1
+                    if self.state_store:
+                        self.state_store.record_task(command["args"])
+                else:
+                    print(f"✗ Failed to update: {content} ({result['error']})")
+            elif command["type"] == "item_close":
+                content = result["ref"]["content"]
+                if result["ok"]:
+                    print(f"✓ Completed: {content}")
+                    counts["completed"] += 1
+                    if self.state_store:
+                        self.state_store.record_completed(command["args"]["id"])
+                else:
+                    print(f"✗ Failed to complete: {content} ({result['error']})")
+    
+    def sync_manifest(self, manifest_path: str, dry_run: bool = False) -> bool:
+        """Sync every project listed in a manifest through one scan pool and one API client.
+        
+        Projects are synced one after another; the process pool, HTTP connections, task cache
+        and request budget are shared, so each project only pays for its own scan and writes.
+        """
+        entries = load_manifest(manifest_path)
+        if entries is None:
+            return False
+        
+        print(f"Syncing {len(entries)} projects from {manifest_path}")
+        workers = self.config.scan_workers
+        self.parser.start_scan_pool(workers)
+        
+        # Per-project scan caches and git state replace the single-project settings
+        self.config.scan_cache_path = None
+        results = []
+        started = time.perf_counter()
+        try:
+            for entry in entries:
+                print(f"\n##### {entry['path']} -> project {entry['project_id']}")
+                self.config.set_project_id(entry['project_id'])
+                self.config.git_state_path = entry.get('git_state')
+                self.parser.scan_cache = None
+                if entry.get('scan_cache'):
+                    self.parser.scan_cache = ScanCache(entry['scan_cache'], self.config, self.config.scan_cache_use_hash)
+                
+                self.last_counts = None
+                requests_before = self.todoist_client.request_count
+                project_started = time.perf_counter()
+                success = self.sync_project(entry['path'], dry_run)
+                results.append({
+                    "path": entry['path'],
+                    "project_id": entry['project_id'],
+                    "success": success,
+                    "seconds": time.perf_counter() - project_started,
+                    "requests": self.todoist_client.request_count - requests_before,
+                    "counts": self.last_counts,
+                })
+        finally:
+            self.parser.close_scan_pool()
+        total_seconds = time.perf_counter() - started
+        
+        print(f"\n=== Manifest summary ({len(entries)} projects, {workers} scan workers) ===")
+        totals = {"added": 0, "updated": 0, "completed": 0}
+        for result in results:
+            counts = result["counts"]
+            if counts:
+                for key in totals:
+                    totals[key] += counts[key]
+                changes = f"+{counts['added']} ~{counts['updated']} ✓{counts['completed']}"
+            else:
+                changes = "dry run" if dry_run and result["success"] else "-"
+            status = "ok" if result["success"] else "FAILED"
+            print(f"  {status:>6} {result['seconds']:7.2f}s {result['requests']:5d} requests  {changes:<18} {result['path']}")
+        
+        failed = sum(1 for result in results if not result["success"])
+        print(f"\nTotal: {total_seconds:.2f}s for {len(results)} projects ({failed} failed)")
+        if not dry_run:
+            print(f"  Added: {totals['added']}, Updated: {totals['updated']}, Completed: {totals['completed']}")
+        print(f"  {self.todoist_client.stats_summary()}")
+        return failed == 0
+    
+    def watch_project(self, project_path: str, dry_run: bool = False, use_polling: bool = False) -> bool:
+        """Sync once, then keep syncing the TODOs of files as they change until interrupted.
+        
+        Changes are collected into debounced batches; only the touched files are re-parsed,
+        and only files whose TODOs or completions actually changed are pushed to Todoist.
+        Files are only recorded as synced once a sync succeeds; the changes of a failed sync
+        are sent again with the next batch, or after Config.watch_retry_delay seconds if
+        nothing else changes. Returns False if the initial sync fails.
+        """
+        if not self.config.validate():
+            return False
+        
+        project_id = self.config.get_project_id()
+        if not project_id:
+            print("Error: No Todoist project ID specified")
+            print("Use --project-id or set TODOIST_PROJECT_ID in .env file")
+            return False
+        
+        project_path = os.path.abspath(project_path)
+        watcher = ProjectWatcher(self.parser, project_path, debounce=self.config.watch_debounce,
+                                 poll_interval=self.config.watch_poll_interval, use_polling=use_polling)
+        
+        # Rows of every file as last synced, to tell real TODO changes from unrelated edits
+        file_rows: Dict[str, Tuple[List, List]] = {}
+        # Rows of files whose changes have not been synced yet
+        pending: Dict[str, Tuple[List, List]] = {}
+        
+        def record(scan_results):
+            for file_path, todos, completions in scan_results:
+                pending[file_path] = (self.parser.rows_from_items(todos), self.parser.rows_from_items(completions))
+                yield file_path, todos, completions
+        
+        def run_sync(scan_results) -> bool:
+            sync = self._dry_run_sync if dry_run else self._perform_sync
+            success = sync(scan_results, project_id, project_path) and not self.last_failed
+            self.write_metrics()
+            if success:
+                file_rows.update(pending)
+                pending.clear()
+            return success
+        
+        try:
+            if not run_sync(record(self.parser.iter_project(project_path))):
+                print("Error: the initial sync failed; not watching")
+                return False
+            print(f"\nWatching {project_path} for changes ({watcher.mode}); press Ctrl+C to stop")
+            
+            while True:
+                changed = watcher.next_batch(self.config.watch_retry_delay if pending else None)
+                # Each report covers one cycle: the rescan of the changed paths and its sync
+                self.metrics.reset()
+                retried = len(pending)
+                self._scan_changes(project_path, changed, file_rows, pending)
+                if pending:
+                    if not changed:
+                        print(f"\nRetrying the failed sync of {len(pending)} files")
+                    else:
+                        print(f"\n{len(changed)} paths changed; {len(pending)} files with TODO changes")
+                        if retried:
+                            print(f"  including changes to {retried} files from a failed sync")
+                    delta = [(file_path, self.parser.items_from_rows(todo_rows, file_path),
+                              self.parser.items_from_rows(completion_rows, file_path))
+                             for file_path, (todo_rows, completion_rows) in sorted(pending.items())]
+                    if not run_sync(delta):
+                        print(f"Sync failed; the changes to {len(pending)} files are sent again with the next batch "
+                              f"or in {self.config.watch_retry_delay:g}s")
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+        finally:
+            watcher.close()
+        return True
+    
+    def _scan_changes(self, project_path: str, changed: Set[str], file_rows: Dict[str, Tuple[List, List]],
+                      pending: Dict[str, Tuple[List, List]]):
+        """Re-parse changed paths into pending, keeping only files whose TODOs or completions changed
+        since they were last synced (file_rows)."""
+        to_scan = set()
+        for path in changed:
+            if os.path.isdir(path):
+                # New, moved-in or overflowed directories: rescan everything below them
+                to_scan.update(self.parser.find_source_files(path, project_path))
+            elif os.path.isfile(path):
+                to_scan.add(path)
+            
+            # Forget files that no longer exist at or below a removed path
+            prefix = path.rstrip(os.sep) + os.sep
+            for known in (file_rows, pending):
+                for file_path in [p for p in known if p == path or p.startswith(prefix)]:
+                    if not os.path.isfile(file_path):
+                        del known[file_path]
+        
+        for file_path in self.parser.walker.filter_ignored(sorted(to_scan), project_path):
+            if not self.parser.is_source_path(os.path.relpath(file_path, project_path)):
+                continue
+            todos, completions = self.parser.scan_file(file_path)
+            rows = (self.parser.rows_from_items(todos), self.parser.rows_from_items(completions))
+            if file_rows.get(file_path) != rows:
+                pending[file_path] = rows
+            else:
+                # Back to what was last synced, e.g. an edit that failed to sync was undone
+                pending.pop(file_path, None)
+    
     def list_projects(self):
         """List available Todoist projects."""
         self.todoist_client.list_projects()
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main entry point."""
     parser = argparse.ArgumentParser(
         description="Sync TODO statements from Xcode projects to Todoist",
@@ -130,6 +781,22 @@ Examples:
   python todoist_sync.py /path/to/xcode/project
   python todoist_sync.py /path/to/xcode/project --project-id 123456
   python todoist_sync.py /path/to/xcode/project --dry-run
+  python todoist_sync.py /path/to/xcode/project --plan sync-plan.json
+  python todoist_sync.py --apply sync-plan.json
+  python todoist_sync.py /path/to/xcode/project --workers 8
+  python todoist_sync.py /path/to/xcode/project --batch
+  python todoist_sync.py /path/to/xcode/project --concurrency 8
+  python todoist_sync.py /path/to/xcode/project --journal .todoist_journal.jsonl
+  python todoist_sync.py /path/to/xcode/project --state-db .todoist_state.db --dry-run --offline
+  python todoist_sync.py /path/to/xcode/project --scan-cache .todoist_scan_cache.json
+  python todoist_sync.py /path/to/xcode/project --git-index
+  python todoist_sync.py --serve
+  python todoist_sync.py /path/to/xcode/project --git-state .todoist_git_state.json
+  python todoist_sync.py /path/to/xcode/project --commit v2.1 --blob-cache .todoist_blob_cache.json
+  python todoist_sync.py /path/to/xcode/project --shard 2/8 --shard-manifest shard-2.json
+  python todoist_sync.py /path/to/xcode/project --merge-shards shard-*.json
+  python todoist_sync.py /path/to/xcode/project --watch
+  python todoist_sync.py --manifest projects.json --workers 8
   python todoist_sync.py --list-projects
         """
     )
@@ -157,7 +824,165 @@ Examples:
         help='Preview changes without making them'
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        '--plan',
+        metavar='PATH',
+        help='Preview changes like --dry-run and save them to PATH as a plan for --apply'
+    )
+    
+    parser.add_argument(
+        '--apply',
+        metavar='PATH',
+        help='Make exactly the changes of a saved plan without rescanning, unless the tasks changed since'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of worker processes used to scan source files (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--scan-cache',
+        metavar='PATH',
+        help='Cache scan results in PATH and skip unchanged files on the next run'
+    )
+    
+    parser.add_argument(
+        '--scan-cache-hash',
+        action='store_true',
+        help='Compare content hashes so files with a new mtime but unchanged contents stay cached'
+    )
+    
+    parser.add_argument(
+        '--git-state',
+        metavar='PATH',
+        help='Only rescan files changed in git since the last successful sync recorded in PATH'
+    )
+    
+    parser.add_argument(
+        '--commit',
+        metavar='REV',
+        help='Scan the files of commit, branch or tag REV from the git object store instead of the working tree'
+    )
+    
+    parser.add_argument(
+        '--blob-cache',
+        metavar='PATH',
+        help='With --commit, cache scan results per git blob in PATH so unchanged files are never parsed twice'
+    )
+    
+    parser.add_argument(
+        '--git-index',
+        action='store_true',
+        help='List source files from the git index instead of walking the project tree'
+    )
+    
+    parser.add_argument(
+        '--no-gitignore',
+        action='store_true',
+        help='Scan files ignored by .gitignore and .git/info/exclude'
+    )
+    
+    parser.add_argument(
+        '--shard',
+        metavar='INDEX/COUNT',
+        help='Only scan shard INDEX of COUNT (1-based) and write it to --shard-manifest; no Todoist access'
+    )
+    
+    parser.add_argument(
+        '--shard-manifest',
+        metavar='PATH',
+        help='With --shard, where to write the shard\'s scan manifest'
+    )
+    
+    parser.add_argument(
+        '--merge-shards',
+        nargs='+',
+        metavar='PATH',
+        help='Sync from the manifests of every shard of a sharded scan instead of scanning the project'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Send creates and closes as batched Sync API commands (up to 100 per request)'
+    )
+    
+    parser.add_argument(
+        '--journal',
+        metavar='PATH',
+        help='Record planned writes in PATH so an interrupted or rate-limited sync resumes where it stopped'
+    )
+    
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        help='Maximum number of task create/close requests in flight at once (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--state-db',
+        metavar='PATH',
+        help='Keep a local SQLite mirror of Todoist tasks in PATH and pull only changes each run'
+    )
+    
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='With --dry-run and --state-db, preview against the local task state without network access'
+    )
+    
+    parser.add_argument(
+        '--manifest',
+        metavar='PATH',
+        help='Sync every project listed in a JSON manifest of project paths and Todoist project IDs'
+    )
+    
+    parser.add_argument(
+        '--metrics-json',
+        metavar='PATH',
+        help='Write per-phase timings, scan and API metrics for the run as JSON to PATH'
+    )
+    
+    parser.add_argument(
+        '--metrics-prom',
+        metavar='PATH',
+        help='Write the same metrics in Prometheus textfile format to PATH (e.g. for node_exporter)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and sync the TODOs of files as they change'
+    )
+    
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        metavar='SECONDS',
+        help='With --watch, wait for SECONDS without further changes before syncing (default: 0.5)'
+    )
+    
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='With --watch, poll for changes instead of using inotify'
+    )
+    
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run a resident sync server for sync_client.py, keeping parsers, caches and connections warm'
+    )
+    
+    parser.add_argument(
+        '--socket',
+        metavar='PATH',
+        help='With --serve, listen on the Unix socket PATH (default: TODOIST_SYNC_SOCKET or a per-user path)'
+    )
+    
+    args = parser.parse_args(argv)
     
     # Initialize configuration
     config = Config()
@@ -169,16 +994,106 @@ Examples:
         return
     
     # Validate required arguments
-    if not args.project_path:
-        parser.error("project_path is required (unless using --list-projects)")
+    if args.apply:
+        if args.project_path or args.dry_run or args.plan or args.manifest or args.watch or args.serve \
+                or args.shard or args.merge_shards or args.commit or args.git_state:
+            parser.error("--apply takes the project from the plan and cannot be combined with scanning options")
+    elif not args.project_path and not args.manifest and not args.serve:
+        parser.error("project_path is required (unless using --list-projects, --manifest, --serve or --apply)")
+    if args.plan and (args.manifest or args.watch or args.serve or args.shard):
+        parser.error("--plan cannot be combined with --manifest, --watch, --serve or --shard")
+    if args.manifest and (args.project_path or args.watch):
+        parser.error("--manifest cannot be combined with project_path or --watch")
+    if args.serve and (args.project_path or args.manifest or args.watch):
+        parser.error("--serve takes requests from sync_client.py and cannot be combined with a project")
+    if bool(args.shard) != bool(args.shard_manifest):
+        parser.error("--shard and --shard-manifest must be used together")
+    if (args.shard or args.merge_shards) and (args.manifest or args.watch or args.serve or args.git_state):
+        parser.error("--shard and --merge-shards cannot be combined with --manifest, --watch, --serve or --git-state")
+    if args.commit and (args.git_state or args.watch or args.manifest or args.serve or args.shard or args.merge_shards):
+        parser.error("--commit cannot be combined with --git-state, --watch, --manifest, --serve, --shard or --merge-shards")
+    if args.shard and args.merge_shards:
+        parser.error("--shard scans one shard; --merge-shards syncs all of them in a separate step")
     
     # Set project ID if provided
     if args.project_id:
         config.set_project_id(args.project_id)
     
+    if args.workers is not None:
+        if args.workers < 1:
+            parser.error("--workers must be at least 1")
+        config.scan_workers = args.workers
+    
+    if args.scan_cache:
+        config.scan_cache_path = args.scan_cache
+    if args.scan_cache_hash:
+        config.scan_cache_use_hash = True
+    
+    if args.git_state:
+        config.git_state_path = args.git_state
+    if args.commit:
+        config.scan_revision = args.commit
+    if args.blob_cache:
+        config.blob_cache_path = args.blob_cache
+    if args.git_index:
+        config.walk_git_index = True
+    if args.no_gitignore:
+        config.respect_gitignore = False
+    
+    if args.batch:
+        config.batch_writes = True
+    if args.state_db:
+        config.state_db_path = args.state_db
+    if args.journal:
+        config.journal_path = args.journal
+    
+    if args.concurrency is not None:
+        if args.concurrency < 1:
+            parser.error("--concurrency must be at least 1")
+        config.max_in_flight = args.concurrency
+    
+    if args.debounce is not None:
+        config.watch_debounce = args.debounce
+    if args.metrics_json:
+        config.metrics_json_path = args.metrics_json
+    if args.metrics_prom:
+        config.metrics_prometheus_path = args.metrics_prom
+    
+    if args.shard:
+        # Scan-only node: no Todoist token or API access needed
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        parser_only = XcodeParser(config)
+        success = ShardManifest(parser_only).scan(args.project_path, shard_index, shard_count, args.shard_manifest)
+        sys.exit(0 if success else 1)
+    
+    if args.serve:
+        if config.git_state_path:
+            print("Note: --git-state is ignored by the sync server; it keeps an in-memory scan cache per project")
+            config.git_state_path = None
+        if config.scan_cache_path:
+            print("Note: --scan-cache is ignored by the sync server; it keeps an in-memory scan cache per project")
+            config.scan_cache_path = None
+        sync = TodoistSync(config)
+        socket_path = args.socket or config.server_socket_path or default_socket_path()
+        sys.exit(0 if SyncServer(sync, socket_path).serve_forever() else 1)
+    
     # Perform sync
     sync = TodoistSync(config)
-    success = sync.sync_project(args.project_path, args.dry_run)
+    if args.watch:
+        success = sync.watch_project(args.project_path, args.dry_run, args.poll)
+    else:
+        with sync.metrics.phase("total"):
+            if args.apply:
+                success = sync.apply_plan(args.apply)
+            elif args.manifest:
+                success = sync.sync_manifest(args.manifest, args.dry_run)
+            else:
+                success = sync.sync_project(args.project_path, args.dry_run, args.offline, args.merge_shards,
+                                            args.plan)
+        sync.write_metrics()
     
     sys.exit(0 if success else 1)
 
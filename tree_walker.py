@@ -0,0 +1,329 @@
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Pattern, Tuple
+from config import Config
+
+def translate_pattern(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression over '/'-separated paths.
+
+    "*" and "?" never match "/", "[...]" is a character class ("!" or "^" negates it),
+    a backslash escapes the next character, and "**" matches any number of directories
+    when it forms a whole path segment.
+    """
+    parts = []
+    index = 0
+    length = len(pattern)
+    while index < length:
+        char = pattern[index]
+        if char == '*':
+            end = index
+            while end < length and pattern[end] == '*':
+                end += 1
+            segment_start = index == 0 or pattern[index - 1] == '/'
+            if end - index >= 2 and segment_start and end == length:
+                parts.append('.*')
+            elif end - index >= 2 and segment_start and pattern[end] == '/':
+                parts.append('(?:.*/)?')
+                end += 1
+            else:
+                parts.append('[^/]*')
+            index = end
+        elif char == '?':
+            parts.append('[^/]')
+            index += 1
+        elif char == '[':
+            end = index + 1
+            if end < length and pattern[end] in '!^':
+                end += 1
+            if end < length and pattern[end] == ']':
+                end += 1
+            end = pattern.find(']', end)
+            if end == -1:
+                parts.append(re.escape(char))
+                index += 1
+                continue
+            body = pattern[index + 1:end]
+            negated = body[:1] in ('!', '^')
+            if negated:
+                body = body[1:]
+            body = body.replace('\\', '\\\\').replace('[', '\\[')
+            parts.append(f'[^/{body}]' if negated else f'(?!/)[{body}]')
+            index = end + 1
+        elif char == '\\' and index + 1 < length:
+            parts.append(re.escape(pattern[index + 1]))
+            index += 2
+        else:
+            parts.append(re.escape(char))
+            index += 1
+    return ''.join(parts)
+
+class IgnoreRules:
+    """Patterns from one gitignore-style file, matched against paths relative to its directory.
+
+    Supports comments, "!" negation, directory-only patterns ending in "/", patterns anchored
+    to the file's directory by a "/" at the start or in the middle, and "*", "?", "[...]"
+    and "**" wildcards. The last matching pattern decides.
+    """
+
+    def __init__(self, lines: List[str], base: str = ''):
+        # Directory of the ignore file relative to the walk anchor, '' for the anchor itself
+        self.base = base
+        self.prefix = base + '/' if base else ''
+        self.rules: List[Tuple[Pattern, bool, bool]] = []
+        for line in lines:
+            rule = self._parse(line)
+            if rule is not None:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path: str, base: str = '') -> Optional["IgnoreRules"]:
+        """Load an ignore file, or return None if it is missing or has no patterns."""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        rules = cls(lines, base)
+        return rules if rules.rules else None
+
+    @staticmethod
+    def _parse(line: str) -> Optional[Tuple[Pattern, bool, bool]]:
+        if not line or line.startswith('#'):
+            return None
+        # Trailing spaces are ignored unless escaped with a backslash
+        end = len(line)
+        while end > 0 and line[end - 1] == ' ' and not (end >= 2 and line[end - 2] == '\\'):
+            end -= 1
+        line = line[:end]
+
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        directory_only = line.endswith('/')
+        if directory_only:
+            line = line[:-1]
+        if not line:
+            return None
+
+        anchored = '/' in line
+        if line.startswith('/'):
+            line = line[1:]
+        regex = translate_pattern(line) if anchored else '(?:.*/)?' + translate_pattern(line)
+        try:
+            return re.compile(regex, re.DOTALL), negated, directory_only
+        except re.error:
+            return None
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """True if the path is ignored, False if re-included by a "!" pattern, None if no pattern matches."""
+        for regex, negated, directory_only in reversed(self.rules):
+            if directory_only and not is_dir:
+                continue
+            if regex.fullmatch(relative_path):
+                return not negated
+        return None
+
+def is_ignored(rules: List[IgnoreRules], relative_path: str, is_dir: bool) -> bool:
+    """Apply ignore files from the most specific (deepest, last loaded) to the least specific."""
+    for rule_set in reversed(rules):
+        if rule_set.prefix:
+            if not relative_path.startswith(rule_set.prefix):
+                continue
+            result = rule_set.match(relative_path[len(rule_set.prefix):], is_dir)
+        else:
+            result = rule_set.match(relative_path, is_dir)
+        if result is not None:
+            return result
+    return False
+
+class TreeWalker:
+    """Lists source files under a directory with os.scandir, skipping ignored paths.
+
+    Honours .gitignore files (including those between the repository root and the walked
+    directory), the repository's .git/info/exclude and an extra per-directory ignore file
+    (Config.ignore_file). Ignored and excluded directories are pruned before they are listed,
+    and files are handled as plain strings. Can also list files from the git index instead.
+    """
+
+    def __init__(self, config: Config, is_excluded_dir: Callable[[str], bool]):
+        self.config = config
+        self.is_excluded_dir = is_excluded_dir
+        self.ignore_names = []
+        if config.respect_gitignore:
+            self.ignore_names.append('.gitignore')
+        if config.ignore_file:
+            self.ignore_names.append(config.ignore_file)
+
+    @staticmethod
+    def find_repository(path: str) -> Optional[str]:
+        """Return the root of the git work tree containing path, if any."""
+        directory = os.path.abspath(path)
+        while True:
+            if os.path.exists(os.path.join(directory, '.git')):
+                return directory
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None
+            directory = parent
+
+    @staticmethod
+    def _git_dir(repository: str) -> str:
+        git_path = os.path.join(repository, '.git')
+        if os.path.isfile(git_path):
+            # Worktrees and submodules point at their git directory with a "gitdir:" line
+            try:
+                with open(git_path, 'r', encoding='utf-8') as f:
+                    line = f.readline().strip()
+                if line.startswith('gitdir:'):
+                    return os.path.join(repository, line[len('gitdir:'):].strip())
+            except OSError:
+                pass
+        return git_path
+
+    def _load_rules(self, directory: str, base: str) -> List[IgnoreRules]:
+        rules = []
+        for name in self.ignore_names:
+            rule_set = IgnoreRules.from_file(os.path.join(directory, name), base)
+            if rule_set is not None:
+                rules.append(rule_set)
+        return rules
+
+    def _anchor(self, root: str) -> Tuple[str, List[IgnoreRules]]:
+        """The directory ignore patterns are relative to, and the rules that apply there."""
+        repository = self.find_repository(root) if self.ignore_names else None
+        if repository is None:
+            return os.path.abspath(root), []
+        rules = []
+        if self.config.respect_gitignore:
+            exclude = IgnoreRules.from_file(os.path.join(self._git_dir(repository), 'info', 'exclude'))
+            if exclude is not None:
+                rules.append(exclude)
+        return repository, rules
+
+    def _rules_for(self, directory: str, anchor: str, anchor_rules: List[IgnoreRules],
+                   cache: Dict[str, Optional[Tuple[str, List[IgnoreRules]]]]) -> Optional[Tuple[str, List[IgnoreRules]]]:
+        """Return (path relative to anchor, rules in effect inside it) for an absolute directory,
+        or None if the directory or one of its parents up to the anchor is ignored."""
+        if directory in cache:
+            return cache[directory]
+        if directory == anchor or not directory.startswith(os.path.join(anchor, '')):
+            state = ('', anchor_rules + self._load_rules(directory, ''))
+        else:
+            parent = self._rules_for(os.path.dirname(directory), anchor, anchor_rules, cache)
+            state = None
+            if parent is not None:
+                parent_relative, parent_rules = parent
+                name = os.path.basename(directory)
+                relative = f"{parent_relative}/{name}" if parent_relative else name
+                if not is_ignored(parent_rules, relative, True):
+                    state = (relative, parent_rules + self._load_rules(directory, relative))
+        cache[directory] = state
+        return state
+
+    def walk(self, top: str, root: Optional[str] = None) -> Iterator[str]:
+        """Yield source files below top in os.walk order, skipping excluded and ignored paths.
+
+        root is the project directory; ignore files between it (or the enclosing repository
+        root) and top also apply. Paths are top joined with the relative path, as os.walk gives.
+        """
+        for _, source_files in self.walk_directories(top, root):
+            yield from source_files
+
+    def walk_directories(self, top: str, root: Optional[str] = None) -> Iterator[Tuple[str, List[str]]]:
+        """Yield (directory, source files directly in it) for top and every directory below it
+        that a walk descends into, in os.walk order. Nothing is yielded if top itself is ignored."""
+        extensions = self.config.source_extensions
+        top = str(Path(top))
+        anchor, anchor_rules = self._anchor(root or top)
+        start = self._rules_for(os.path.abspath(top), anchor, anchor_rules, {}) if self.ignore_names else ('', [])
+        if start is None:
+            return
+        relative, rules = start
+
+        prefix = '' if top == '.' else os.path.join(top, '')
+        stack = [(top, prefix, relative, rules)]
+        while stack:
+            directory, prefix, relative, rules = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    entries = list(entries)
+            except OSError:
+                continue
+
+            if self.ignore_names and any(entry.name in self.ignore_names for entry in entries):
+                rules = rules + self._load_rules(directory, relative)
+
+            subdirs = []
+            source_files = []
+            for entry in entries:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # Like os.walk, symlinked directories are not followed
+                    if self.is_excluded_dir(name) or entry.is_symlink():
+                        continue
+                    child = f"{relative}/{name}" if relative else name
+                    if rules and is_ignored(rules, child, True):
+                        continue
+                    subdirs.append((prefix + name, prefix + name + os.sep, child, rules))
+                elif os.path.splitext(name)[1] in extensions:
+                    if rules and is_ignored(rules, f"{relative}/{name}" if relative else name, False):
+                        continue
+                    source_files.append(prefix + name)
+            yield directory, source_files
+            stack.extend(reversed(subdirs))
+
+    def filter_ignored(self, file_paths: List[str], root: str) -> List[str]:
+        """Drop files that a walk of root would skip because of ignore files."""
+        if not self.ignore_names:
+            return list(file_paths)
+        anchor, anchor_rules = self._anchor(root)
+        cache: Dict[str, Optional[Tuple[str, List[IgnoreRules]]]] = {}
+        kept = []
+        for file_path in file_paths:
+            directory, name = os.path.split(os.path.abspath(file_path))
+            state = self._rules_for(directory, anchor, anchor_rules, cache)
+            if state is None:
+                continue
+            relative, rules = state
+            if not is_ignored(rules, f"{relative}/{name}" if relative else name, False):
+                kept.append(file_path)
+        return kept
+
+    def git_index_files(self, top: str, root: Optional[str] = None) -> Optional[List[str]]:
+        """List source files from the git index plus untracked files git does not ignore.
+
+        Returns None when top is not inside a git work tree, so callers can walk instead.
+        """
+        try:
+            listed = subprocess.run(['git', '-C', top, 'ls-files', '-z', '--cached', '--others', '--exclude-standard'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False)
+            deleted = subprocess.run(['git', '-C', top, 'ls-files', '-z', '--deleted'],
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False)
+        except OSError:
+            return None
+        if listed.returncode != 0 or deleted.returncode != 0:
+            return None
+
+        missing = set(deleted.stdout.split(b'\0'))
+        extensions = self.config.source_extensions
+        top = str(Path(top))
+        prefix = '' if top == '.' else os.path.join(top, '')
+        source_files = []
+        for item in listed.stdout.split(b'\0'):
+            if not item or item in missing:
+                continue
+            path = item.decode('utf-8', errors='surrogateescape')
+            parts = path.split('/')
+            if os.path.splitext(parts[-1])[1] not in extensions:
+                continue
+            if any(self.is_excluded_dir(part) for part in parts[:-1]):
+                continue
+            source_files.append(prefix + path.replace('/', os.sep))
+        # Tracked files matching an ignore pattern are skipped, as in a walk
+        return self.filter_ignored(source_files, root or top)
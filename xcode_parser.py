@@ -1,60 +1,161 @@
+import hashlib
+import io
 import os
 import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Tuple, Optional, Pattern, Iterator, Callable, BinaryIO
 from config import Config
+from scan_cache import ScanCache
+from metrics import Metrics
+from tree_walker import TreeWalker
+
+def normalize_todo_text(text: str) -> str:
+    """Normalise TODO text for identity comparisons (case and whitespace insensitive)."""
+    return ' '.join(text.split()).casefold()
 
 class TodoItem:
-    """Represents a TODO item found in source code."""
+    """Represents a TODO item found in source code.
+    
+    Items are slotted and their file path and type strings interned, so the items of a file
+    share one path string. The identity string and hash are only built when first needed.
+    """
+    
+    __slots__ = ('content', 'file_path', 'line_number', 'todo_type', '_unique_id', '_hash')
     
     def __init__(self, content: str, file_path: str, line_number: int, todo_type: str = "TODO"):
         self.content = content.strip()
-        self.file_path = file_path
+        self.file_path = sys.intern(file_path)
         self.line_number = line_number
-        self.todo_type = todo_type
-        self.unique_id = f"{file_path}:{line_number}:{content}"
+        self.todo_type = sys.intern(todo_type)
+        self._unique_id = None
+        self._hash = None
+    
+    @property
+    def unique_id(self) -> str:
+        if self._unique_id is None:
+            self._unique_id = f"{self.file_path}:{self.line_number}:{self.content}"
+        return self._unique_id
+    
+    def __reduce__(self):
+        # Cached hashes are process-specific; unpickled items rebuild them (and re-intern paths)
+        return (TodoItem, (self.content, self.file_path, self.line_number, self.todo_type))
     
     def __str__(self):
         return f"{self.todo_type}: {self.content} ({self.file_path}:{self.line_number})"
     
     def __eq__(self, other):
         if isinstance(other, TodoItem):
-            return self.unique_id == other.unique_id
+            return (self.line_number == other.line_number and self.content == other.content
+                    and self.file_path == other.file_path)
         return False
     
     def __hash__(self):
-        return hash(self.unique_id)
+        if self._hash is None:
+            self._hash = hash((self.file_path, self.line_number, self.content))
+        return self._hash
+
+# Parser instance owned by each scan worker process, built once by _init_scan_worker
+_worker_parser = None
+
+def _init_scan_worker(config: Config, collect_metrics: bool = False):
+    """Build the parser used by a scan worker process."""
+    global _worker_parser
+    _worker_parser = XcodeParser(config)
+    _worker_parser.metrics = Metrics(collect_metrics)
+
+def _scan_files_chunk(file_paths: List[str]) -> Tuple[List[Tuple[List[TodoItem], List[TodoItem]]], Dict]:
+    """Scan a chunk of files inside a worker process, preserving file order.
+    
+    Returns the per-file results and the scan metrics recorded for the chunk, which the
+    parent adds to its own.
+    """
+    results = [_worker_parser.scan_file(file_path) for file_path in file_paths]
+    recorded = dict(_worker_parser.metrics.values)
+    _worker_parser.metrics.values.clear()
+    return results, recorded
 
 class XcodeParser:
     """Parser for Xcode projects to find TODO statements."""
     
+    # Common directories that shouldn't contain source code
+    EXCLUDED_DIRS = {'build', 'DerivedData', 'Pods', 'node_modules', '.git', '.svn'}
+    
+    # Approximate number of characters read and matched at a time by scan_file
+    READ_CHUNK_SIZE = 1 << 20
+    
+    # Bytes sniffed for NUL (binary files) and for average line length (minified files)
+    BINARY_SNIFF_SIZE = 8192
+    MINIFIED_SNIFF_SIZE = 65536
+    
+    # A carriage return not followed by a newline (text mode would treat it as a line break)
+    LONE_CR_PATTERN = re.compile(rb'\r(?!\n)')
+    
+    # UTF-8 for the non-ASCII characters that case-insensitive matching folds onto ASCII
+    # letters (dotless i, dotted capital I, long s, Kelvin sign); the prefilter cannot see them
+    FOLD_LOOKALIKES = tuple(char.encode('utf-8') for char in ('\u0131', '\u0130', '\u017f', '\u212a'))
+    
     def __init__(self, config: Config):
         self.config = config
         self.todo_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in config.todo_patterns]
         self.completion_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in config.completion_patterns]
+        self.combined_pattern = self._compile_combined_pattern(config.todo_patterns + config.completion_patterns)
+        self.prefilter_keywords = self._build_prefilter()
+        self.walker = TreeWalker(config, self.is_excluded_dir)
+        
+        # Scan timings and counters; disabled unless the sync enables reporting
+        self.metrics = Metrics()
+        
+        # Process pool shared across scans (see start_scan_pool); scans create their own otherwise
+        self.scan_pool: Optional[ProcessPoolExecutor] = None
+        
+        # Project-relative path of each (project root, file) formatted into tasks
+        self._relative_paths: Dict[Tuple[str, str], str] = {}
+        
+        self.scan_cache = None
+        if config.scan_cache_path:
+            self.scan_cache = ScanCache(config.scan_cache_path, config, config.scan_cache_use_hash)
+    
+    def _compile_combined_pattern(self, patterns: List[str]) -> Optional[Pattern]:
+        """Compile every TODO and completion pattern into one alternation used to locate candidate lines."""
+        if not patterns:
+            return None
+        try:
+            return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE | re.MULTILINE)
+        except re.error:
+            # Patterns that cannot be combined (e.g. backreferences) fall back to per-line matching
+            return None
+    
+    def is_excluded_dir(self, name: str) -> bool:
+        """Check whether a directory should be skipped while scanning."""
+        return name.startswith('.') or name in self.EXCLUDED_DIRS
+    
+    def is_source_path(self, relative_path: str) -> bool:
+        """Check whether a project-relative path would be picked up by find_source_files."""
+        parts = Path(relative_path).parts
+        if any(self.is_excluded_dir(part) for part in parts[:-1]):
+            return False
+        return Path(relative_path).suffix in self.config.source_extensions
     
-    def find_source_files(self, project_path: str) -> List[str]:
-        """Find all source files in the Xcode project."""
-        source_files = []
-        project_path_obj = Path(project_path)
+    def find_source_files(self, project_path: str, root: Optional[str] = None) -> List[str]:
+        """Find all source files in the Xcode project.
         
-        if not project_path_obj.exists():
+        Excluded directories and paths ignored by .gitignore, .git/info/exclude or the
+        configured ignore file are skipped. root is the project directory when project_path
+        is one of its subdirectories, so ignore files above project_path still apply.
+        """
+        if not os.path.exists(project_path):
             print(f"Error: Project path {project_path} does not exist")
-            return source_files
-        
-        # Walk through the project directory
-        for root, dirs, files in os.walk(project_path_obj):
-            # Skip common directories that shouldn't contain source code
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in {
-                'build', 'DerivedData', 'Pods', 'node_modules', '.git', '.svn'
-            }]
-            
-            for file in files:
-                file_path = Path(root) / file
-                if file_path.suffix in self.config.source_extensions:
-                    source_files.append(str(file_path))
+            return []
         
-        return source_files
+        if self.config.walk_git_index:
+            source_files = self.walker.git_index_files(project_path, root)
+            if source_files is not None:
+                return source_files
+        return list(self.walker.walk(project_path, root))
     
     def parse_file_for_todos(self, file_path: str) -> List[TodoItem]:
         """Parse a single file for TODO statements."""
@@ -104,34 +205,413 @@ class XcodeParser:
         
         return completions
     
-    def parse_project(self, project_path: str) -> Tuple[List[TodoItem], List[TodoItem]]:
-        """Parse an entire Xcode project for TODOs and completions."""
+    def _classify_line(self, line: str, file_path: str, line_number: int,
+                       todos: List[TodoItem], completions: List[TodoItem]):
+        """Match a single line against the TODO and completion patterns, in configured order."""
+        for pattern in self.todo_patterns:
+            match = pattern.search(line)
+            if match:
+                todo_type = "TODO" if "TODO" in line.upper() else "FIXME"
+                todos.append(TodoItem(match.group(1).strip(), file_path, line_number, todo_type))
+                break
+        
+        for pattern in self.completion_patterns:
+            match = pattern.search(line)
+            if match:
+                completion_type = "DONE" if "DONE" in line.upper() else "COMPLETED"
+                completions.append(TodoItem(match.group(1).strip(), file_path, line_number, completion_type))
+                break
+    
+    def scan_text(self, text: str, file_path: str, first_line: int = 1,
+                  todos: Optional[List[TodoItem]] = None,
+                  completions: Optional[List[TodoItem]] = None) -> Tuple[List[TodoItem], List[TodoItem]]:
+        """Find TODOs and completions in already-decoded file contents in a single pass.
+        
+        The combined pattern is run over the whole buffer to jump straight to candidate
+        lines; each candidate line is then classified with the individual patterns so the
+        results are identical to parse_file_for_todos/parse_file_for_completions.
+        The text must end on a line boundary; first_line is the number of its first line.
+        """
+        todos = [] if todos is None else todos
+        completions = [] if completions is None else completions
+        
+        if self.combined_pattern is None:
+            # Mirror readlines(): split on '\n' only and keep the line terminators
+            lines = text.split('\n')
+            for line_number, line in enumerate(lines, first_line):
+                if line_number < first_line + len(lines) - 1:
+                    line += '\n'
+                elif not line:
+                    break
+                self._classify_line(line, file_path, line_number, todos, completions)
+            return todos, completions
+        
+        position = 0
+        line_number = first_line
+        counted_to = 0
+        while True:
+            match = self.combined_pattern.search(text, position)
+            if not match:
+                break
+            
+            line_start = text.rfind('\n', 0, match.start()) + 1
+            line_end = text.find('\n', match.start())
+            line_end = len(text) if line_end == -1 else line_end + 1
+            
+            line_number += text.count('\n', counted_to, line_start)
+            counted_to = line_start
+            
+            self._classify_line(text[line_start:line_end], file_path, line_number, todos, completions)
+            position = line_end
+            if position >= len(text):
+                break
+        
+        return todos, completions
+    
+    def scan_file(self, file_path: str) -> Tuple[List[TodoItem], List[TodoItem]]:
+        """Read a file once and return both its TODOs and its completions.
+        
+        The file is read as raw bytes, READ_CHUNK_SIZE at a time and cut at line boundaries,
+        so memory use stays bounded even for very large generated or vendored sources.
+        Each block is searched for the marker keywords first: only lines containing one are
+        decoded and matched, and blocks without any are never decoded. Binary and minified
+        files, and files with a line longer than Config.max_line_bytes, are skipped; otherwise
+        results are identical to the text-mode scan.
+        """
+        return self._scan_source(file_path, lambda: open(file_path, 'rb'))
+    
+    def scan_blob(self, data: bytes, file_path: str) -> Tuple[List[TodoItem], List[TodoItem]]:
+        """Scan file contents held in memory (e.g. a git blob) exactly as scan_file scans a file."""
+        return self._scan_source(file_path, lambda: io.BytesIO(data))
+    
+    def _scan_source(self, file_path: str, open_binary: Callable[[], BinaryIO]) -> Tuple[List[TodoItem], List[TodoItem]]:
+        if self.prefilter_keywords is None:
+            return self._scan_file_text(file_path, open_binary)
+        
+        todos = []
+        completions = []
+        metrics = self.metrics
+        regex_seconds = 0.0
+        
+        try:
+            with open_binary() as f:
+                line_number = 1
+                block = f.read(self.READ_CHUNK_SIZE)
+                # Sniff the first block as read: a minified file may not have a single line break
+                reason = self._skip_reason(block)
+                if reason:
+                    metrics.add("todoist_sync_files_skipped_total", reason=reason)
+                    return [], []
+                
+                pending = bytearray()
+                while True:
+                    if block:
+                        # Scan whole lines only; carry the trailing partial line into the next block
+                        cut = block.rfind(b'\n') + 1
+                        if not cut:
+                            pending += block
+                            if len(pending) > self.config.max_line_bytes:
+                                if b'\r' in pending and self.LONE_CR_PATTERN.search(pending):
+                                    return self._scan_file_text(file_path, open_binary)
+                                if self.config.skip_binary_files:
+                                    metrics.add("todoist_sync_files_skipped_total", reason="long_line")
+                                    return [], []
+                                # Asked to scan everything: text mode reads the line in one go
+                                return self._scan_file_text(file_path, open_binary)
+                            block = f.read(self.READ_CHUNK_SIZE)
+                            continue
+                        pending += block[:cut]
+                        chunk = bytes(pending)
+                        pending[:] = block[cut:]
+                    elif pending:
+                        chunk = bytes(pending)
+                        pending.clear()
+                    else:
+                        break
+                    block = f.read(self.READ_CHUNK_SIZE)
+                    
+                    if b'\r' in chunk and self.LONE_CR_PATTERN.search(chunk):
+                        # Old Mac line endings: leave line splitting to text mode's universal newlines
+                        return self._scan_file_text(file_path, open_binary)
+                    
+                    if metrics.enabled:
+                        start = time.perf_counter()
+                        self._scan_bytes(chunk, file_path, line_number, todos, completions)
+                        regex_seconds += time.perf_counter() - start
+                    else:
+                        self._scan_bytes(chunk, file_path, line_number, todos, completions)
+                    line_number += chunk.count(b'\n')
+                
+                if metrics.enabled:
+                    metrics.add("todoist_sync_files_scanned_total")
+                    metrics.add("todoist_sync_bytes_scanned_total", f.tell())
+                    metrics.add("todoist_sync_regex_seconds_total", regex_seconds)
+        except Exception as e:
+            print(f"Error reading file {file_path}: {e}")
+        
+        return todos, completions
+    
+    def _build_prefilter(self) -> Optional[List[bytes]]:
+        """Lower-cased marker keywords for the byte prefilter, or None if it cannot be used safely.
+        
+        Every pattern has to require one of the keywords; otherwise a line without any keyword
+        could still match, and skipping it would change the results.
+        """
+        keywords = [keyword.lower() for keyword in self.config.marker_keywords if keyword]
+        if not keywords or not all(keyword.isascii() for keyword in keywords):
+            return None
+        for pattern in self.config.todo_patterns + self.config.completion_patterns:
+            if not any(keyword in pattern.lower() for keyword in keywords):
+                return None
+        return [keyword.encode('ascii') for keyword in keywords]
+    
+    def _skip_reason(self, chunk: bytes) -> Optional[str]:
+        """Classify a file from its first block as "binary" or "minified", or None to scan it."""
+        if not self.config.skip_binary_files:
+            return None
+        if b'\0' in chunk[:self.BINARY_SNIFF_SIZE]:
+            return "binary"
+        sample = chunk[:self.MINIFIED_SNIFF_SIZE]
+        if len(sample) >= 4096 and len(sample) > self.config.minified_line_length * (sample.count(b'\n') + 1):
+            return "minified"
+        return None
+    
+    def _scan_bytes(self, chunk: bytes, file_path: str, first_line: int,
+                    todos: List[TodoItem], completions: List[TodoItem]):
+        """Scan a block of raw lines, decoding only the lines that contain a marker keyword."""
+        if not chunk.isascii():
+            try:
+                chunk.decode('utf-8')
+                exact = not any(sequence in chunk for sequence in self.FOLD_LOOKALIKES)
+            except UnicodeDecodeError:
+                # Dropping invalid bytes while decoding could join the halves of a keyword
+                exact = False
+            if not exact:
+                text = chunk.decode('utf-8', errors='ignore').replace('\r\n', '\n')
+                self.scan_text(text, file_path, first_line, todos, completions)
+                return
+        
+        # bytes.lower() only folds ASCII, so offsets in lowered match offsets in chunk
+        lowered = chunk.lower()
+        keywords = self.prefilter_keywords
+        next_hits = [lowered.find(keyword) for keyword in keywords]
+        line_number = first_line
+        counted_to = 0
+        while True:
+            hit = min((position for position in next_hits if position >= 0), default=-1)
+            if hit < 0:
+                break
+            
+            line_start = chunk.rfind(b'\n', 0, hit) + 1
+            line_end = chunk.find(b'\n', hit)
+            line_end = len(chunk) if line_end == -1 else line_end + 1
+            line_number += chunk.count(b'\n', counted_to, line_start)
+            counted_to = line_start
+            
+            line = chunk[line_start:line_end].decode('utf-8', errors='ignore')
+            if line.endswith('\r\n'):
+                line = line[:-2] + '\n'
+            self._classify_line(line, file_path, line_number, todos, completions)
+            
+            for index, position in enumerate(next_hits):
+                if 0 <= position < line_end:
+                    next_hits[index] = lowered.find(keywords[index], line_end)
+    
+    def _scan_file_text(self, file_path: str, open_binary: Callable[[], BinaryIO]) -> Tuple[List[TodoItem], List[TodoItem]]:
+        """Scan a file decoded in text mode, block by block, without the byte prefilter."""
+        todos = []
+        completions = []
+        metrics = self.metrics
+        regex_seconds = 0.0
+        
+        try:
+            with io.TextIOWrapper(open_binary(), encoding='utf-8', errors='ignore') as f:
+                line_number = 1
+                while True:
+                    lines = f.readlines(self.READ_CHUNK_SIZE)
+                    if not lines:
+                        break
+                    if metrics.enabled:
+                        start = time.perf_counter()
+                        self.scan_text(''.join(lines), file_path, line_number, todos, completions)
+                        regex_seconds += time.perf_counter() - start
+                    else:
+                        self.scan_text(''.join(lines), file_path, line_number, todos, completions)
+                    line_number += len(lines)
+                
+                if metrics.enabled:
+                    metrics.add("todoist_sync_files_scanned_total")
+                    metrics.add("todoist_sync_bytes_scanned_total", f.buffer.tell())
+                    metrics.add("todoist_sync_regex_seconds_total", regex_seconds)
+        except Exception as e:
+            print(f"Error reading file {file_path}: {e}")
+        
+        return todos, completions
+    
+    def scan_files(self, source_files: List[str], workers: int = 1) -> Iterator[Tuple[str, List[TodoItem], List[TodoItem]]]:
+        """Scan files, optionally across a process pool, yielding results in input order."""
+        if workers <= 1 or len(source_files) < 2:
+            for file_path in source_files:
+                todos, completions = self.scan_file(file_path)
+                yield file_path, todos, completions
+            return
+        
+        # Several chunks per worker keeps the pool busy when file sizes are uneven
+        chunk_size = max(1, min(self.config.scan_chunk_size, len(source_files) // (workers * 4)))
+        chunks = [source_files[i:i + chunk_size] for i in range(0, len(source_files), chunk_size)]
+        
+        if self.scan_pool is not None:
+            yield from self._scan_chunks(self.scan_pool, chunks, workers)
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker,
+                                 initargs=(self.config, self.metrics.enabled)) as executor:
+            yield from self._scan_chunks(executor, chunks, workers)
+    
+    def _scan_chunks(self, executor: ProcessPoolExecutor, chunks: List[List[str]], workers: int) -> Iterator[Tuple[str, List[TodoItem], List[TodoItem]]]:
+        """Scan chunks on a process pool, yielding per-file results in input order."""
+        # Only a few chunks are in flight at once so results never pile up in memory
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(_scan_files_chunk, chunk)))
+            if len(pending) >= workers * 2:
+                yield from self._drain_chunk(*pending.popleft())
+        while pending:
+            yield from self._drain_chunk(*pending.popleft())
+    
+    def start_scan_pool(self, workers: int):
+        """Start a worker pool that every following scan reuses until close_scan_pool is called."""
+        if workers > 1 and self.scan_pool is None:
+            self.scan_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker,
+                                                 initargs=(self.config, self.metrics.enabled))
+    
+    def close_scan_pool(self):
+        """Shut down the shared worker pool."""
+        if self.scan_pool is not None:
+            self.scan_pool.shutdown()
+            self.scan_pool = None
+    
+    def _drain_chunk(self, chunk: List[str], future) -> Iterator[Tuple[str, List[TodoItem], List[TodoItem]]]:
+        """Yield the per-file results of a finished worker chunk."""
+        results, recorded = future.result()
+        for (name, labels), value in recorded.items():
+            self.metrics.add(name, value, **dict(labels))
+        for file_path, (todos, completions) in zip(chunk, results):
+            yield file_path, todos, completions
+    
+    def iter_project(self, project_path: str, workers: Optional[int] = None) -> Iterator[Tuple[str, List[TodoItem], List[TodoItem]]]:
+        """Scan an Xcode project file by file, yielding (file_path, todos, completions).
+        
+        Files are yielded in find_source_files order as soon as they are scanned, so callers
+        can process results incrementally without holding the whole project in memory.
+        """
         print(f"Scanning project: {project_path}")
         
-        source_files = self.find_source_files(project_path)
-        print(f"Found {len(source_files)} source files to scan")
+        if workers is None:
+            workers = self.config.scan_workers
         
-        all_todos = []
-        all_completions = []
+        walk_start = time.perf_counter()
+        with self.metrics.phase("walk"):
+            source_files = self.find_source_files(project_path)
+        walk_seconds = time.perf_counter() - walk_start
+        if workers > 1:
+            print(f"Found {len(source_files)} source files to scan in {walk_seconds:.2f}s ({workers} workers)")
+        else:
+            print(f"Found {len(source_files)} source files to scan in {walk_seconds:.2f}s")
+        
+        yield from self.iter_files(source_files, workers)
+    
+    def iter_files(self, source_files: List[str], workers: int = 1) -> Iterator[Tuple[str, List[TodoItem], List[TodoItem]]]:
+        """Scan the given files through the scan cache, yielding results in input order."""
+        cached_rows = {}
+        files_to_scan = source_files
+        if self.scan_cache:
+            self.scan_cache.load()
+            files_to_scan = []
+            for file_path in source_files:
+                cached = self.scan_cache.lookup(file_path)
+                if cached is None:
+                    files_to_scan.append(file_path)
+                else:
+                    cached_rows[file_path] = cached
+        
+        # Cache misses are scanned in order, so they line up with their slots in source_files
+        scanned = self.scan_files(files_to_scan, workers)
+        todo_count = 0
+        completion_count = 0
         
         for file_path in source_files:
-            todos = self.parse_file_for_todos(file_path)
-            completions = self.parse_file_for_completions(file_path)
+            if file_path in cached_rows:
+                todo_rows, completion_rows = cached_rows.pop(file_path)
+                todos = self.items_from_rows(todo_rows, file_path)
+                completions = self.items_from_rows(completion_rows, file_path)
+            else:
+                with self.metrics.phase("scan"):
+                    _, todos, completions = next(scanned)
+                if self.scan_cache:
+                    self.scan_cache.store(file_path, self.rows_from_items(todos), self.rows_from_items(completions))
             
-            all_todos.extend(todos)
-            all_completions.extend(completions)
+            todo_count += len(todos)
+            completion_count += len(completions)
             
             if todos or completions:
                 print(f"  {file_path}: {len(todos)} TODOs, {len(completions)} completions")
+            yield file_path, todos, completions
+        
+        print(f"\nTotal: {todo_count} TODO items, {completion_count} completion items")
+        if self.scan_cache:
+            self.scan_cache.save()
+            print(self.scan_cache.summary())
+    
+    def parse_project(self, project_path: str, workers: Optional[int] = None) -> Tuple[List[TodoItem], List[TodoItem]]:
+        """Parse an entire Xcode project for TODOs and completions."""
+        all_todos = []
+        all_completions = []
+        
+        for _, todos, completions in self.iter_project(project_path, workers):
+            all_todos.extend(todos)
+            all_completions.extend(completions)
         
-        print(f"\nTotal: {len(all_todos)} TODO items, {len(all_completions)} completion items")
         return all_todos, all_completions
     
-    def get_todo_content_for_todoist(self, todo_item: TodoItem) -> str:
+    def rows_from_items(self, items: List[TodoItem]) -> List[Tuple[str, int, str]]:
+        """Convert TodoItems to compact (content, line, type) rows for caching."""
+        return [(item.content, item.line_number, item.todo_type) for item in items]
+    
+    def items_from_rows(self, rows: List[Tuple[str, int, str]], file_path: str) -> List[TodoItem]:
+        """Rebuild TodoItems for a file from cached (content, line, type) rows."""
+        return [TodoItem(content, file_path, line_number, todo_type) for content, line_number, todo_type in rows]
+    
+    def relative_path(self, file_path: str, project_root: str) -> str:
+        """Path of a file relative to the project root, computed once per file.
+        
+        Tasks only ever contain project-relative paths, so the same project yields the same
+        task content and fingerprints whichever directory the sync is started from.
+        """
+        key = (project_root, file_path)
+        relative_path = self._relative_paths.get(key)
+        if relative_path is None:
+            relative_path = self._relative_paths[key] = os.path.relpath(file_path, project_root)
+        return relative_path
+    
+    def get_todo_content_for_todoist(self, todo_item: TodoItem, project_root: str) -> str:
         """Format TODO content for Todoist task."""
-        relative_path = os.path.relpath(todo_item.file_path)
-        return f"{todo_item.content} ({relative_path}:{todo_item.line_number})"
+        return f"{todo_item.content} ({self.relative_path(todo_item.file_path, project_root)}:{todo_item.line_number})"
+    
+    def get_todo_fingerprint(self, todo_item: TodoItem, project_root: str, occurrence: int = 0) -> str:
+        """Get a line-independent identity for a TODO.
+        
+        Built from the project-relative file path, the normalised TODO text and the occurrence
+        index of that text within the file, so inserting lines above a TODO does not change it.
+        """
+        normalized = normalize_todo_text(todo_item.content)
+        key = f"{self.relative_path(todo_item.file_path, project_root)}\0{normalized}\0{occurrence}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
     
-    def get_todo_description(self, todo_item: TodoItem) -> str:
+    def get_todo_description(self, todo_item: TodoItem, project_root: str, fingerprint: Optional[str] = None) -> str:
         """Get description for Todoist task."""
-        return f"File: {todo_item.file_path}\nLine: {todo_item.line_number}\nType: {todo_item.todo_type}" 
\ No newline at end of file
+        relative_path = self.relative_path(todo_item.file_path, project_root)
+        description = f"File: {relative_path}\nLine: {todo_item.line_number}\nType: {todo_item.todo_type}"
+        if fingerprint:
+            description += f"\nFingerprint: {fingerprint}"
+        return description 
\ No newline at end of file